@@ -1,27 +1,14 @@
 #!/usr/bin/env python3
 
-import json
+import time
 import psutil  # importing psutil library
 from report_signatures import TimeStampGenerator  # importing generate_report and convert time library functions
+from report_schema import BatteryReport
 import sys  # importing sys library
-import logging  # Import logging module
+from log_config import get_logger
 
 # Configure logging
-logger = logging.getLogger(__name__)
-
-# Create file handler for logging to a file
-file_handler = logging.FileHandler('system_analysis.log')
-file_handler.setLevel(logging.DEBUG)  # Write all logs (DEBUG and higher) to the file
-
-# Create a formatter and attach it to the file handler
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-
-# Add the file handler to the logger
-logger.addHandler(file_handler)
-
-# Set the logger's level to DEBUG to capture all log levels
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
 
 class BatteryManager:
     @staticmethod
@@ -31,11 +18,21 @@ class BatteryManager:
             
             # Battery Usage Statistics
             battery = psutil.sensors_battery()  # assign battery variable to psutil battery function
-            logger.debug(f"Battery info retrieved: {battery}")
+            logger.debug("Battery info retrieved: %s", battery)
+
+            # Servers and desktops have no battery; report that instead of failing
+            if battery is None:
+                logger.info("No battery detected.")
+                return {
+                    'Battery Usage Statistics': {
+                        'Status': 'No battery detected.',
+                        'Generated Time & Date': f'{TimeStampGenerator().generate_report()}'
+                    }
+                }
 
             # Convert time if battery time left is available
             remaining_battery_time = TimeStampGenerator().convertTime(battery.secsleft)
-            logger.debug(f"Remaining battery time: {remaining_battery_time}")
+            logger.debug("Remaining battery time: %s", remaining_battery_time)
 
             # Prepare the statistics
             statistics = {
@@ -48,15 +45,30 @@ class BatteryManager:
             }
             logger.info("Battery statistics prepared.")
 
-            # Convert statistics to JSON string
-            result = json.dumps(statistics, indent=4)
-            json_output = json.loads(result)
-            logger.info("Battery statistics successfully converted to JSON format.")
-
-            return json_output  # Return the JSON output as a string
+            return statistics
 
         except Exception as e:
             logger.error(f"Error during battery management: {e}")
             sys.exit(1)
 
-print(BatteryManager().batteryManagement())
\ No newline at end of file
+    @staticmethod
+    def raw_report():
+        try:
+            logger.info("Started raw battery statistics collection.")
+            battery = psutil.sensors_battery()
+            if battery is None:
+                return BatteryReport(timestamp=time.time(), present=False, percent=None, power_plugged=None, secs_left=None)
+
+            # psutil reports unknown/unlimited remaining time as negative sentinels
+            secs_left = battery.secsleft if battery.secsleft >= 0 else None
+            return BatteryReport(
+                timestamp=time.time(),
+                present=True,
+                percent=battery.percent,
+                power_plugged=battery.power_plugged,
+                secs_left=secs_left,
+            )
+
+        except Exception as e:
+            logger.error(f"Error during raw battery collection: {e}")
+            sys.exit(1)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+"""Micro-benchmarks for every collector and the all-in-one report.
+
+Collectors run against a synthetic host (see ``fake_psutil.FakeHost``) so
+that results depend on the code and the chosen scale, not on the machine's
+current processes and sockets. For each case the script reports:
+
+- latency: median and p95 of ``--repeat`` timed runs after ``--warmup`` runs
+- peak: the largest amount of memory traced by tracemalloc during one run
+- retained: memory and blocks still allocated after that run (mostly the report)
+
+Results are compared against ``benchmarks/baselines/<preset>.json`` (or
+``--baseline``); the script exits with status 1 when a case got slower or
+needs more memory than the baseline allows. ``--save-baseline`` records the
+current results instead.
+
+Usage: python benchmarks/collector_bench.py [--preset large] [--only network,disk] [--save-baseline]
+"""
+
+import argparse
+import atexit
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from fake_psutil import PRESETS, REPO_ROOT, FakeHost
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# Differences below these are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 0.5
+MIN_MEMORY_DELTA_KIB = 64
+
+
+def build_cases(only=None):
+    """Return (case name, callable) for every supported collector, in both formats, and the all-in-one report."""
+    from collectors import registry
+    from sys_analyze_api import SystemAnalyzer
+
+    cases = []
+    for collector in registry:
+        if only and collector.name not in only:
+            continue
+        if not collector.is_supported():
+            print(f'skipping {collector.name}: not supported on the fake host', file=sys.stderr)
+            continue
+        cases.append((collector.name, lambda collector=collector: collector.collect()))
+        cases.append((f'{collector.name}[raw]', lambda collector=collector: collector.collect(raw=True)))
+        if collector.name == 'process':
+            # Every optional per-process attribute, read in the same table walk
+            cases.append(('process[attrs]', lambda collector=collector: collector.collect(fields=collector.fields)))
+    if not only or 'all_in_one' in only:
+        cases.append(('all_in_one', lambda: SystemAnalyzer.all_in_one()))
+        cases.append(('all_in_one[raw]', lambda: SystemAnalyzer.all_in_one(raw=True)))
+    return cases
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def measure(case, repeat, warmup):
+    """Time ``case`` and trace the memory of one extra run."""
+    for _ in range(warmup):
+        case()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        case()
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = case()
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = snapshot.statistics('filename')
+    del result
+
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+        'peak_kib': round(peak / 1024, 1),
+        'retained_kib': round(sum(stat.size for stat in retained) / 1024, 1),
+        'retained_blocks': sum(stat.count for stat in retained),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric, unit, floor in (('median_ms', 'ms', MIN_LATENCY_DELTA_MS), ('peak_kib', 'KiB', MIN_MEMORY_DELTA_KIB)):
+            current, before = result[metric], previous[metric]
+            if current > before * (1 + tolerance) and current - before > floor:
+                regressions.append(f'{name}: {metric} {current} {unit} vs baseline {before} {unit} '
+                                   f'(+{(current / before - 1) * 100 if before else float("inf"):.0f}%)')
+    return regressions
+
+
+def print_table(results, baseline):
+    header = f'{"case":<18} {"median ms":>10} {"p95 ms":>10} {"peak KiB":>11} {"retained KiB":>13} {"blocks":>9} {"vs base":>8}'
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        previous = baseline.get(name)
+        change = ''
+        if previous and previous['median_ms']:
+            change = f'{(result["median_ms"] / previous["median_ms"] - 1) * 100:+.0f}%'
+        print(f'{name:<18} {result["median_ms"]:>10.3f} {result["p95_ms"]:>10.3f} {result["peak_kib"]:>11.1f} '
+              f'{result["retained_kib"]:>13.1f} {result["retained_blocks"]:>9} {change:>8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='large', help='host size (default: large)')
+    for name in ('processes', 'sockets', 'mounts', 'nics', 'cpus'):
+        parser.add_argument(f'--{name}', type=int, help=f'override the number of {name} of the preset')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic host (default: 0)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per case (default: 5)')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed runs per case (default: 1)')
+    parser.add_argument('--only', help='comma-separated collector names (and/or all_in_one) to run')
+    parser.add_argument('--baseline', help='baseline file (default: benchmarks/baselines/<preset>.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown/growth over the baseline as a fraction (default: 0.25)')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    scale = dict(PRESETS[args.preset])
+    for name in scale:
+        if getattr(args, name) is not None:
+            scale[name] = getattr(args, name)
+    # Resolved before moving to the scratch directory below
+    baseline_path = os.path.abspath(args.baseline or os.path.join(BASELINE_DIR, f'{args.preset}.json'))
+    json_path = os.path.abspath(args.json) if args.json else None
+    only = set(args.only.split(',')) if args.only else None
+
+    # Logs and archives of the analyzer go to a scratch directory, not the checkout
+    workdir = tempfile.mkdtemp(prefix='collector-bench-')
+    # Registered before the analyzer starts its log writer, so it runs after the writer stopped
+    atexit.register(shutil.rmtree, workdir, True)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    print(f'Synthesizing host: {", ".join(f"{count} {name}" for name, count in scale.items())}', file=sys.stderr)
+    host = FakeHost(seed=args.seed, **scale)
+    host.install()
+    try:
+        from cpu_sampler import CPUSampler
+        # Two samples from the fake host so the CPU report never waits for the sampler
+        sampler = CPUSampler.shared()
+        sampler.sample()
+        sampler.sample()
+        sampler.sample_cores()
+        sampler.sample_cores()
+
+        results = {}
+        for name, case in build_cases(only):
+            print(f'running {name}', file=sys.stderr)
+            results[name] = measure(case, args.repeat, args.warmup)
+    finally:
+        host.uninstall()
+
+    baseline = {}
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path) as baseline_file:
+            stored = json.load(baseline_file)
+        if stored.get('scale') == scale:
+            baseline = stored['results']
+        else:
+            print(f'Baseline {baseline_path} was recorded at another scale; not comparing.', file=sys.stderr)
+
+    print_table(results, baseline)
+
+    document = {
+        'scale': scale,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'recorded': time.strftime('%Y-%m-%d'),
+        'results': results,
+    }
+    if json_path:
+        with open(json_path, 'w') as output:
+            json.dump(document, output, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, 'w') as output:
+            json.dump(document, output, indent=2)
+            output.write('\n')
+        print(f'Baseline written to {baseline_path}.')
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+
+"""Deterministic fake psutil/netifaces backend for benchmarks.
+
+``FakeHost`` synthesizes a host at a chosen scale (processes, sockets,
+mounts, NICs, CPUs) from a seed, and ``install()`` makes the analyzer
+modules read from it instead of the real system:
+
+    host = FakeHost(**PRESETS['large'])
+    host.install()
+    ...
+    host.uninstall()
+
+Static tables (processes, sockets, mounts, interfaces) are generated once;
+each call returns fresh containers the way psutil does, so collectors pay
+for the records they build but not for generating the fake host. Counters
+(CPU times, network and disk I/O) advance by a fixed step on every call,
+so samplers see steady, reproducible rates.
+"""
+
+import collections
+import os
+import random
+import socket
+import sys
+import types
+
+import psutil as real_psutil
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Host sizes used by the benchmarks
+PRESETS = {
+    'small': dict(processes=500, sockets=2000, mounts=10, nics=4, cpus=4),
+    'medium': dict(processes=5000, sockets=20000, mounts=50, nics=16, cpus=8),
+    'large': dict(processes=50000, sockets=200000, mounts=300, nics=64, cpus=32),
+}
+
+# Same names and fields as psutil's result types
+scputimes = collections.namedtuple('scputimes', ['user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq',
+                                                 'steal', 'guest', 'guest_nice'])
+scpufreq = collections.namedtuple('scpufreq', ['current', 'min', 'max'])
+scpustats = collections.namedtuple('scpustats', ['ctx_switches', 'interrupts', 'soft_interrupts', 'syscalls'])
+svmem = collections.namedtuple('svmem', ['total', 'available', 'percent', 'used', 'free', 'active', 'inactive',
+                                         'buffers', 'cached', 'shared', 'slab'])
+sswap = collections.namedtuple('sswap', ['total', 'used', 'free', 'percent', 'sin', 'sout'])
+sdiskpart = collections.namedtuple('sdiskpart', ['device', 'mountpoint', 'fstype', 'opts'])
+sdiskusage = collections.namedtuple('sdiskusage', ['total', 'used', 'free', 'percent'])
+sdiskio = collections.namedtuple('sdiskio', ['read_count', 'write_count', 'read_bytes', 'write_bytes', 'read_time',
+                                             'write_time', 'read_merged_count', 'write_merged_count', 'busy_time'])
+snetio = collections.namedtuple('snetio', ['bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv', 'errin',
+                                           'errout', 'dropin', 'dropout'])
+snicstats = collections.namedtuple('snicstats', ['isup', 'duplex', 'speed', 'mtu', 'flags'])
+snicaddr = collections.namedtuple('snicaddr', ['family', 'address', 'netmask', 'broadcast', 'ptp'])
+sconn = collections.namedtuple('sconn', ['fd', 'family', 'type', 'laddr', 'raddr', 'status', 'pid'])
+addr = collections.namedtuple('addr', ['ip', 'port'])
+suser = collections.namedtuple('suser', ['name', 'terminal', 'host', 'started', 'pid'])
+sbattery = collections.namedtuple('sbattery', ['percent', 'secsleft', 'power_plugged'])
+pmem = collections.namedtuple('pmem', ['rss', 'vms', 'shared', 'text', 'lib', 'data', 'dirty'])
+
+GIB = 1024 ** 3
+
+# netifaces address family constants on Linux
+NETIFACES_AF_INET = 2
+NETIFACES_AF_INET6 = 10
+NETIFACES_AF_LINK = 17
+
+
+class _FakeProcess:
+    """What process_iter yields: a pid and the requested attributes under ``info``."""
+
+    __slots__ = ('pid', 'info')
+
+    def __init__(self, pid, info):
+        self.pid = pid
+        self.info = info
+
+
+class FakeHost:
+    """A synthetic host exposing the psutil and netifaces calls the analyzer makes."""
+
+    BOOT_TIME = 1700000000.0
+
+    def __init__(self, processes=500, sockets=2000, mounts=10, nics=4, cpus=4, users=3,
+                 battery=False, seed=0, resolvable=('127.0.0.1', 'localhost', 'www.google.com')):
+        self.scale = dict(processes=processes, sockets=sockets, mounts=mounts, nics=nics, cpus=cpus)
+        self.cpus = cpus
+        self.battery = battery
+        self.resolvable = set(resolvable)
+        self._ticks = collections.Counter()
+        rng = random.Random(seed)
+
+        self._processes = [self._make_process(rng, index) for index in range(processes)]
+        self._pids = [process['pid'] for process in self._processes]
+        self._partitions, self._usage = self._make_mounts(rng, mounts)
+        self._nics = ['lo'] + [f'eth{index}' for index in range(max(nics - 1, 0))]
+        self._connections = [self._make_connection(rng, index) for index in range(sockets)]
+        self._users = [suser(f'user{index}', f'pts/{index}', '10.0.0.1', self.BOOT_TIME + index * 60, 1000 + index)
+                       for index in range(users)]
+        self._disks = sorted({partition.device.rsplit('/', 1)[-1] for partition in self._partitions})
+
+        self.psutil = self._build_psutil_module()
+        self.netifaces = self._build_netifaces_module()
+        self.socket = self._build_socket_module()
+        self._saved = None
+
+    # --- synthesis -----------------------------------------------------------------------------
+
+    def _make_process(self, rng, index):
+        pid = index + 1
+        rss = rng.randrange(1, 512) * 1024 * 1024
+        return {
+            'pid': pid,
+            'name': rng.choice(('python3', 'nginx', 'postgres', 'java', 'sshd', 'bash', 'systemd')),
+            'cpu_percent': round(rng.random() * 10, 1),
+            'memory_info': pmem(rss, rss * 3, rss // 4, rss // 8, 0, rss // 2, 0),
+            'username': rng.choice(('root', 'www-data', 'postgres', 'app')),
+            'cmdline': [f'/usr/bin/proc{index % 97}', '--worker', str(index)],
+            'status': rng.choice(('running', 'sleeping', 'sleeping', 'idle')),
+        }
+
+    def _make_mounts(self, rng, mounts):
+        partitions = [sdiskpart('/dev/vda1', '/', 'ext4', 'rw,relatime')]
+        for index in range(1, mounts):
+            device = f'/dev/vd{chr(ord("b") + index % 24)}{index // 24 + 1}'
+            fstype = rng.choice(('ext4', 'xfs', 'btrfs'))
+            partitions.append(sdiskpart(device, f'/mnt/volume{index}', fstype, 'rw,relatime'))
+        usage = {}
+        for partition in partitions:
+            total = rng.randrange(10, 2000) * GIB
+            used = int(total * rng.random())
+            usage[partition.mountpoint] = sdiskusage(total, used, total - used, round(used / total * 100, 1))
+        # psutil.disk_usage also works on device nodes; they live on devtmpfs
+        devtmpfs = sdiskusage(4 * GIB, 0, 4 * GIB, 0.0)
+        for partition in partitions:
+            usage.setdefault(partition.device, devtmpfs)
+        return partitions, usage
+
+    def _make_connection(self, rng, index):
+        family = socket.AF_INET if index % 4 else socket.AF_INET6
+        socket_type = socket.SOCK_STREAM if index % 3 else socket.SOCK_DGRAM
+        local_ip = '10.0.0.2' if family == socket.AF_INET else 'fe80::2'
+        laddr = addr(local_ip, 1024 + index % 60000)
+        if socket_type == socket.SOCK_STREAM and index % 5:
+            remote_ip = f'10.{index % 250}.{index // 250 % 250}.{index % 7 + 1}' if family == socket.AF_INET else 'fe80::1'
+            raddr = addr(remote_ip, 443)
+            status = real_psutil.CONN_ESTABLISHED
+        else:
+            raddr = ()
+            status = real_psutil.CONN_LISTEN if socket_type == socket.SOCK_STREAM else real_psutil.CONN_NONE
+        pid = self._pids[index % len(self._pids)] if self._pids else None
+        return sconn(index + 3, family, socket_type, laddr, raddr, status, pid)
+
+    def _tick(self, name):
+        self._ticks[name] += 1
+        return self._ticks[name]
+
+    # --- psutil ----------------------------------------------------------------------------------
+
+    def cpu_times(self, percpu=False):
+        tick = self._tick('cpu_times')
+        if not percpu:
+            cpus = self.cpus
+            return scputimes(600.0 * cpus + tick * 0.25 * cpus, 1.0 * cpus, 200.0 * cpus + tick * 0.1 * cpus,
+                             5000.0 * cpus + tick * 0.6 * cpus, 10.0 * cpus + tick * 0.02 * cpus, 0.0,
+                             2.0 * cpus + tick * 0.01 * cpus, tick * 0.02 * cpus, 0.0, 0.0)
+        # Per-core load differs so that per-core statistics are not all equal
+        return [scputimes(600.0 + tick * (0.1 + 0.3 * core / self.cpus), 1.0, 200.0 + tick * 0.1,
+                          5000.0 + tick * (0.75 - 0.3 * core / self.cpus), 10.0 + tick * 0.02, 0.0,
+                          2.0 + tick * 0.01, tick * 0.02, 0.0, 0.0)
+                for core in range(self.cpus)]
+
+    def cpu_percent(self, interval=None, percpu=False):
+        if percpu:
+            return [round(10.0 + 30.0 * core / self.cpus, 1) for core in range(self.cpus)]
+        return 25.0
+
+    def cpu_count(self, logical=True):
+        return self.cpus if logical else max(self.cpus // 2, 1)
+
+    def cpu_freq(self, percpu=False):
+        freq = scpufreq(2400.0, 800.0, 3600.0)
+        return [freq] * self.cpus if percpu else freq
+
+    def cpu_stats(self):
+        tick = self._tick('cpu_stats')
+        return scpustats(1000000 + tick * 5000, 500000 + tick * 2000, 250000 + tick * 1000, 0)
+
+    def getloadavg(self):
+        return (self.cpus * 0.25, self.cpus * 0.2, self.cpus * 0.15)
+
+    def virtual_memory(self):
+        total = 64 * GIB
+        available = 40 * GIB
+        used = 20 * GIB
+        return svmem(total, available, round((total - available) / total * 100, 1), used, 36 * GIB,
+                     16 * GIB, 4 * GIB, GIB, 6 * GIB, GIB, GIB)
+
+    def swap_memory(self):
+        tick = self._tick('swap_memory')
+        return sswap(8 * GIB, GIB, 7 * GIB, 12.5, tick * 4096, tick * 8192)
+
+    def disk_partitions(self, all=False):
+        return list(self._partitions)
+
+    def disk_usage(self, path):
+        try:
+            return self._usage[path]
+        except KeyError:
+            raise FileNotFoundError(2, 'No such file or directory', path) from None
+
+    def disk_io_counters(self, perdisk=False, nowrap=True):
+        tick = self._tick('disk_io_counters')
+        counters = {
+            disk: sdiskio(tick * 100 + index, tick * 50 + index, tick * 409600, tick * 204800,
+                          tick * 30, tick * 20, tick * 5, tick * 5, tick * 40)
+            for index, disk in enumerate(self._disks)
+        }
+        if perdisk:
+            return counters
+        return sdiskio(*(sum(values) for values in zip(*counters.values())))
+
+    def net_io_counters(self, pernic=False, nowrap=True):
+        tick = self._tick('net_io_counters')
+        counters = {
+            nic: snetio(tick * 125000 * (index + 1), tick * 250000 * (index + 1), tick * 100 * (index + 1),
+                        tick * 200 * (index + 1), tick // 100, 0, tick // 50, 0)
+            for index, nic in enumerate(self._nics)
+        }
+        if pernic:
+            return counters
+        return snetio(*(sum(values) for values in zip(*counters.values())))
+
+    def net_if_stats(self):
+        stats = {'lo': snicstats(True, real_psutil.NIC_DUPLEX_UNKNOWN, 0, 65536, 'up,loopback,running')}
+        for nic in self._nics[1:]:
+            stats[nic] = snicstats(True, real_psutil.NIC_DUPLEX_FULL, 10000, 1500, 'up,broadcast,running,multicast')
+        return stats
+
+    def net_if_addrs(self):
+        addrs = {'lo': [snicaddr(socket.AF_INET, '127.0.0.1', '255.0.0.0', None, None),
+                        snicaddr(socket.AF_INET6, '::1', 'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff', None, None)]}
+        for index, nic in enumerate(self._nics[1:]):
+            addrs[nic] = [
+                snicaddr(socket.AF_INET, f'10.{index}.0.2', '255.255.255.0', f'10.{index}.0.255', None),
+                snicaddr(socket.AF_INET6, f'fe80::{index + 2:x}', 'ffff:ffff:ffff:ffff::', None, None),
+                snicaddr(real_psutil.AF_LINK, f'02:00:00:00:{index // 256:02x}:{index % 256:02x}', None,
+                         'ff:ff:ff:ff:ff:ff', None),
+            ]
+        return addrs
+
+    def net_connections(self, kind='inet'):
+        if kind != 'inet':
+            raise ValueError(f'The fake host only implements kind="inet", not {kind!r}.')
+        return list(self._connections)
+
+    def pids(self):
+        return list(self._pids)
+
+    def process_iter(self, attrs=None, ad_value=None):
+        for process in self._processes:
+            if attrs is None:
+                info = dict(process)
+            else:
+                info = {attr: process.get(attr, ad_value) for attr in attrs}
+            yield _FakeProcess(process['pid'], info)
+
+    def boot_time(self):
+        return self.BOOT_TIME
+
+    def users(self):
+        return list(self._users)
+
+    def sensors_battery(self):
+        if not self.battery:
+            return None
+        return sbattery(87.0, 7200, False)
+
+    def _build_psutil_module(self):
+        module = types.ModuleType('psutil', 'Fake psutil backed by a synthetic host.')
+        for name in ('cpu_times', 'cpu_percent', 'cpu_count', 'cpu_freq', 'cpu_stats', 'getloadavg',
+                     'virtual_memory', 'swap_memory', 'disk_partitions', 'disk_usage', 'disk_io_counters',
+                     'net_io_counters', 'net_if_stats', 'net_if_addrs', 'net_connections', 'pids',
+                     'process_iter', 'boot_time', 'users', 'sensors_battery'):
+            setattr(module, name, getattr(self, name))
+        # Constants and exception types are shared with the real psutil
+        for name in dir(real_psutil):
+            if name.isupper() or name in ('Error', 'NoSuchProcess', 'AccessDenied', 'ZombieProcess', 'TimeoutExpired'):
+                setattr(module, name, getattr(real_psutil, name))
+        module.__version__ = real_psutil.__version__
+        module.fake_host = self
+        return module
+
+    # --- netifaces -------------------------------------------------------------------------------
+
+    def _build_netifaces_module(self):
+        module = types.ModuleType('netifaces', 'Fake netifaces backed by a synthetic host.')
+        module.AF_INET = NETIFACES_AF_INET
+        module.AF_INET6 = NETIFACES_AF_INET6
+        module.AF_LINK = NETIFACES_AF_LINK
+        module.interfaces = lambda: list(self._nics)
+        module.gateways = self._gateways
+        module.ifaddresses = self._ifaddresses
+        return module
+
+    def _gateways(self):
+        routes = [(f'10.{index}.0.1', nic, index == 0) for index, nic in enumerate(self._nics[1:])]
+        default = {NETIFACES_AF_INET: routes[0][:2]} if routes else {}
+        return {'default': default, NETIFACES_AF_INET: routes}
+
+    def _ifaddresses(self, interface):
+        families = {NETIFACES_AF_INET: socket.AF_INET, NETIFACES_AF_INET6: socket.AF_INET6,
+                    NETIFACES_AF_LINK: real_psutil.AF_LINK}
+        result = {}
+        for netifaces_family, psutil_family in families.items():
+            entries = [{'addr': entry.address, 'netmask': entry.netmask, 'broadcast': entry.broadcast}
+                       for entry in self.net_if_addrs().get(interface, []) if entry.family == psutil_family]
+            if entries:
+                result[netifaces_family] = entries
+        return result
+
+    # --- DNS -------------------------------------------------------------------------------------
+
+    def gethostbyname(self, hostname):
+        if hostname not in self.resolvable:
+            raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        return '127.0.0.1' if hostname in ('127.0.0.1', 'localhost') else '192.0.2.1'
+
+    def getaddrinfo(self, host, port, *args, **kwargs):
+        address = self.gethostbyname(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', (address, port or 0))]
+
+    def _build_socket_module(self):
+        module = types.ModuleType('socket', 'Real socket module with name resolution answered by the fake host.')
+        module.__getattr__ = lambda name: getattr(socket, name)
+        module.gethostbyname = self.gethostbyname
+        module.getaddrinfo = self.getaddrinfo
+        return module
+
+    # --- installation ----------------------------------------------------------------------------
+
+    @staticmethod
+    def _repo_modules():
+        """Analyzer modules already imported from the repository root."""
+        for module in list(sys.modules.values()):
+            path = getattr(module, '__file__', None)
+            if path and os.path.dirname(os.path.abspath(path)) == REPO_ROOT:
+                yield module
+
+    def install(self):
+        """Route psutil, netifaces and DNS lookups of the analyzer modules to this host."""
+        if self._saved is not None:
+            return
+        self._saved = {'modules': {name: sys.modules.get(name) for name in ('psutil', 'netifaces')}, 'globals': []}
+        sys.modules['psutil'] = self.psutil
+        sys.modules['netifaces'] = self.netifaces
+
+        # Collectors import their managers lazily; load them now so they can be patched below
+        from collectors import registry
+        for collector in registry:
+            collector.load()
+
+        replacements = {'psutil': self.psutil, 'netifaces': self.netifaces, 'socket': self.socket}
+        for module in self._repo_modules():
+            for name, replacement in replacements.items():
+                if name in vars(module):
+                    self._saved['globals'].append((module, name, vars(module)[name]))
+                    setattr(module, name, replacement)
+
+    def uninstall(self):
+        """Restore the real modules."""
+        if self._saved is None:
+            return
+        for module, name, original in reversed(self._saved['globals']):
+            setattr(module, name, original)
+        for name, module in self._saved['modules'].items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        self._saved = None
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+
+"""End-to-end load test of ``GET /report``.
+
+Starts ``App`` against a synthetic host (see ``fake_psutil.FakeHost``),
+drives it with ``--concurrency`` clients issuing a weighted mix of report
+requests, and prints throughput, per-report latency percentiles, a latency
+histogram and the time spent in the rate limiter.
+
+Serving modes:
+
+- ``test-client``: requests go through Flask's test client in-process; this
+  measures the application without sockets.
+- ``http``: the app is served by werkzeug's threaded server on loopback and
+  clients connect over HTTP. Each client uses its own 127.0.0.x source
+  address, so it is rate limited as a separate IP.
+
+Usage: python benchmarks/load_test.py [--mode http] [--concurrency 16] [--duration 10]
+                                      [--mix 1:4,3:4,5:1,all_in_one:1] [--rate-limit]
+"""
+
+import argparse
+import atexit
+import http.client
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+from fake_psutil import PRESETS, REPO_ROOT, FakeHost
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the last bucket is open
+HISTOGRAM_BOUNDS_MS = (0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+DEFAULT_MIX = '1:4,2:1,3:4,4:2,5:1,6:1,all_in_one:1'
+
+
+def parse_mix(spec, registry):
+    """Parse ``id[/format]:weight,...`` into (label, query string, weight) entries."""
+    entries = []
+    for item in spec.split(','):
+        target, _, weight = item.strip().partition(':')
+        report, _, report_format = target.partition('/')
+        report_format = report_format or 'text'
+        if report == 'all_in_one':
+            query = f'type=all_in_one&format={report_format}'
+        else:
+            collector = registry.by_id(int(report))
+            query = f'type=single_report&id={collector.report_id}&format={report_format}'
+            report = collector.name
+        label = report if report_format == 'text' else f'{report}/{report_format}'
+        entries.append((label, f'/report?{query}', float(weight or 1)))
+    return entries
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class Recorder:
+    """Per-client request log, merged once the run is over."""
+
+    def __init__(self):
+        self.samples = []  # (label, status, seconds)
+
+    def add(self, label, status, seconds):
+        self.samples.append((label, status, seconds))
+
+
+class TimedRateLimiter:
+    """Wraps the app's rate limiter to measure the time spent in check_and_update."""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.timings = []
+        self._lock = threading.Lock()
+
+    def check_and_update(self, ip, cost=1):
+        started = time.perf_counter()
+        allowed = self.limiter.check_and_update(ip, cost)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.timings.append(elapsed)
+        return allowed
+
+    def __getattr__(self, name):
+        return getattr(self.limiter, name)
+
+
+def client_loop(send, entries, recorder, deadline, seed):
+    rng = random.Random(seed)
+    labels = [entry[:2] for entry in entries]
+    weights = [entry[2] for entry in entries]
+    while time.monotonic() < deadline:
+        label, path = rng.choices(labels, weights)[0]
+        started = time.perf_counter()
+        try:
+            status = send(path)
+        except Exception:
+            status = 0  # connection failure
+        recorder.add(label, status, time.perf_counter() - started)
+
+
+def flask_client_sender(app, client_index):
+    client = app.app.test_client()
+    environ = {'REMOTE_ADDR': f'127.0.{client_index // 250}.{client_index % 250 + 1}'}
+
+    def send(path):
+        return client.get(path, environ_base=environ).status_code
+    return send
+
+
+def http_sender(port, client_index):
+    source = (f'127.0.{client_index // 250}.{client_index % 250 + 1}', 0)
+
+    def send(path):
+        # The development server speaks HTTP/1.0, so every request uses a new connection
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30, source_address=source)
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+    return send
+
+
+def summarize(samples, elapsed, limiter_timings):
+    by_label = {}
+    for label, status, seconds in samples:
+        by_label.setdefault(label, []).append((status, seconds))
+
+    rows = {}
+    for label, entries in sorted(by_label.items()):
+        latencies = sorted(seconds * 1000 for _, seconds in entries)
+        statuses = {}
+        for status, _ in entries:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        rows[label] = {
+            'count': len(entries),
+            'statuses': statuses,
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p90_ms': round(percentile(latencies, 0.90), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'max_ms': round(latencies[-1], 3),
+        }
+
+    histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for _, _, seconds in samples:
+        milliseconds = seconds * 1000
+        index = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if milliseconds <= bound), len(HISTOGRAM_BOUNDS_MS))
+        histogram[index] += 1
+
+    limiter = sorted(seconds * 1e6 for seconds in limiter_timings)
+    return {
+        'requests': len(samples),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'ok': sum(1 for _, status, _ in samples if status == 200),
+        'reports': rows,
+        'histogram': histogram,
+        'rate_limiter': {
+            'checks': len(limiter),
+            'mean_us': round(sum(limiter) / len(limiter), 2) if limiter else 0.0,
+            'p99_us': round(percentile(limiter, 0.99), 2),
+            'max_us': round(limiter[-1], 2) if limiter else 0.0,
+        },
+    }
+
+
+def print_summary(summary, settings):
+    print(f'mode {settings["mode"]}, {settings["concurrency"]} clients, {settings["duration"]} s, '
+          f'preset {settings["preset"]}, rate limit {"on" if settings["rate_limit"] else "off"}, '
+          f'cache {"on" if settings["cache"] else "off"}')
+    print(f'{summary["requests"]} requests ({summary["ok"]} OK) in {summary["elapsed_s"]} s: '
+          f'{summary["throughput_rps"]} requests/s')
+    print()
+    header = f'{"report":<18} {"count":>8} {"p50 ms":>10} {"p90 ms":>10} {"p99 ms":>10} {"max ms":>10}  statuses'
+    print(header)
+    print('-' * len(header))
+    for label, row in summary['reports'].items():
+        statuses = ' '.join(f'{status}:{count}' for status, count in sorted(row['statuses'].items()))
+        print(f'{label:<18} {row["count"]:>8} {row["p50_ms"]:>10.3f} {row["p90_ms"]:>10.3f} '
+              f'{row["p99_ms"]:>10.3f} {row["max_ms"]:>10.3f}  {statuses}')
+
+    print()
+    print('latency histogram (all requests)')
+    largest = max(summary['histogram']) or 1
+    for index, count in enumerate(summary['histogram']):
+        label = f'<= {HISTOGRAM_BOUNDS_MS[index]:g} ms' if index < len(HISTOGRAM_BOUNDS_MS) else f'>  {HISTOGRAM_BOUNDS_MS[-1]:g} ms'
+        print(f'  {label:>12} {"#" * round(40 * count / largest):<40} {count}')
+
+    limiter = summary['rate_limiter']
+    print()
+    print(f'rate limiter: {limiter["checks"]} checks, mean {limiter["mean_us"]} us, p99 {limiter["p99_us"]} us, '
+          f'max {limiter["max_us"]} us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=('test-client', 'http'), default='test-client', help='serving mode')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small', help='fake host size (default: small)')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients (default: 8)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run (default: 10)')
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f'weighted requests as id[/format]:weight or all_in_one[/format]:weight (default: {DEFAULT_MIX})')
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='keep the per-IP rate limit (each client has its own IP); by default it is lifted')
+    parser.add_argument('--no-cache', action='store_true', help='build every report instead of reusing snapshots')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the request mix and fake host (default: 0)')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    # The app's database, logs and archive live in a scratch directory
+    workdir = tempfile.mkdtemp(prefix='load-test-')
+    atexit.register(shutil.rmtree, workdir, True)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    host = FakeHost(seed=args.seed, **PRESETS[args.preset])
+    host.install()
+
+    from collectors import registry
+    from local_db import Database
+    from rate_limiter import InMemoryRateLimiter
+    from user_api import App, ReportGenerator
+
+    entries = parse_mix(args.mix, registry)
+    Database().create_db()
+    # flask_limiter warns about its in-memory storage, which is what a single agent uses
+    warnings.filterwarnings('ignore', message='Using the in-memory storage', category=UserWarning)
+    app = App()
+
+    if not args.rate_limit:
+        app.rate_limiter.stop()
+        app.rate_limiter = InMemoryRateLimiter(limit=10 ** 9, window=60)
+    timed_limiter = app.rate_limiter = TimedRateLimiter(app.rate_limiter)
+
+    if args.no_cache:
+        for collector in registry:
+            collector.ttl = 0
+        ReportGenerator.ALL_IN_ONE_TTL = 0
+
+    server = None
+    if args.mode == 'http':
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietRequestHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        server = make_server('127.0.0.1', 0, app.app, threaded=True, request_handler=QuietRequestHandler)
+        threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True).start()
+        senders = [http_sender(server.server_port, index) for index in range(args.concurrency)]
+    else:
+        senders = [flask_client_sender(app, index) for index in range(args.concurrency)]
+
+    # Let the CPU sampler take its first sample before measuring
+    app.cpu_sampler.latest()
+
+    recorders = [Recorder() for _ in range(args.concurrency)]
+    started = time.monotonic()
+    deadline = started + args.duration
+    clients = [
+        threading.Thread(target=client_loop, args=(senders[index], entries, recorders[index], deadline, args.seed + index),
+                         name=f'load-test-client-{index}')
+        for index in range(args.concurrency)
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.monotonic() - started
+
+    if server is not None:
+        server.shutdown()
+    host.uninstall()
+
+    samples = [sample for recorder in recorders for sample in recorder.samples]
+    summary = summarize(samples, elapsed, timed_limiter.timings)
+    settings = {'mode': args.mode, 'concurrency': args.concurrency, 'duration': args.duration, 'preset': args.preset,
+                'rate_limit': args.rate_limit, 'cache': not args.no_cache, 'mix': args.mix}
+    print_summary(summary, settings)
+    if json_path:
+        with open(json_path, 'w') as output:
+            json.dump({'settings': settings, 'summary': summary}, output, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
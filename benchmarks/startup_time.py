@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""Cold-start benchmark for the analyzer modules.
+
+Each scenario runs in a fresh interpreter so nothing is cached between
+runs. The script exits with status 1 when the median time of a scenario is
+over its budget, or when a scenario imports a module it should not load
+(for example ``netifaces`` when only the memory report is requested).
+
+Usage: python benchmarks/startup_time.py [--runs N] [--budget-scale X]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code run by the child interpreter: time the statement, then report the loaded modules
+CHILD = """
+import sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(elapsed)
+print(' '.join(sorted(sys.modules)))
+"""
+
+# (name, statement, budget in seconds, modules that must not be imported)
+SCENARIOS = (
+    ('import sys_analyze_api', 'import sys_analyze_api', 0.2,
+     ('flask', 'netifaces', 'psutil', 'cpu_management', 'process_management', 'memory_management',
+      'disk_management', 'network_management', 'system_infoAnalyzer', 'battery_management')),
+    ('memory report', 'import sys_analyze_api; sys_analyze_api.SystemAnalyzer.once_status_one_report(3)', 0.3,
+     ('flask', 'netifaces', 'cpu_management', 'process_management', 'disk_management', 'network_management',
+      'battery_management')),
+    ('import user_api', 'import user_api', 1.0, ('netifaces',)),
+)
+
+
+def run_scenario(statement, workdir):
+    """Run one statement in a fresh interpreter; return (seconds, loaded module names)."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, PYTHONDONTWRITEBYTECODE='1')
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(statement=statement)],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    return float(output[-2]), set(output[-1].split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per scenario (default: 5)')
+    parser.add_argument('--budget-scale', type=float, default=1.0,
+                        help='multiply every budget, e.g. 2 on slow CI machines (default: 1)')
+    args = parser.parse_args()
+
+    failures = []
+    # Run in a scratch directory so log files and databases do not land in the checkout
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, statement, budget, forbidden in SCENARIOS:
+            budget *= args.budget_scale
+            timings = []
+            loaded = set()
+            for _ in range(args.runs):
+                elapsed, modules = run_scenario(statement, workdir)
+                timings.append(elapsed)
+                loaded |= modules
+
+            median = statistics.median(timings)
+            unexpected = sorted(module for module in forbidden if module in loaded)
+            print(f'{name:<24} median {median * 1000:8.1f} ms   max {max(timings) * 1000:8.1f} ms   '
+                  f'budget {budget * 1000:8.1f} ms')
+            if median > budget:
+                failures.append(f'{name}: median {median * 1000:.1f} ms is over the {budget * 1000:.1f} ms budget')
+            if unexpected:
+                failures.append(f'{name}: imported {", ".join(unexpected)}')
+
+    for failure in failures:
+        print(f'FAIL {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+import contextvars
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+# Upper bounds (milliseconds) of the latency buckets; the last bucket is open
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Timings of the request being served, for its Server-Timing header; None outside a request
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; recording is a bisect and a few increments.
+
+    Percentiles are estimated from the buckets when they are read, by
+    interpolating linearly inside the bucket that holds the rank.
+    """
+
+    def __init__(self, bounds_ms=BUCKET_BOUNDS_MS):
+        self.bounds_ms = bounds_ms
+        self.counts = array('L', [0]) * (len(bounds_ms) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.min_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, milliseconds, failed=False):
+        index = bisect_left(self.bounds_ms, milliseconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ms += milliseconds
+            if failed:
+                self.errors += 1
+            if milliseconds < self.min_ms or self.count == 1:
+                self.min_ms = milliseconds
+            if milliseconds > self.max_ms:
+                self.max_ms = milliseconds
+
+    def percentile(self, fraction, counts=None, count=None, min_ms=None, max_ms=None):
+        """Estimate the ``fraction`` percentile in milliseconds."""
+        counts = self.counts if counts is None else counts
+        count = self.count if count is None else count
+        min_ms = self.min_ms if min_ms is None else min_ms
+        max_ms = self.max_ms if max_ms is None else max_ms
+        if not count:
+            return 0.0
+        rank = fraction * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds_ms[index - 1] if index else 0.0
+                upper = self.bounds_ms[index] if index < len(self.bounds_ms) else max_ms
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                # No sample lies outside [min, max], whatever the bucket width
+                return min(max(estimate, min_ms), max_ms)
+            seen += bucket_count
+        return max_ms
+
+    def summary(self):
+        with self._lock:
+            counts = array('L', self.counts)
+            count, errors, total_ms = self.count, self.errors, self.total_ms
+            min_ms, max_ms = self.min_ms, self.max_ms
+        return {
+            'count': count,
+            'errors': errors,
+            'mean_ms': round(total_ms / count, 3) if count else 0.0,
+            'min_ms': round(min_ms, 3),
+            'p50_ms': round(self.percentile(0.50, counts, count, min_ms, max_ms), 3),
+            'p95_ms': round(self.percentile(0.95, counts, count, min_ms, max_ms), 3),
+            'p99_ms': round(self.percentile(0.99, counts, count, min_ms, max_ms), 3),
+            'max_ms': round(max_ms, 3),
+            'buckets': list(counts),
+        }
+
+
+class TimingRegistry:
+    """Latency histograms by name, and the timings of the request in progress."""
+
+    def __init__(self, bounds_ms=BUCKET_BOUNDS_MS):
+        self.bounds_ms = bounds_ms
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram(self.bounds_ms))
+        return histogram
+
+    def record(self, name, seconds, failed=False):
+        milliseconds = seconds * 1000
+        self.histogram(name).record(milliseconds, failed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, milliseconds))
+
+    def time(self, name):
+        """Context manager timing a block with the monotonic clock."""
+        return _Timer(self, name)
+
+    def summary(self):
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {
+            'bucket_bounds_ms': list(self.bounds_ms),
+            'timings': {name: histograms[name].summary() for name in sorted(histograms)},
+        }
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    @staticmethod
+    def start_request():
+        """Collect the timings recorded while serving the current request.
+
+        Work handed to other threads sees the list only if it runs in a copy
+        of the caller's context (``contextvars.copy_context().run``).
+        Returns a token for ``end_request``.
+        """
+        timings = []
+        return timings, _request_timings.set(timings)
+
+    @staticmethod
+    def end_request(token):
+        timings, context_token = token
+        _request_timings.reset(context_token)
+        return timings
+
+    @staticmethod
+    def server_timing(timings, total_seconds=None):
+        """Format timings as a ``Server-Timing`` header value."""
+        entries = [f'{name};dur={milliseconds:.3f}' for name, milliseconds in timings]
+        if total_seconds is not None:
+            entries.append(f'total;dur={total_seconds * 1000:.3f}')
+        return ', '.join(entries)
+
+
+class _Timer:
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.registry.record(self.name, time.monotonic() - self.started, failed=exc_type is not None)
+        return False
+
+
+# Shared by the collectors, the all-in-one report and the API
+timings = TimingRegistry()
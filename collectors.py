@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+import importlib
+import platform
+import threading
+from report_schema import to_raw
+from collector_timings import timings
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+
+class Collector:
+    """A report section and the metadata used to schedule, cache and charge for it.
+
+    ``manager`` is either the manager class or a ``'module:ClassName'``
+    string; strings are imported on first use so that importing the
+    registry does not import psutil-heavy managers or optional dependencies
+    such as netifaces.
+
+    ``cost`` is the estimated expense in rate limit units, ``ttl`` how long
+    (seconds) a built report is reused, ``deadline`` how long the all-in-one
+    report waits for it, and ``supported`` an optional predicate telling
+    whether the collector can run on this host. ``options`` are the keyword
+    arguments the manager is built with.
+
+    Managers that list their sub-collections in a ``FIELDS`` class attribute
+    accept ``fields=`` in their text report method and skip the ones that
+    were not requested.
+    """
+
+    def __init__(self, name, title, manager, report_method, raw_method='raw_report',
+                 report_id=None, cost=1, ttl=2.0, deadline=5.0, supported=None, options=None):
+        self.name = name
+        self.title = title
+        self.manager = manager
+        self.report_method = report_method
+        self.raw_method = raw_method
+        self.report_id = report_id
+        self.cost = cost
+        self.ttl = ttl
+        self.deadline = deadline
+        self._supported = supported
+        self.options = dict(options or {})
+        self._is_supported = None
+
+    def load(self):
+        """Import the manager module if needed and return the manager class."""
+        manager = self.manager
+        if isinstance(manager, str):
+            logger.debug("Loading collector %s from %s.", self.name, manager)
+            module_name, _, class_name = manager.partition(':')
+            manager = self.manager = getattr(importlib.import_module(module_name), class_name)
+        return manager
+
+    def is_supported(self):
+        """Return whether the collector can run on this host; checked once per process."""
+        if self._is_supported is None:
+            try:
+                self._is_supported = bool(self._supported()) if self._supported is not None else True
+            except Exception as e:
+                logger.warning(f"Capability check for collector '{self.name}' failed: {e}")
+                self._is_supported = False
+        return self._is_supported
+
+    @property
+    def fields(self):
+        """Sub-collections the text report can be narrowed to; empty if it cannot."""
+        return tuple(getattr(self.load(), 'FIELDS', ()))
+
+    def collect(self, raw=False, fields=None):
+        """Run the collector and return its text report, or its ``format=raw`` payload.
+
+        ``fields`` narrows the text report to the given sub-collections.
+        Every run is timed into the collector's latency histogram.
+        """
+        manager = self.load()
+        with timings.time(self.name):
+            manager = manager(**self.options)
+            if raw:
+                return to_raw(getattr(manager, self.raw_method)())
+            if fields is None:
+                return getattr(manager, self.report_method)()
+            return getattr(manager, self.report_method)(fields=fields)
+
+
+class CollectorRegistry:
+    """Ordered set of collectors, looked up by name or report ID."""
+
+    def __init__(self):
+        self._collectors = {}
+        self._by_id = {}
+        self._lock = threading.Lock()
+
+    def register(self, collector):
+        """Add a collector; it gets the next free report ID unless it declares one."""
+        with self._lock:
+            if collector.name in self._collectors:
+                raise ValueError(f'Collector {collector.name!r} is already registered.')
+            if collector.report_id is None:
+                collector.report_id = max(self._by_id, default=0) + 1
+            elif collector.report_id in self._by_id:
+                raise ValueError(f'Report ID {collector.report_id} is already used by {self._by_id[collector.report_id].name!r}.')
+            self._collectors[collector.name] = collector
+            self._by_id[collector.report_id] = collector
+        logger.debug("Registered collector %s with report ID %s.", collector.name, collector.report_id)
+        return collector
+
+    def unregister(self, name):
+        with self._lock:
+            collector = self._collectors.pop(name, None)
+            if collector is not None:
+                del self._by_id[collector.report_id]
+        return collector
+
+    def get(self, name):
+        try:
+            return self._collectors[name]
+        except KeyError:
+            raise ValueError(f'Unknown collector: {name!r}.') from None
+
+    def by_id(self, report_id):
+        try:
+            return self._by_id[report_id]
+        except (KeyError, TypeError):
+            raise ValueError(f'Invalid report ID: {report_id!r}. Valid IDs are {self.describe_ids()}.') from None
+
+    def report_ids(self):
+        return sorted(self._by_id)
+
+    def describe_ids(self):
+        """Human-readable list of the valid report IDs, e.g. ``1-7``."""
+        ids = self.report_ids()
+        if ids and ids == list(range(ids[0], ids[-1] + 1)):
+            return f'{ids[0]}-{ids[-1]}' if len(ids) > 1 else str(ids[0])
+        return ', '.join(str(report_id) for report_id in ids)
+
+    def names(self):
+        return list(self._collectors)
+
+    def parse_fields(self, spec):
+        """Parse a projection such as ``network.traffic,disk.usage``.
+
+        Returns ``{collector name: fields}`` in registry order, where fields
+        is a tuple of sub-collections, or None when the whole report was
+        asked for (``fields=network``). Raises ValueError for unknown names.
+        """
+        requested = {}
+        for item in spec.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            name, _, field_name = item.partition('.')
+            collector = self.get(name)
+            if not field_name:
+                requested[name] = None
+            elif field_name not in collector.fields:
+                available = ', '.join(f'{name}.{field}' for field in collector.fields) or 'none'
+                raise ValueError(f'Unknown field {item!r}; {name} provides: {available}.')
+            elif requested.get(name, ()) is not None:
+                requested[name] = requested.get(name, ()) + (field_name,)
+        if not requested:
+            raise ValueError('No fields were selected.')
+
+        selection = {}
+        for name in self._collectors:
+            if name in requested:
+                chosen = requested[name]
+                # Keep the manager's order and drop duplicates
+                selection[name] = None if chosen is None else tuple(field for field in self.get(name).fields if field in chosen)
+        return selection
+
+    def supported(self):
+        """Collectors that can run on this host, in registration order."""
+        return [collector for collector in self if collector.is_supported()]
+
+    def __iter__(self):
+        return iter(list(self._collectors.values()))
+
+
+def _has_battery():
+    import psutil
+    sensors_battery = getattr(psutil, 'sensors_battery', None)
+    return sensors_battery is not None and sensors_battery() is not None
+
+
+def _has_disk_io():
+    import psutil
+    # Containers without /proc/diskstats raise, hosts without disks return nothing
+    return bool(psutil.disk_io_counters(perdisk=True))
+
+
+def _has_win32_edition():
+    # The system report reads the Windows edition; platform only provides it from Python 3.8
+    return hasattr(platform, 'win32_edition')
+
+
+# Optional per-process attributes (see ProcessManager.ATTRIBUTES) read by every process report,
+# raw ones included; text reports can add others with fields=process.cpu,process.rss,...
+PROCESS_ATTRS = ()
+
+# Collectors of the built-in reports, registered in report ID order
+registry = CollectorRegistry()
+registry.register(Collector('cpu', 'CPU Usage Statistics', 'cpu_management:CPUManager', 'monitor_cpu',
+                            report_id=1, cost=1, ttl=1.0, deadline=5.0))
+registry.register(Collector('process', 'System Processes Statistics', 'process_management:ProcessManager', 'manage_processes',
+                            report_id=2, cost=2, ttl=2.0, deadline=10.0, options={'attrs': PROCESS_ATTRS}))
+registry.register(Collector('memory', 'Memory Usage Statistics', 'memory_management:MemoryManager', 'memory_statistics',
+                            report_id=3, cost=1, ttl=1.0, deadline=5.0))
+registry.register(Collector('disk', 'Disk Statistics', 'disk_management:DiskManager', 'manage_disk',
+                            report_id=4, cost=1, ttl=5.0, deadline=10.0))
+registry.register(Collector('network', 'Network Usage Statistics', 'network_management:NetworkManager', 'network_report',
+                            report_id=5, cost=2, ttl=2.0, deadline=10.0))
+registry.register(Collector('system', 'System Info Statistics', 'system_infoAnalyzer:SystemInformation', 'system_info',
+                            report_id=6, cost=1, ttl=30.0, deadline=5.0, supported=_has_win32_edition))
+registry.register(Collector('battery', 'Battery Usage Statistics', 'battery_management:BatteryManager', 'batteryManagement',
+                            report_id=7, cost=1, ttl=10.0, deadline=5.0, supported=_has_battery))
+registry.register(Collector('disk_io', 'Disk I/O Statistics', 'disk_io_management:DiskIOManager', 'io_report',
+                            report_id=8, cost=1, ttl=1.0, deadline=5.0, supported=_has_disk_io))
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import collections
+import socket
+import threading
+import time
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+# Probe methods: 'dns' resolves the host, 'tcp' opens (and closes) a connection to host:port
+PROBE_METHODS = ('dns', 'tcp')
+
+# Defaults of the built-in probes: (name, host, method, port)
+DEFAULT_PROBES = (
+    ('localhost', '127.0.0.1', 'dns', None),
+    ('internet', 'www.google.com', 'dns', None),
+)
+DEFAULT_PROBE_TIMEOUT = 2.0
+DEFAULT_PROBE_INTERVAL = 30.0
+
+# Outcome of one probe run; checked_at is epoch seconds, latency and error are None when not applicable
+ProbeResult = collections.namedtuple('ProbeResult', ['ok', 'checked_at', 'latency', 'error'])
+
+
+class ConnectivityProbe:
+    """One connectivity check: a target host, how to reach it and how often.
+
+    ``resolver`` replaces ``socket.getaddrinfo`` for the 'dns' method, so a
+    stand-in resolver can answer instead of the system's; 'tcp' probes can
+    be pointed at a local listener with ``host`` and ``port``.
+    """
+
+    def __init__(self, name, host, method='dns', port=None, timeout=DEFAULT_PROBE_TIMEOUT,
+                 interval=DEFAULT_PROBE_INTERVAL, resolver=None):
+        if method not in PROBE_METHODS:
+            raise ValueError(f"Unknown probe method: {method!r}. Must be one of {', '.join(PROBE_METHODS)}.")
+        if method == 'tcp' and port is None:
+            raise ValueError(f"Probe '{name}' uses the tcp method and needs a port.")
+        if timeout <= 0 or interval <= 0:
+            raise ValueError('Probe timeout and interval must be greater than zero.')
+        self.name = name
+        self.host = host
+        self.method = method
+        self.port = port
+        self.timeout = timeout
+        self.interval = interval
+        self.resolver = resolver
+        # A lookup that outlived its timeout; the next one waits until it returns
+        self._pending_lookup = None
+
+    def _resolve(self):
+        """Resolve the host on a helper thread, giving up after the timeout.
+
+        Name resolution has no timeout of its own, so a hung resolver only
+        keeps the helper thread busy; no new lookup starts until it returns.
+        """
+        if self._pending_lookup is not None and self._pending_lookup.is_alive():
+            raise TimeoutError(f'previous lookup of {self.host} is still pending')
+
+        outcome = {}
+
+        def lookup():
+            try:
+                outcome['addresses'] = (self.resolver or socket.getaddrinfo)(self.host, None)
+            except Exception as e:
+                outcome['error'] = e
+
+        thread = threading.Thread(target=lookup, name=f'probe-{self.name}-lookup', daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if thread.is_alive():
+            self._pending_lookup = thread
+            raise TimeoutError(f'lookup of {self.host} timed out after {self.timeout} seconds')
+        if 'error' in outcome:
+            raise outcome['error']
+
+    def _connect(self):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout):
+            pass
+
+    def run(self):
+        """Run the probe once and return its ProbeResult; never raises."""
+        started = time.monotonic()
+        try:
+            if self.method == 'dns':
+                self._resolve()
+            else:
+                self._connect()
+            return ProbeResult(True, time.time(), time.monotonic() - started, None)
+        except Exception as e:
+            return ProbeResult(False, time.time(), None, f'{type(e).__name__}: {e}')
+
+
+def make_probe(probe):
+    """Return ``probe`` as a ConnectivityProbe; settings are given as a dict of its arguments.
+
+    For example ``{'name': 'internet', 'host': '10.0.0.53', 'method': 'tcp', 'port': 53, 'timeout': 1}``.
+    """
+    return probe if isinstance(probe, ConnectivityProbe) else ConnectivityProbe(**probe)
+
+
+class ConnectivityMonitor:
+    """Background thread running every probe on its own schedule.
+
+    Reports read the last result of a probe (``result``) instead of
+    probing in the request, so an unreachable resolver never stalls them.
+    ``probes`` are ConnectivityProbe objects or dicts of their arguments;
+    the network report reads the probes named 'localhost' and 'internet'.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, probes=None):
+        self.probes = {}
+        self._results = {}
+        self._next_due = {}
+        self._first_results = {}
+        self._lock = threading.Lock()
+        self._set_probes(probes)
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def shared(cls, probes=None):
+        """Return the process-wide monitor, creating and starting it on first use.
+
+        ``probes`` given once the monitor exists replace its probes (see ``configure``).
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(probes=probes)
+                cls._shared.start()
+            elif probes is not None:
+                cls._shared.configure(probes)
+            return cls._shared
+
+    def _set_probes(self, probes):
+        if probes is None:
+            probes = [ConnectivityProbe(name, host, method, port) for name, host, method, port in DEFAULT_PROBES]
+        probes = {probe.name: probe for probe in map(make_probe, probes)}
+        with self._lock:
+            # Results of a probe that is kept but changed no longer describe it
+            self._results = {name: result for name, result in self._results.items()
+                             if name in probes and probes[name] is self.probes.get(name)}
+            first_results = {name: threading.Event() for name in probes}
+            for name in self._results:
+                first_results[name] = self._first_results[name]
+            self._first_results = first_results
+            # Rebound rather than mutated, as the probing thread may be iterating them
+            self.probes = probes
+
+    def configure(self, probes):
+        """Replace the probes (None restores the defaults) and run them right away."""
+        self._set_probes(probes)
+        logger.info("Connectivity monitor reconfigured with probes: %s", ', '.join(self.probes))
+        self.refresh()
+
+    def start(self):
+        """Start the probing thread; every probe runs right away, then on its interval."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        logger.info("Starting connectivity monitor for probes: %s", ', '.join(self.probes))
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='connectivity-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the probing thread."""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(probe.timeout for probe in self.probes.values()) * 2 if self.probes else 1)
+            self._thread = None
+        logger.info("Connectivity monitor stopped.")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            for name, probe in self.probes.items():
+                if self._next_due.get(name, 0) <= now:
+                    self.probe(name)
+                    self._next_due[name] = time.monotonic() + probe.interval
+            wait = min(self._next_due.values(), default=now + 1.0) - time.monotonic()
+            self._wake_event.wait(max(wait, 0))
+            self._wake_event.clear()
+
+    def probe(self, name):
+        """Run one probe now and store its result (None if no probe has that name)."""
+        probe = self.probes.get(name)
+        if probe is None:
+            return None
+        result = probe.run()
+        with self._lock:
+            if self.probes.get(name) is not probe:
+                # Reconfigured while it ran
+                return result
+            previous = self._results.get(name)
+            self._results[name] = result
+            first_result = self._first_results[name]
+        first_result.set()
+        if previous is None or previous.ok != result.ok:
+            # Only changes are worth an entry; steady state is visible in the reports
+            if result.ok:
+                logger.info("Connectivity probe '%s' (%s %s) succeeded.", name, probe.method, probe.host)
+            else:
+                logger.warning("Connectivity probe '%s' (%s %s) failed: %s", name, probe.method, probe.host, result.error)
+        return result
+
+    def refresh(self):
+        """Ask the probing thread to run every probe again without waiting for their interval."""
+        # Rebound rather than cleared, as the probing thread may be reading it
+        self._next_due = {}
+        self._wake_event.set()
+
+    def result(self, name, timeout=None):
+        """Return the last ProbeResult of ``name``, or None if it has not completed yet or is not configured.
+
+        Waits up to ``timeout`` seconds (default: the probe's own timeout)
+        for the first result, so a report right after startup is not empty.
+        """
+        with self._lock:
+            probe = self.probes.get(name)
+            first_result = self._first_results.get(name)
+        if probe is None:
+            return None
+        if not first_result.is_set():
+            first_result.wait(probe.timeout if timeout is None else timeout)
+        with self._lock:
+            return self._results.get(name)
+
+    @staticmethod
+    def age(result):
+        """Seconds since ``result`` was taken."""
+        return max(time.time() - result.checked_at, 0.0)
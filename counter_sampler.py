@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import bisect
+import collections
+import math
+import threading
+import time
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+# Default sampling period (seconds) and the windows (seconds) rates are computed over
+DEFAULT_SAMPLE_INTERVAL = 1.0
+DEFAULT_RATE_WINDOWS = (1, 10, 60)
+
+# Rates of every device over a window; span is the time (seconds) actually covered by the samples
+WindowRates = collections.namedtuple('WindowRates', ['window', 'span', 'rates'])
+
+# Some drivers still expose 32-bit counters
+COUNTER_32_BIT = 2 ** 32
+
+
+def counter_delta(previous, current):
+    """Increase of a counter between two readings, allowing for wraps and resets.
+
+    A 32-bit counter that was in its upper half and went down has wrapped;
+    any other decrease is a reset (device re-created, driver reloaded),
+    after which the counter restarted from zero.
+    """
+    if current >= previous:
+        return current - previous
+    if COUNTER_32_BIT // 2 <= previous < COUNTER_32_BIT:
+        return COUNTER_32_BIT - previous + current
+    return current
+
+
+class CounterSampler:
+    """Background thread that turns per-device cumulative counters into per-second rates.
+
+    Subclasses name the counters (``FIELDS``), the record type holding one
+    device's rates (``Rates``) and implement ``read_counters``. Every
+    ``interval`` seconds the raw counters are read and their increase since
+    the previous reading (see ``counter_delta``) is added to per-device
+    running totals, which never go backwards. Rates over a window are the
+    difference between the newest totals and those of the sample one window
+    earlier, so a wrap or reset anywhere inside the window does not distort
+    them.
+    """
+
+    FIELDS = ()
+    Rates = None
+    THREAD_NAME = 'counter-sampler'
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL, windows=DEFAULT_RATE_WINDOWS):
+        if interval <= 0:
+            raise ValueError('Sampling interval must be greater than zero.')
+        if not windows or min(windows) <= 0:
+            raise ValueError('Rate windows must be greater than zero.')
+        self.interval = interval
+        self.windows = tuple(sorted(windows))
+        # Enough samples to cover the longest window, plus the one it starts from
+        self.history_size = math.ceil(self.windows[-1] / interval) + 1
+        self.samples = collections.deque(maxlen=self.history_size)  # (monotonic time, {device: totals})
+        self._previous = {}
+        self._totals = {}
+        self._last_seen = {}
+        self._sample_count = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def shared(cls, interval=DEFAULT_SAMPLE_INTERVAL, windows=DEFAULT_RATE_WINDOWS):
+        """Return the process-wide sampler of this kind, creating and starting it on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(interval=interval, windows=windows)
+                cls._shared.start()
+            return cls._shared
+
+    def read_counters(self):
+        """Return {device: psutil counters record} with raw (not wrap-corrected) values."""
+        raise NotImplementedError
+
+    def start(self):
+        """Take the initial reading and start the sampling thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        logger.info("Starting %s with a %s second period.", self.THREAD_NAME, self.interval)
+        try:
+            self.sample()
+        except Exception as e:
+            # The thread keeps trying; reports show no rates until a reading succeeds
+            logger.error(f"Error taking the first reading in {self.THREAD_NAME}: {e}")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.THREAD_NAME, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+        logger.info("%s stopped.", self.THREAD_NAME)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling counters in {self.THREAD_NAME}: {e}")
+
+    def sample(self):
+        """Read the counters once and append the updated running totals."""
+        counters = self.read_counters()
+        timestamp = time.monotonic()
+        fields = self.FIELDS
+        with self._lock:
+            self._sample_count += 1
+            snapshot = {}
+            for device, current in counters.items():
+                # Counters a platform does not provide (busy_time outside Linux/FreeBSD) stay at zero
+                current = tuple(getattr(current, field, 0) for field in fields)
+                previous = self._previous.get(device)
+                totals = self._totals.get(device)
+                if totals is None:
+                    totals = (0,) * len(fields)
+                elif previous is not None:
+                    totals = tuple(total + counter_delta(before, now) for total, before, now in zip(totals, previous, current))
+                # A device that came back keeps its totals; its first reading only sets the new baseline
+                self._previous[device] = current
+                self._totals[device] = totals
+                self._last_seen[device] = self._sample_count
+                snapshot[device] = totals
+
+            # Devices gone for longer than the history (veth churn, detached disks) are forgotten
+            for device in [device for device in self._last_seen if device not in counters]:
+                self._previous.pop(device, None)
+                if self._sample_count - self._last_seen[device] >= self.history_size:
+                    del self._totals[device]
+                    del self._last_seen[device]
+
+            self.samples.append((timestamp, snapshot))
+            if len(self.samples) > 1:
+                self._ready.set()
+
+    def rates(self, window=None, timeout=None):
+        """Return WindowRates over ``window`` seconds (default: the shortest window).
+
+        The window starts at the newest sample at least ``window`` seconds
+        older than the latest one; while less history is available, the
+        rates cover what there is (see ``span``). Returns None until two
+        samples exist, waiting up to ``timeout`` for them.
+        """
+        window = self.windows[0] if window is None else window
+        if not self._ready.is_set():
+            self._ready.wait(self.interval * 2 if timeout is None else timeout)
+        with self._lock:
+            if len(self.samples) < 2:
+                return None
+            samples = list(self.samples)
+
+        latest_time, latest = samples[-1]
+        times = [timestamp for timestamp, _ in samples]
+        # Small slack so a sample taken slightly less than one window earlier still counts
+        index = bisect.bisect_right(times, latest_time - window + self.interval * 0.1) - 1
+        start_time, start = samples[max(index, 0)]
+        span = latest_time - start_time
+        if span <= 0:
+            return None
+
+        rates = {}
+        for device, totals in latest.items():
+            before = start.get(device)
+            if before is not None:
+                rates[device] = self.Rates._make((now - then) / span for now, then in zip(totals, before))
+        return WindowRates(window, span, rates)
+
+    def all_rates(self, timeout=None):
+        """Return WindowRates for every configured window."""
+        return [rates for rates in (self.rates(window, timeout) for window in self.windows) if rates is not None]
+
+    @classmethod
+    def total(cls, window_rates):
+        """Sum the rates of every device."""
+        if not window_rates.rates:
+            return cls.Rates._make((0.0,) * len(cls.FIELDS))
+        return cls.Rates._make(sum(values) for values in zip(*window_rates.rates.values()))
@@ -1,109 +1,225 @@
 #!/usr/bin/env python3
 
-import json
 import psutil
 import sys
+import time
 from report_signatures import TimeStampGenerator
-import logging  # Import the logging module
+from report_schema import CPUReport
+from cpu_sampler import CPUSampler, CORE_METRICS, LOAD_AVERAGES
+from log_config import get_logger
 
 # Configure logging
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
-# Create file handler for logging to a file
-file_handler = logging.FileHandler('system_analysis.log')
-file_handler.setLevel(logging.DEBUG)  # Write all logs (DEBUG and higher) to the file
-
-# Create a formatter and attach it to the file handler
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
+class CPUManager:
+    # Sub-collections of monitor_cpu that can be requested on their own with fields=
+    FIELDS = ('usage', 'cores', 'times', 'times_percent', 'frequency', 'stats', 'per_core', 'load')
 
-# Add the file handler to the logger
-logger.addHandler(file_handler)
+    # Total usage above which the CPU load is too high, and p95 above which a single core counts as saturated
+    HIGH_LOAD_PERCENT = 75
+    SATURATED_CORE_PERCENT = 90
 
-# Set the logger's level to DEBUG to capture all log levels
-logger.setLevel(logging.DEBUG)
+    METRIC_NAMES = {'busy': 'Busy', 'iowait': 'IOWait', 'steal': 'Steal'}
 
-class CPUManager:
-    def __init__(self):
+    def __init__(self, sampler=None):
+        # Utilization comes from the background sampler so reports never sleep
+        self.sampler = sampler if sampler is not None else CPUSampler.shared()
         self.cpu_usage = None
         self.cpu_count = None
         self.cpu_time = None
         self.cpu_time_percentages = None
         self.cpu_frequents = None
         self.cpu_stats = None
+        self.core_stats = None
+
+    # Function to judge the CPU load from the total usage and the p95 of every core
+    def _load_status(self, usage, core_stats):
+        if usage >= self.HIGH_LOAD_PERCENT:
+            return "CPU load is too high."
+        if core_stats is not None:
+            saturated = int((core_stats.per_core['busy'].p95 >= self.SATURATED_CORE_PERCENT).sum())
+            if saturated:
+                return f"CPU load is normal overall, but {saturated} of {core_stats.cores} cores are saturated."
+        return "CPU load is normal."
+
+    # Function to lay out busy, iowait and steal percentiles across cores and for each core
+    def _per_core_statistics(self, core_stats):
+        across_cores = {
+            self.METRIC_NAMES[metric]: {'p50': f'{stats.p50:.1f} %', 'p95': f'{stats.p95:.1f} %', 'Max': f'{stats.max:.1f} %'}
+            for metric, stats in core_stats.across_cores.items()
+        }
+        busy = core_stats.per_core['busy']
+        busy_p95 = busy.p95.tolist()
+        columns = zip(busy.p50.tolist(), busy_p95, busy.max.tolist(),
+                      core_stats.per_core['iowait'].p95.tolist(), core_stats.per_core['steal'].p95.tolist())
+        cores = {
+            f'CPU {core}': {
+                'Busy p50': f'{p50:.1f} %',
+                'Busy p95': f'{p95:.1f} %',
+                'Busy Max': f'{maximum:.1f} %',
+                'IOWait p95': f'{iowait:.1f} %',
+                'Steal p95': f'{steal:.1f} %',
+            }
+            for core, (p50, p95, maximum, iowait, steal) in enumerate(columns)
+        }
+        saturated = [f'CPU {core}' for core, p95 in enumerate(busy_p95) if p95 >= self.SATURATED_CORE_PERCENT]
+        return {
+            'Window': f'{core_stats.span:.1f} sec ({core_stats.samples} samples)',
+            'Across Cores': across_cores,
+            'Saturated Cores': saturated if saturated else 'None',
+            'Cores': cores,
+        }
+
+    # Function to lay out the current load averages and their percentiles over the window
+    @staticmethod
+    def _load_statistics(core_stats):
+        load = core_stats.load
+        load_statistics = {name: f'{value:.2f}' for name, value in zip(LOAD_AVERAGES, core_stats.load_average)}
+        load_statistics['Per Core (1 min)'] = f'{core_stats.load_average[0] / core_stats.cores:.2f}'
+        load_statistics['Over Window'] = {
+            name: {'p50': f'{p50:.2f}', 'p95': f'{p95:.2f}', 'Max': f'{maximum:.2f}'}
+            for name, p50, p95, maximum in zip(LOAD_AVERAGES, load.p50.tolist(), load.p95.tolist(), load.max.tolist())
+        }
+        return load_statistics
+
+    @staticmethod
+    def _percentile_record(stats):
+        return {'p50': stats.p50.round(2).tolist(), 'p95': stats.p95.round(2).tolist(), 'max': stats.max.round(2).tolist()}
 
-    # Function to monitor CPU usage and related statistics
-    def monitor_cpu(self):
+    # Function to monitor CPU usage and related statistics; fields limits it to some of FIELDS
+    def monitor_cpu(self, fields=None):
         try:
             logger.info("Started CPU monitoring process.")
-            
-            # Retrieve total CPU usage
-            self.cpu_usage = psutil.cpu_percent(interval=1, percpu=False)
-            logger.debug(f"Total CPU Usage: {self.cpu_usage}%")
-            
-            # Retrieve total processor cores count (Logical)
-            self.logical_cpu_count = psutil.cpu_count(logical=True)
-            # Retrieve total processor cores count (Physical)
-            self.physical_cpu_count = psutil.cpu_count(logical=False)
-            logger.debug(f"Logical CPU cores: {self.logical_cpu_count}, Physical CPU cores: {self.physical_cpu_count}")
-
-            # Retrieve system CPU times statistics as time durations
-            self.cpu_time = psutil.cpu_times(percpu=False)
-            logger.debug(f"CPU Times: {self.cpu_time}")
-
-            # Retrieve system CPU times statistics as percentages
-            self.cpu_time_percentages = psutil.cpu_times_percent(interval=1, percpu=False)
-            logger.debug(f"CPU Times Percentages: {self.cpu_time_percentages}")
-
-            # Retrieve current, min, and max CPU frequencies
-            self.cpu_frequents = psutil.cpu_freq(percpu=False)
-            logger.debug(f"CPU Frequencies: Current = {self.cpu_frequents.current} MHz, Min = {self.cpu_frequents.min} MHz, Max = {self.cpu_frequents.max} MHz")
-
-            # Retrieve CPU stats
-            self.cpu_stats = psutil.cpu_stats()
-            logger.debug(f"CPU Stats: {self.cpu_stats}")
-
-            statistics = {
-                'CPU Usage Statistics': {
-                    'Total CPU Usage': f'{self.cpu_usage} %',
-                    'Total Processor Cores Count (Logical)': f'{self.logical_cpu_count}',
-                    'Total Processor Cores Count (Physical)': f'{self.physical_cpu_count}',
-                    'CPU Load Status': f'{"CPU load is normal." if self.cpu_usage < 75 else "CPU load is too high."}',
-                    'System CPU Time Statistics (Time)': {
-                        'User': f'{TimeStampGenerator().convertTime(self.cpu_time[0])}',
-                        'System': f'{TimeStampGenerator().convertTime(self.cpu_time[1])}',
-                        'IDLE': f'{TimeStampGenerator().convertTime(self.cpu_time[2])}',
-                        'Interrupt': f'{TimeStampGenerator().convertTime(self.cpu_time[3])}',
-                        'DPC': f'{TimeStampGenerator().convertTime(self.cpu_time[4])}'
-                    },
-                    'System CPU Time Statistics (Percentages)': {
-                        'User': f'{self.cpu_time_percentages[0]} %',
-                        'System': f'{self.cpu_time_percentages[1]} %',
-                        'IDLE': f'{self.cpu_time_percentages[2]} %',
-                        'Interrupt': f'{self.cpu_time_percentages[3]} %',
-                        'DPC': f'{self.cpu_time_percentages[4]} %'
-                    },
-                    'CPU Frequency Statistics': {
-                        'Current': f'{self.cpu_frequents.current} Mhz',
-                        'Min': f'{self.cpu_frequents.min} Mhz',
-                        'Max': f'{self.cpu_frequents.max} Mhz',
-                    },
-                    'CPU Stats Statistics': {
-                        'Context Switches': f'{self.cpu_stats.ctx_switches}',
-                        'Interrupts': f'{self.cpu_stats.interrupts}',
-                        'Software Interrupts': f'{self.cpu_stats.soft_interrupts}',
-                        'System Calls': f'{self.cpu_stats.syscalls}'
-                    },
-                    'Generated Time & Date': f'{TimeStampGenerator().generate_report()}'
+            fields = self.FIELDS if fields is None else fields
+            cpu_statistics = {}
+
+            if 'usage' in fields or 'times_percent' in fields:
+                # Retrieve the latest utilization sample taken by the background sampler
+                cpu_sample = self.sampler.latest()
+                if cpu_sample is None:
+                    raise RuntimeError("No CPU utilization sample is available yet.")
+
+            if 'usage' in fields or 'per_core' in fields or 'load' in fields:
+                # Per-core and load average percentiles over the sampler's window
+                self.core_stats = self.sampler.core_stats()
+
+            if 'usage' in fields:
+                # Retrieve total CPU usage
+                self.cpu_usage = cpu_sample.percent
+                logger.debug("Total CPU Usage: %s%%", self.cpu_usage)
+                cpu_statistics['Total CPU Usage'] = f'{self.cpu_usage} %'
+
+            if 'cores' in fields:
+                # Retrieve total processor cores count (Logical)
+                self.logical_cpu_count = psutil.cpu_count(logical=True)
+                # Retrieve total processor cores count (Physical)
+                self.physical_cpu_count = psutil.cpu_count(logical=False)
+                logger.debug("Logical CPU cores: %s, Physical CPU cores: %s", self.logical_cpu_count, self.physical_cpu_count)
+                cpu_statistics['Total Processor Cores Count (Logical)'] = f'{self.logical_cpu_count}'
+                cpu_statistics['Total Processor Cores Count (Physical)'] = f'{self.physical_cpu_count}'
+
+            if 'usage' in fields:
+                cpu_statistics['CPU Load Status'] = self._load_status(self.cpu_usage, self.core_stats)
+
+            if 'times' in fields:
+                # Retrieve system CPU times statistics as time durations
+                self.cpu_time = psutil.cpu_times(percpu=False)
+                logger.debug("CPU Times: %s", self.cpu_time)
+                cpu_statistics['System CPU Time Statistics (Time)'] = {
+                    'User': f'{TimeStampGenerator().convertTime(self.cpu_time[0])}',
+                    'System': f'{TimeStampGenerator().convertTime(self.cpu_time[1])}',
+                    'IDLE': f'{TimeStampGenerator().convertTime(self.cpu_time[2])}',
+                    'Interrupt': f'{TimeStampGenerator().convertTime(self.cpu_time[3])}',
+                    'DPC': f'{TimeStampGenerator().convertTime(self.cpu_time[4])}'
                 }
-            }
 
-            result = json.dumps(statistics, indent=4)
-            json_output = json.loads(result)
-            logger.info("CPU statistics successfully converted to JSON format.")
-            
-            return json_output  # Return the JSON output as a string
+            if 'times_percent' in fields:
+                # Retrieve system CPU times statistics as percentages
+                self.cpu_time_percentages = cpu_sample.times_percent
+                logger.debug("CPU Times Percentages: %s", self.cpu_time_percentages)
+                cpu_statistics['System CPU Time Statistics (Percentages)'] = {
+                    'User': f'{self.cpu_time_percentages[0]} %',
+                    'System': f'{self.cpu_time_percentages[1]} %',
+                    'IDLE': f'{self.cpu_time_percentages[2]} %',
+                    'Interrupt': f'{self.cpu_time_percentages[3]} %',
+                    'DPC': f'{self.cpu_time_percentages[4]} %'
+                }
+
+            if 'frequency' in fields:
+                # Retrieve current, min, and max CPU frequencies
+                self.cpu_frequents = psutil.cpu_freq(percpu=False)
+                logger.debug("CPU Frequencies: %s", self.cpu_frequents)
+                cpu_statistics['CPU Frequency Statistics'] = {
+                    'Current': f'{self.cpu_frequents.current} Mhz',
+                    'Min': f'{self.cpu_frequents.min} Mhz',
+                    'Max': f'{self.cpu_frequents.max} Mhz',
+                }
+
+            if 'stats' in fields:
+                # Retrieve CPU stats
+                self.cpu_stats = psutil.cpu_stats()
+                logger.debug("CPU Stats: %s", self.cpu_stats)
+                cpu_statistics['CPU Stats Statistics'] = {
+                    'Context Switches': f'{self.cpu_stats.ctx_switches}',
+                    'Interrupts': f'{self.cpu_stats.interrupts}',
+                    'Software Interrupts': f'{self.cpu_stats.soft_interrupts}',
+                    'System Calls': f'{self.cpu_stats.syscalls}'
+                }
+
+            if 'per_core' in fields:
+                # Retrieve per-core busy, iowait and steal percentiles
+                cpu_statistics['Per-Core Utilization'] = (self._per_core_statistics(self.core_stats)
+                                                          if self.core_stats is not None else 'Not sampled yet')
+
+            if 'load' in fields:
+                # Retrieve load averages
+                cpu_statistics['Load Average'] = (self._load_statistics(self.core_stats)
+                                                  if self.core_stats is not None else 'Not sampled yet')
+
+            cpu_statistics['Generated Time & Date'] = f'{TimeStampGenerator().generate_report()}'
+            statistics = {'CPU Usage Statistics': cpu_statistics}
+
+            logger.info("CPU statistics report generated successfully.")
+            return statistics
 
         except Exception as e:
             logger.error(f"Error during CPU monitoring: {e}")
             sys.exit(1)
+
+    # Function to collect CPU statistics as a typed numeric record
+    def raw_report(self):
+        try:
+            logger.info("Started raw CPU statistics collection.")
+            cpu_sample = self.sampler.latest()
+            if cpu_sample is None:
+                raise RuntimeError("No CPU utilization sample is available yet.")
+
+            cpu_frequents = psutil.cpu_freq(percpu=False)
+            cpu_stats = psutil.cpu_stats()
+            core_stats = self.sampler.core_stats()
+
+            return CPUReport(
+                timestamp=time.time(),
+                percent=cpu_sample.percent,
+                logical_count=psutil.cpu_count(logical=True),
+                physical_count=psutil.cpu_count(logical=False),
+                times=psutil.cpu_times(percpu=False)._asdict(),
+                times_percent=cpu_sample.times_percent._asdict(),
+                freq_current=cpu_frequents.current if cpu_frequents else None,
+                freq_min=cpu_frequents.min if cpu_frequents else None,
+                freq_max=cpu_frequents.max if cpu_frequents else None,
+                ctx_switches=cpu_stats.ctx_switches,
+                interrupts=cpu_stats.interrupts,
+                soft_interrupts=cpu_stats.soft_interrupts,
+                syscalls=cpu_stats.syscalls,
+                stats_window=round(core_stats.span, 3) if core_stats else None,
+                per_core={metric: self._percentile_record(core_stats.per_core[metric]) for metric in CORE_METRICS} if core_stats else None,
+                across_cores={metric: {name: round(value, 2) for name, value in stats._asdict().items()}
+                              for metric, stats in core_stats.across_cores.items()} if core_stats else None,
+                load_average=list(core_stats.load_average) if core_stats else None,
+                load=self._percentile_record(core_stats.load) if core_stats else None,
+            )
+
+        except Exception as e:
+            logger.error(f"Error during raw CPU collection: {e}")
+            sys.exit(1)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+import collections
+import threading
+import time
+import numpy as np
+import psutil
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+# Default sampling period (seconds) and number of samples kept in the ring buffer
+DEFAULT_SAMPLE_INTERVAL = 1.0
+DEFAULT_HISTORY_SIZE = 60
+
+# Default window (seconds) per-core and load average percentiles are computed over
+DEFAULT_STATS_WINDOW = 60
+
+# One utilization sample computed from two consecutive cpu_times snapshots
+CPUSample = collections.namedtuple('CPUSample', ['timestamp', 'percent', 'times_percent'])
+
+# Per-core percentages kept for every sample, in the order of the sample arrays' middle axis
+CORE_METRICS = ('busy', 'iowait', 'steal')
+LOAD_AVERAGES = ('1 min', '5 min', '15 min')
+
+# p50, p95 and max of a metric over the window; arrays with one value per core (or per load average),
+# or plain floats across every core and sample
+Percentiles = collections.namedtuple('Percentiles', ['p50', 'p95', 'max'])
+
+# Statistics of the per-core and load average samples taken within ``window`` seconds; ``span`` is the
+# time actually covered. per_core and across_cores map each of CORE_METRICS to Percentiles.
+CoreStats = collections.namedtuple('CoreStats', ['window', 'span', 'samples', 'cores', 'per_core', 'across_cores',
+                                                 'load_average', 'load'])
+
+
+def window_percentiles(values):
+    """Return Percentiles of ``values`` along its first axis (one row per sample).
+
+    A single sort serves p50, p95 (interpolated linearly, as ``np.percentile``
+    does by default) and the max, for every core or metric at once.
+    """
+    ordered = np.sort(values, axis=0).astype(np.float64)
+    last = len(ordered) - 1
+    interpolated = []
+    for percentile in (50, 95):
+        position = percentile / 100 * last
+        lower = int(position)
+        upper = min(lower + 1, last)
+        interpolated.append(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+    return Percentiles(interpolated[0], interpolated[1], ordered[last])
+
+
+class CPUSampler:
+    """Background thread that keeps the latest CPU utilization ready to read.
+
+    Instead of sleeping inside the request (``psutil.cpu_percent(interval=1)``),
+    the sampler keeps the previous ``cpu_times`` snapshot and computes the
+    utilization from the delta every ``interval`` seconds.
+
+    Per-core busy, iowait and steal percentages and ``getloadavg`` are kept
+    in NumPy ring arrays (one row per sample), so percentiles over a window
+    are a handful of array operations whatever the number of cores.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL, history_size=DEFAULT_HISTORY_SIZE):
+        if interval <= 0:
+            raise ValueError('Sampling interval must be greater than zero.')
+        self.interval = interval
+        self.samples = collections.deque(maxlen=history_size)
+        self._previous_times = None
+        self._previous_core_times = None
+        self._core_columns = None
+        self._reset_core_arrays(0)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def shared(cls, interval=DEFAULT_SAMPLE_INTERVAL, history_size=DEFAULT_HISTORY_SIZE):
+        """Return the process-wide sampler, creating and starting it on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(interval=interval, history_size=history_size)
+                cls._shared.start()
+            return cls._shared
+
+    def start(self):
+        """Take the initial snapshot and start the sampling thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        logger.info("Starting CPU sampler with a %s second period.", self.interval)
+        self._previous_times = psutil.cpu_times(percpu=False)
+        try:
+            self.sample_cores()
+        except Exception as e:
+            # Per-core statistics stay empty until a reading succeeds; the aggregate is unaffected
+            logger.error(f"Error reading per-core CPU times: {e}")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='cpu-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+        logger.info("CPU sampler stopped.")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling CPU times: {e}")
+            try:
+                self.sample_cores()
+            except Exception as e:
+                logger.error(f"Error sampling per-core CPU times: {e}")
+
+    @staticmethod
+    def _total_time(times):
+        total = sum(times)
+        # On Linux guest times are already accounted in user/nice, same as psutil does
+        total -= getattr(times, 'guest', 0)
+        total -= getattr(times, 'guest_nice', 0)
+        return total
+
+    @staticmethod
+    def _busy_time(times):
+        return CPUSampler._total_time(times) - times.idle - getattr(times, 'iowait', 0)
+
+    def sample(self):
+        """Take one snapshot and append the utilization since the previous one."""
+        current_times = psutil.cpu_times(percpu=False)
+        with self._lock:
+            previous_times = self._previous_times
+            self._previous_times = current_times
+        if previous_times is None:
+            return None
+
+        total_delta = self._total_time(current_times) - self._total_time(previous_times)
+        if total_delta <= 0:
+            # Clock did not advance (or went backwards); keep the last sample
+            return None
+
+        busy_delta = max(self._busy_time(current_times) - self._busy_time(previous_times), 0)
+        percent = round(min(busy_delta / total_delta * 100, 100.0), 1)
+        times_percent = type(current_times)._make(
+            round(min(max((current - previous) / total_delta * 100, 0.0), 100.0), 1)
+            for current, previous in zip(current_times, previous_times)
+        )
+
+        cpu_sample = CPUSample(time.time(), percent, times_percent)
+        with self._lock:
+            self.samples.append(cpu_sample)
+        self._ready.set()
+        return cpu_sample
+
+    def latest(self, timeout=None):
+        """Return the most recent sample, waiting up to ``timeout`` for the first one."""
+        if not self._ready.is_set():
+            self._ready.wait(self.interval * 2 if timeout is None else timeout)
+        with self._lock:
+            return self.samples[-1] if self.samples else None
+
+    def history(self):
+        """Return a copy of the samples currently held in the ring buffer."""
+        with self._lock:
+            return list(self.samples)
+
+    def _reset_core_arrays(self, cores):
+        history_size = self.samples.maxlen
+        # Rows that were never written carry -inf timestamps so no window selects them
+        self._core_timestamps = np.full(history_size, -np.inf)
+        self._core_samples = np.zeros((history_size, len(CORE_METRICS), cores), dtype=np.float32)
+        self._load_samples = np.zeros((history_size, len(LOAD_AVERAGES)))
+        self._core_index = 0
+
+    def sample_cores(self):
+        """Append the per-core percentages since the previous per-core snapshot, and the load averages."""
+        per_cpu = psutil.cpu_times(percpu=True)
+        load_average = psutil.getloadavg()
+        timestamp = time.monotonic()
+        if self._core_columns is None:
+            fields = type(per_cpu[0])._fields
+            # Guest times are already accounted in user/nice; fields a platform lacks are skipped
+            self._core_columns = (
+                [index for index, name in enumerate(fields) if name not in ('guest', 'guest_nice')],
+                fields.index('idle'),
+                fields.index('iowait') if 'iowait' in fields else None,
+                fields.index('steal') if 'steal' in fields else None,
+            )
+        counted, idle, iowait, steal = self._core_columns
+
+        current = np.array(per_cpu, dtype=np.float64)
+        previous = self._previous_core_times
+        self._previous_core_times = current
+        if previous is None or previous.shape != current.shape:
+            # First snapshot, or cores were brought on/offline: start a new history
+            with self._lock:
+                self._reset_core_arrays(current.shape[0])
+            return
+
+        delta = current - previous
+        total = delta[:, counted].sum(axis=1)
+        # A core whose clock did not advance reports zero rather than dividing by zero
+        scale = np.divide(100.0, total, out=np.zeros_like(total), where=total > 0)
+        iowait_delta = delta[:, iowait] if iowait is not None else 0.0
+        row = np.empty((len(CORE_METRICS), current.shape[0]))
+        row[0] = (total - delta[:, idle] - iowait_delta) * scale
+        row[1] = iowait_delta * scale
+        row[2] = delta[:, steal] * scale if steal is not None else 0.0
+        np.clip(row, 0.0, 100.0, out=row)
+
+        with self._lock:
+            index = self._core_index
+            self._core_timestamps[index] = timestamp
+            self._core_samples[index] = row
+            self._load_samples[index] = load_average
+            self._core_index = (index + 1) % len(self._core_timestamps)
+
+    def core_stats(self, window=DEFAULT_STATS_WINDOW):
+        """Return CoreStats over the last ``window`` seconds, or None before the first per-core sample."""
+        with self._lock:
+            latest = self._core_timestamps[self._core_index - 1]
+            if latest == -np.inf:
+                return None
+            # Ring order does not matter to percentiles; boolean indexing copies the rows out of the lock
+            selected = self._core_timestamps > latest - window
+            timestamps = self._core_timestamps[selected]
+            core_samples = self._core_samples[selected]
+            load_samples = self._load_samples[selected]
+            load_average = tuple(self._load_samples[self._core_index - 1].tolist())
+
+        samples, metrics, cores = core_samples.shape
+        per_core_stats = window_percentiles(core_samples)
+        per_core = {metric: Percentiles._make(stats[index] for stats in per_core_stats)
+                    for index, metric in enumerate(CORE_METRICS)}
+        # Every core's samples pooled: one column per metric
+        across_stats = window_percentiles(core_samples.transpose(0, 2, 1).reshape(-1, metrics))
+        across_cores = {metric: Percentiles._make(stats[index].item() for stats in across_stats)
+                        for index, metric in enumerate(CORE_METRICS)}
+        load = window_percentiles(load_samples)
+        # One sample covers one interval, so a single sample still spans a period
+        span = float(timestamps.max() - timestamps.min()) + self.interval
+        return CoreStats(window, span, samples, cores, per_core, across_cores, load_average, load)
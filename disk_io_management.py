@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+from report_signatures import TimeStampGenerator
+from report_schema import DiskIODeviceRecord, DiskIOReport
+from disk_io_sampler import DiskIOSampler
+from disk_management import DiskManager
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+class DiskIOManager:
+    # Sub-collections of io_report that can be requested on their own with fields=
+    FIELDS = ('throughput', 'iops', 'latency', 'busy')
+
+    # Devices that are not reported: loop devices (snaps, images) and RAM disks
+    SKIP_DEVICE_PREFIXES = ('loop', 'ram')
+
+    def __init__(self, sampler=None):
+        self.sampler = sampler if sampler is not None else DiskIOSampler.shared()
+
+    @staticmethod
+    # Function to map disk names (as in disk_io_counters) to the mount points found by DiskManager
+    def device_mountpoints():
+        disk_manager = DiskManager()
+        disk_manager.generate_overall_report()
+        mountpoints = {}
+        for partition in disk_manager.partitions:
+            # /dev/mapper/* and /dev/disk/by-* are links to the kernel's device name
+            name = os.path.basename(os.path.realpath(partition.device))
+            mountpoints.setdefault(name, []).append(partition.mountpoint)
+            # On Linux a partition's parent disk also serves the partition's mount points
+            parent = DiskIOManager._parent_disk(name)
+            if parent is not None:
+                mountpoints.setdefault(parent, []).append(partition.mountpoint)
+        return mountpoints
+
+    @staticmethod
+    def _parent_disk(name):
+        block = f'/sys/class/block/{name}'
+        if not os.path.exists(os.path.join(block, 'partition')):
+            return None
+        return os.path.basename(os.path.dirname(os.path.realpath(block)))
+
+    def _reported(self, name):
+        return not name.startswith(self.SKIP_DEVICE_PREFIXES)
+
+    @staticmethod
+    def _format_time(milliseconds):
+        return f'{milliseconds:.2f} ms' if milliseconds is not None else 'No I/O'
+
+    # Function to report the I/O of every disk over each window of the sampler; fields limits it to some of FIELDS
+    def io_report(self, fields=None):
+        try:
+            logger.info("Started generating disk I/O report.")
+            fields = self.FIELDS if fields is None else fields
+            mountpoints = self.device_mountpoints()
+
+            devices = {}
+            for window_rates in self.sampler.all_rates():
+                window = f'{window_rates.window:g}s'
+                for name, rates in window_rates.rates.items():
+                    if not self._reported(name):
+                        continue
+                    stats = self.sampler.stats(rates)
+                    window_stats = {}
+                    if 'throughput' in fields:
+                        window_stats['Read'] = f'{stats.read_bytes_per_sec / (1024 ** 2):.2f} MiB/s'
+                        window_stats['Write'] = f'{stats.write_bytes_per_sec / (1024 ** 2):.2f} MiB/s'
+                    if 'iops' in fields:
+                        window_stats['Read IOPS'] = f'{stats.read_iops:.1f}'
+                        window_stats['Write IOPS'] = f'{stats.write_iops:.1f}'
+                    if 'latency' in fields:
+                        window_stats['Average Service Time'] = self._format_time(stats.service_time_ms)
+                        window_stats['Average Wait Time'] = self._format_time(stats.wait_time_ms)
+                    if 'busy' in fields:
+                        window_stats['Busy'] = f'{stats.busy_percent:.1f} %' if stats.busy_percent is not None else 'Not available'
+                    window_stats['Measured Over'] = f'{window_rates.span:.1f} sec'
+                    device = devices.setdefault(name, {'Mount Points': mountpoints.get(name, [])})
+                    device[window] = window_stats
+
+            io_statistics = {
+                'Devices': devices if devices else 'Not sampled yet',
+                'Generated Time & Date': f'{TimeStampGenerator().generate_report()}',
+            }
+            logger.info("Disk I/O report generated successfully.")
+            return {'Disk I/O Statistics': io_statistics}
+        except Exception as e:
+            logger.error(f"Error generating disk I/O report: {e}")
+            sys.exit(1)
+
+    # Function to collect disk I/O rates as a typed numeric record, one entry per device and window
+    def raw_report(self):
+        try:
+            logger.info("Started raw disk I/O collection.")
+            mountpoints = self.device_mountpoints()
+            devices = []
+            for window_rates in self.sampler.all_rates():
+                for name, rates in window_rates.rates.items():
+                    if not self._reported(name):
+                        continue
+                    stats = self.sampler.stats(rates)
+                    devices.append(DiskIODeviceRecord(
+                        device=name,
+                        mountpoints=mountpoints.get(name, []),
+                        window=window_rates.window,
+                        span=round(window_rates.span, 3),
+                        read_bytes_rate=stats.read_bytes_per_sec,
+                        write_bytes_rate=stats.write_bytes_per_sec,
+                        read_iops=stats.read_iops,
+                        write_iops=stats.write_iops,
+                        service_time=stats.service_time_ms,
+                        wait_time=stats.wait_time_ms,
+                        busy_percent=stats.busy_percent,
+                    ))
+            return DiskIOReport(timestamp=time.time(), devices=devices)
+        except Exception as e:
+            logger.error(f"Error during raw disk I/O collection: {e}")
+            sys.exit(1)
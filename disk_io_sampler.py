@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import collections
+import threading
+import psutil
+from counter_sampler import CounterSampler
+
+# Counters of psutil.disk_io_counters that rates are computed for; times are in milliseconds
+COUNTER_FIELDS = ('read_count', 'write_count', 'read_bytes', 'write_bytes', 'read_time', 'write_time', 'busy_time')
+
+# Per-second rate of every counter of one disk
+DiskRates = collections.namedtuple('DiskRates', COUNTER_FIELDS)
+
+# Figures derived from one disk's rates; the times are None when the disk did no I/O in the window,
+# and busy figures are None on platforms without busy_time (only Linux and FreeBSD report it)
+DiskIOStats = collections.namedtuple('DiskIOStats', ['read_bytes_per_sec', 'write_bytes_per_sec', 'read_iops', 'write_iops',
+                                                     'service_time_ms', 'wait_time_ms', 'busy_percent'])
+
+
+class DiskIOSampler(CounterSampler):
+    """Per-disk rates from ``psutil.disk_io_counters(perdisk=True)``, sampled every second."""
+
+    FIELDS = COUNTER_FIELDS
+    Rates = DiskRates
+    THREAD_NAME = 'disk-io-sampler'
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.has_busy_time = None
+
+    def read_counters(self):
+        # Raw counters: wraps and resets are handled by the sampler rather than hidden by psutil
+        counters = psutil.disk_io_counters(perdisk=True, nowrap=False) or {}
+        if self.has_busy_time is None and counters:
+            self.has_busy_time = hasattr(next(iter(counters.values())), 'busy_time')
+        return counters
+
+    def stats(self, rates):
+        """Derive throughput, IOPS, service time, wait time and utilization from a disk's rates."""
+        operations = rates.read_count + rates.write_count
+        # Ratios of per-second rates are ratios of the deltas over the same window
+        service_time = wait_time = busy_percent = None
+        if operations > 0:
+            wait_time = (rates.read_time + rates.write_time) / operations
+            if self.has_busy_time:
+                service_time = rates.busy_time / operations
+        if self.has_busy_time:
+            # busy_time grows by at most 1000 ms per second
+            busy_percent = min(rates.busy_time / 10, 100.0)
+        return DiskIOStats(rates.read_bytes, rates.write_bytes, rates.read_count, rates.write_count,
+                           service_time, wait_time, busy_percent)
@@ -1,40 +1,45 @@
 #!/usr/bin/env python3
 
-import json
 import sys
+import time
 import psutil
 from report_signatures import TimeStampGenerator
-import logging  # Import logging module
+from report_schema import DiskPartitionRecord, DiskReport
+from mount_usage import USAGE_OK, USAGE_SKIPPED, MountUsageCollector
+from log_config import get_logger
 
 # Configure logging
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
-# Create file handler for logging to a file
-file_handler = logging.FileHandler('system_analysis.log')
-file_handler.setLevel(logging.DEBUG)  # Write all logs (DEBUG and higher) to the file
-
-# Create a formatter and attach it to the file handler
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
+class DiskManager:
+    # Sub-collections of manage_disk that can be requested on their own with fields=
+    FIELDS = ('partitions', 'usage', 'level')
 
-# Add the file handler to the logger
-logger.addHandler(file_handler)
+    def __init__(self, usage_collector=None):
+        self.partitions = []  # psutil partitions of the current report
+        self.usage_collector = usage_collector if usage_collector is not None else MountUsageCollector.shared()
+        self._usage = None  # {mountpoint: MountUsage}, read once per report
 
-# Set the logger's level to DEBUG to capture all log levels
-logger.setLevel(logging.DEBUG)
+    # Function to read the usage of every partition once, shared by the statistics and level reports
+    def usage_snapshot(self):
+        if self._usage is None:
+            self._usage = self.usage_collector.collect(self.partitions)
+        return self._usage
 
-class DiskManager:
-    def __init__(self):
-        self.partitions = []  # Initialize as an empty list
+    # Function to list the partitions whose usage was queried (pseudo-filesystems are skipped by policy)
+    def queried_usage(self):
+        return [mount for mount in self.usage_snapshot().values() if mount.status != USAGE_SKIPPED]
 
     # Function to generate storage overall report
     def generate_overall_report(self):
         try:
             logger.info("Started generating overall storage report.")
             partition_info = []
+            self.partitions = []
+            self._usage = None
             # Storage Overall Report
             local_partitions = psutil.disk_partitions()
-            logger.debug(f"Local partitions retrieved: {local_partitions}")
+            logger.debug("Local partitions retrieved: %s", local_partitions)
             
             for partition in local_partitions:
                 partition_dict = {
@@ -51,7 +56,7 @@ class DiskManager:
                 except AttributeError:
                     pass  # Ignore the error if the attribute is not available
 
-                self.partitions.append(partition.device)  # Store device name only
+                self.partitions.append(partition)
                 partition_info.append(partition_dict)
             
             logger.info("Overall storage report generated successfully.")
@@ -66,11 +71,19 @@ class DiskManager:
             logger.info("Started generating storage statistics report.")
             disk_info = []
             # Storage Statistics Report
-            for partition in self.partitions:
-                usage = psutil.disk_usage(partition)
-                logger.debug(f"Disk usage for partition {partition}: {usage}")
+            for mount in self.queried_usage():
+                partition, usage = mount.partition, mount.usage
+                if mount.status != USAGE_OK:
+                    disk_info.append({
+                        "Local Disk": partition.device,
+                        "MountPoint": partition.mountpoint,
+                        "Status": f"Usage unavailable ({mount.status}: {mount.detail})."
+                    })
+                    continue
+                logger.debug("Disk usage for partition %s: %s", partition.mountpoint, usage)
                 disk_dict = {
-                    "Local Disk": partition,
+                    "Local Disk": partition.device,
+                    "MountPoint": partition.mountpoint,
                     "Total": f"{usage.total / (1024 ** 3):.2f} GB",
                     "Used": f"{usage.used / (1024 ** 3):.2f} GB",
                     "Free": f"{usage.free / (1024 ** 3):.2f} GB",
@@ -91,8 +104,15 @@ class DiskManager:
             logger.info("Started checking storage level.")
             partition_info = []
             # Storage Level Checker
-            for partition in self.partitions:
-                disk = psutil.disk_usage(partition)
+            for mount in self.queried_usage():
+                partition, disk = mount.partition, mount.usage
+                if mount.status != USAGE_OK:
+                    partition_info.append({
+                        "Partition": partition.device,
+                        "MountPoint": partition.mountpoint,
+                        "Status": f"Storage level unknown ({mount.status})."
+                    })
+                    continue
                 free_percentage = disk.free / disk.total * 100
                 free_gigabytes = disk.free / 2 ** 30
                 minimum_gigabytes = 2
@@ -104,7 +124,8 @@ class DiskManager:
                     status = "Storage is sufficient."
 
                 partition_dict = {
-                    "Partition": partition,
+                    "Partition": partition.device,
+                    "MountPoint": partition.mountpoint,
                     "Status": status
                 }
 
@@ -116,28 +137,58 @@ class DiskManager:
             logger.error(f"Error checking storage level: {e}")
             return []  # Return empty list if error occurs
 
-    # Function to manage disk statistics and save reports
-    def manage_disk(self):
+    # Function to manage disk statistics and save reports; fields limits it to some of FIELDS
+    def manage_disk(self, fields=None):
         try:
             logger.info("Started managing disk statistics.")
-            overall_report = self.generate_overall_report()
-            storage_report = self.generate_statistics_report()
-            storage_level = self.check_storage_level()
-
-            statistics = {
-                'Disk Statistics': {
-                    'Storage Overall Report': overall_report,
-                    'Storage Statistics Report': storage_report,
-                    'Storage Level Report': storage_level,
-                    'Generated Time & Date': f'{TimeStampGenerator().generate_report()}'
-                }
-            }
-
-            result = json.dumps(statistics, indent=4)
-            json_output = json.loads(result)
-            logger.info("Disk statistics successfully converted to JSON format.")
-            
-            return json_output  # Return the JSON output as a string
+            fields = self.FIELDS if fields is None else fields
+            disk_statistics = {}
+
+            if 'partitions' in fields:
+                disk_statistics['Storage Overall Report'] = self.generate_overall_report()
+            elif 'usage' in fields or 'level' in fields:
+                # The usage and level reports only need the partitions themselves
+                self.partitions = psutil.disk_partitions()
+                self._usage = None
+            if 'usage' in fields:
+                disk_statistics['Storage Statistics Report'] = self.generate_statistics_report()
+            if 'level' in fields:
+                disk_statistics['Storage Level Report'] = self.check_storage_level()
+
+            disk_statistics['Generated Time & Date'] = f'{TimeStampGenerator().generate_report()}'
+            statistics = {'Disk Statistics': disk_statistics}
+
+            logger.info("Disk statistics report generated successfully.")
+            return statistics
         except Exception as e:
             logger.error(f"Error during disk management: {e}")
             sys.exit(1)
+
+    # Function to collect disk statistics as a typed numeric record
+    def raw_report(self):
+        try:
+            logger.info("Started raw disk statistics collection.")
+            partitions = []
+            self.partitions = psutil.disk_partitions()
+            self._usage = None
+            for mount in self.queried_usage():
+                partition, usage = mount.partition, mount.usage
+                if mount.status == USAGE_OK:
+                    total, used, free, percent = usage.total, usage.used, usage.free, usage.percent
+                else:
+                    logger.warning(f"Disk usage unavailable for {partition.mountpoint}: {mount.status} ({mount.detail})")
+                    total = used = free = percent = None
+                partitions.append(DiskPartitionRecord(
+                    device=partition.device,
+                    mountpoint=partition.mountpoint,
+                    fstype=partition.fstype,
+                    total=total,
+                    used=used,
+                    free=free,
+                    percent=percent,
+                    status=mount.status,
+                ))
+            return DiskReport(timestamp=time.time(), partitions=partitions)
+        except Exception as e:
+            logger.error(f"Error during raw disk collection: {e}")
+            sys.exit(1)
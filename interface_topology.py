@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import socket
+import threading
+import time
+import psutil
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+# Within this many seconds the cached topology is served without even checking the fingerprint
+DEFAULT_RECHECK_INTERVAL = 1.0
+# Default routes can change without any address changing, so they are re-read at least this often
+DEFAULT_GATEWAY_TTL = 30.0
+
+# Address family names used by the interface report
+FAMILY_NAMES = {socket.AF_INET: 'IPv4', socket.AF_INET6: 'IPv6', psutil.AF_LINK: 'MAC'}
+
+
+def _name(value):
+    """Name of an enum member (duplex, address family), or its string form for plain ints."""
+    return getattr(value, 'name', str(value))
+
+
+def _or_none(value):
+    return value if value is not None else "None"
+
+
+class InterfaceTopology:
+    """Statistics, addresses and default gateway of every interface, built in one pass.
+
+    ``stats`` and ``addrs`` have the shape of NetworkManager's
+    ``interface_stats`` and ``interface_addrs`` sections, ``interfaces`` the
+    shape of ``get_network_info``. They are shared by every report reading
+    this topology and must not be modified.
+    """
+
+    def __init__(self, if_stats, if_addrs, default_gateways, fingerprint):
+        self.fingerprint = fingerprint
+        self.built_at = time.time()
+        self.stats = {}
+        self.addrs = {}
+        self.interfaces = {}
+
+        for iface, info in if_stats.items():
+            self.stats[iface] = {
+                "isup": info.isup,
+                "duplex": _name(info.duplex),
+                "speed": info.speed,
+                "mtu": info.mtu,
+                "flags": info.flags
+            }
+
+        # Interfaces without any address are still listed, with no addresses
+        for iface in list(if_addrs) + [iface for iface in if_stats if iface not in if_addrs]:
+            info_list = if_addrs.get(iface, ())
+            addresses = []
+            ip_addresses = []
+            mac_address = None
+            for info in info_list:
+                addresses.append({
+                    "family": _name(info.family),
+                    "address": info.address,
+                    "netmask": info.netmask,
+                    "broadcast": info.broadcast,
+                    "ptp": info.ptp
+                })
+                if info.family == psutil.AF_LINK and mac_address is None:
+                    mac_address = info.address
+                ip_addresses.append({
+                    'address_family': FAMILY_NAMES.get(info.family, 'Unknown'),
+                    'ip_address': _or_none(info.address),
+                    'subnet_mask': _or_none(info.netmask),
+                    'broadcast_address': _or_none(info.broadcast),
+                    'peer_address': _or_none(info.ptp)
+                })
+            self.addrs[iface] = addresses
+            self.interfaces[iface] = {
+                'interface_name': iface,
+                'mac_address': mac_address,
+                'default_gateway': default_gateways.get(iface, "None"),
+                'ip_addresses': ip_addresses
+            }
+
+
+class TopologyCache:
+    """Process-wide cache of the interface topology.
+
+    The topology is rebuilt only when the fingerprint of the interface set
+    and addresses changes (or the default gateways were re-read and
+    differ); between checks it is served as is.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, recheck_interval=DEFAULT_RECHECK_INTERVAL, gateway_ttl=DEFAULT_GATEWAY_TTL):
+        self.recheck_interval = recheck_interval
+        self.gateway_ttl = gateway_ttl
+        self._topology = None
+        self._checked_at = 0.0
+        self._gateways = {}
+        self._gateways_read_at = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide topology cache."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def read_default_gateways():
+        """Return {interface: gateway address} from the default routes, first family wins."""
+        try:
+            # Imported here so that loading the module (and every other report) does not pay for it
+            import netifaces
+        except ImportError:
+            logger.warning("netifaces is not installed; default gateways are not reported.")
+            return {}
+        index = {}
+        for gateway, iface in netifaces.gateways().get('default', {}).values():
+            index.setdefault(iface, gateway)
+        return index
+
+    @staticmethod
+    def fingerprint(if_stats, if_addrs, gateways):
+        """Cheap summary of everything the topology is built from; psutil's records are hashable tuples."""
+        return hash((
+            tuple(sorted(if_stats.items())),
+            tuple(sorted((iface, tuple(info_list)) for iface, info_list in if_addrs.items())),
+            tuple(sorted(gateways.items())),
+        ))
+
+    def get(self):
+        """Return the current InterfaceTopology, rebuilding it only if the interfaces changed."""
+        with self._lock:
+            now = time.monotonic()
+            if self._topology is not None and now - self._checked_at < self.recheck_interval:
+                return self._topology
+
+            if self._gateways_read_at is None or now - self._gateways_read_at >= self.gateway_ttl:
+                self._gateways = self.read_default_gateways()
+                self._gateways_read_at = now
+
+            if_stats = psutil.net_if_stats()
+            if_addrs = psutil.net_if_addrs()
+            fingerprint = self.fingerprint(if_stats, if_addrs, self._gateways)
+            if self._topology is None or self._topology.fingerprint != fingerprint:
+                logger.debug("Rebuilding interface topology (%s interfaces).", len(if_addrs))
+                self._topology = InterfaceTopology(if_stats, if_addrs, self._gateways, fingerprint)
+            self._checked_at = now
+            return self._topology
+
+    def invalidate(self):
+        """Forget the topology and gateways so the next read rebuilds them."""
+        with self._lock:
+            self._topology = None
+            self._gateways_read_at = None
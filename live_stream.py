@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import json
+import queue
+import threading
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+# Metric groups a client can ask for, mapped to the recorder metrics they contain
+METRIC_GROUPS = {
+    'cpu': ('cpu.percent',),
+    'memory': ('memory.percent', 'memory.used'),
+    'swap': ('swap.percent', 'swap.used'),
+    'disk': ('disk.percent', 'disk.used'),
+    'net': ('net.bytes_sent', 'net.bytes_recv', 'net.packets_sent', 'net.packets_recv',
+            'net.bytes_sent_rate', 'net.bytes_recv_rate', 'net.packets_sent_rate', 'net.packets_recv_rate',
+            'net.errors_rate', 'net.drops_rate'),
+}
+
+
+class Subscriber:
+    """One connected client: the metrics it wants and a bounded queue of encoded events."""
+
+    def __init__(self, metrics, every, max_queue):
+        self.metrics = metrics
+        self.every = every
+        self.events = queue.Queue(maxsize=max_queue)
+        self.dropped = 0  # events dropped since the client last caught up
+        self.closed = False
+
+
+class MetricStream:
+    """Fans the history recorder's samples out to streaming clients as Server-Sent Events.
+
+    Each sample is encoded once per distinct metric selection and the same
+    bytes are queued for every subscriber that asked for it. Queues are
+    bounded: when a client stops reading, its oldest events are dropped, and
+    a client that drops more than ``max_dropped`` events without catching up
+    (emptying its queue) in between is disconnected.
+    """
+
+    def __init__(self, recorder, max_subscribers=100, max_queue=10, max_dropped=30):
+        self.recorder = recorder
+        self.max_subscribers = max_subscribers
+        self.max_queue = max_queue
+        self.max_dropped = max_dropped
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._tick = 0
+        recorder.add_listener(self.publish)
+
+    @staticmethod
+    def parse_metrics(names):
+        """Resolve a comma-separated list of metric groups; raise ValueError on unknown names."""
+        groups = [name.strip() for name in names.split(',') if name.strip()] or list(METRIC_GROUPS)
+        unknown = [name for name in groups if name not in METRIC_GROUPS]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+        return tuple(metric for name in groups for metric in METRIC_GROUPS[name])
+
+    def subscribe(self, metrics, interval=1.0):
+        """Register a client; return None when the subscriber limit is reached."""
+        every = max(1, round(interval / self.recorder.interval))
+        subscriber = Subscriber(metrics, every, self.max_queue)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscriber)
+        logger.info("Stream subscriber added (%s connected).", len(self._subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.closed = True
+        with self._lock:
+            if subscriber not in self._subscribers:
+                return
+            self._subscribers.discard(subscriber)
+        logger.info("Stream subscriber removed (%s connected).", len(self._subscribers))
+
+    def publish(self, timestamp, values):
+        """Encode one sample and queue it for every subscriber due on this tick."""
+        with self._lock:
+            self._tick += 1
+            tick = self._tick
+            subscribers = list(self._subscribers)
+
+        encoded = {}
+        for subscriber in subscribers:
+            if tick % subscriber.every:
+                continue
+            event = encoded.get(subscriber.metrics)
+            if event is None:
+                payload = {'timestamp': round(timestamp, 3)}
+                for metric in subscriber.metrics:
+                    if metric in values:
+                        payload[metric] = values[metric]
+                event = f"data: {json.dumps(payload, separators=(',', ':'))}\n\n".encode()
+                encoded[subscriber.metrics] = event
+            self._offer(subscriber, event)
+
+    def _offer(self, subscriber, event):
+        try:
+            subscriber.events.put_nowait(event)
+            return
+        except queue.Full:
+            pass
+        # Slow consumer: drop its oldest event rather than growing the queue
+        try:
+            subscriber.events.get_nowait()
+        except queue.Empty:
+            pass
+        subscriber.dropped += 1
+        if subscriber.dropped > self.max_dropped:
+            logger.warning("Disconnecting stream subscriber that is not keeping up.")
+            self.unsubscribe(subscriber)
+            return
+        try:
+            subscriber.events.put_nowait(event)
+        except queue.Full:
+            pass
+
+    def events(self, subscriber, keepalive=15.0):
+        """Yield encoded events for a subscriber until it disconnects or falls too far behind."""
+        try:
+            yield b'retry: 3000\n\n'
+            while not subscriber.closed:
+                try:
+                    event = subscriber.events.get(timeout=keepalive)
+                except queue.Empty:
+                    yield b': keepalive\n\n'
+                    continue
+                if subscriber.events.empty():
+                    # Caught up: earlier lag no longer counts towards disconnecting it
+                    subscriber.dropped = 0
+                yield event
+        finally:
+            self.unsubscribe(subscriber)
@@ -1,42 +1,28 @@
 import sqlite3
-import logging
+from log_config import get_logger
 
 # Configure logging
-logger = logging.getLogger(__name__)
-
-# Create file handler for logging to a file
-file_handler = logging.FileHandler('system_analysis.log')
-file_handler.setLevel(logging.DEBUG)  # Write all logs (DEBUG and higher) to the file
-
-# Create a formatter and attach it to the file handler
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-
-# Add the file handler to the logger
-logger.addHandler(file_handler)
-
-# Set the logger's level to DEBUG to capture all log levels
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
 
 class Database:
     """Class to handle database operations related to request limits."""
 
     def __init__(self, db_name='request_limit.db'):
         self.db_name = db_name
-        logger.debug(f"Initialized Database with name: {self.db_name}")
+        logger.debug("Initialized Database with name: %s", self.db_name)
 
     def _connect(self):
         """Establish and return a connection to the SQLite database."""
         try:
             conn = sqlite3.connect(self.db_name)
-            logger.info(f"Successfully connected to database: {self.db_name}")
+            logger.info("Successfully connected to database: %s", self.db_name)
             return conn
         except sqlite3.DatabaseError as e:
             logger.error(f"Database connection failed: {e}")
             raise
 
     def create_db(self):
-        """Create the request_limits table if it doesn't already exist."""
+        """Create the request_limits and metric_segments tables if they don't already exist."""
         conn = None
         try:
             conn = self._connect()
@@ -48,6 +34,18 @@ class Database:
                     last_request_time INTEGER
                 )
             ''')
+            # Catalog of the on-disk metric archive segments (see metric_archive.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metric_segments (
+                    path TEXT PRIMARY KEY,
+                    metric TEXT,
+                    start_time REAL,
+                    end_time REAL,
+                    step INTEGER,
+                    size INTEGER
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS metric_segments_range ON metric_segments (metric, start_time)')
             conn.commit()
             logger.info("Database and table created successfully.")
         except sqlite3.DatabaseError as e:
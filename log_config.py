@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import atexit
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Shared log file, rotated at LOG_MAX_BYTES with LOG_BACKUP_COUNT old files kept
+LOG_FILE = 'system_analysis.log'
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Level applied to every module logger; DEBUG output is opt-in via set_level()
+LOG_LEVEL = logging.INFO
+
+_queue_handler = None
+_listener = None
+_loggers = set()
+_lock = threading.Lock()
+
+
+def _start_pipeline():
+    """Create the queue handler shared by every logger and the writer thread draining it."""
+    global _queue_handler, _listener
+    log_queue = queue.SimpleQueue()
+
+    # The only handler touching the file; it runs on the listener's thread
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True)
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    _queue_handler = QueueHandler(log_queue)
+    _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def get_logger(name):
+    """Return the logger for ``name``, attached to the shared asynchronous log pipeline.
+
+    Records are put on an in-memory queue by the calling thread and written
+    to the rotating log file by a single background listener thread.
+    """
+    logger = logging.getLogger(name)
+    with _lock:
+        if _queue_handler is None:
+            _start_pipeline()
+        if name not in _loggers:
+            logger.addHandler(_queue_handler)
+            logger.setLevel(LOG_LEVEL)
+            _loggers.add(name)
+    return logger
+
+
+def set_level(level):
+    """Change the level of every logger using the shared pipeline."""
+    global LOG_LEVEL
+    with _lock:
+        LOG_LEVEL = level
+        for name in _loggers:
+            logging.getLogger(name).setLevel(level)
+
+
+def shutdown():
+    """Flush the queued records and stop the writer thread; safe to call more than once."""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
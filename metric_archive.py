@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from local_db import Database
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+# Segment header: magic, version, compacted flag, step (seconds, 0 for raw), base time
+SEGMENT_MAGIC = b'SAMA'
+SEGMENT_VERSION = 2
+SEGMENT_HEADER = struct.Struct('<4sBBHd')
+# Fixed-width records, so a time range can be binary-searched in place: milliseconds since the
+# segment base time and the value; rollups also keep how many raw samples each value averages
+RAW_RECORD = struct.Struct('<Id')
+ROLLUP_RECORD = struct.Struct('<IdI')
+
+# Version 1 segments stored every value's bits XOR the segment's first value, which saved no
+# space in a fixed-width field; they are still read, and rewritten as version 2 when appended to
+V1_HEADER = struct.Struct('<4sBBHdQ')
+V1_RECORD = struct.Struct('<IQ')
+_DOUBLE = struct.Struct('<d')
+_BITS = struct.Struct('<Q')
+
+
+def _from_bits(bits):
+    return _DOUBLE.unpack(_BITS.pack(bits))[0]
+
+
+class Segment:
+    """Read access to one segment file through a read-only memory map.
+
+    Records are fixed width and ordered by time, so a time range is located
+    by binary search over the mapped file without reading what precedes it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self, start=None, end=None):
+        """Return [(timestamp, value), ...] for records within [start, end]."""
+        return [(timestamp, value) for timestamp, value, _ in self.read_weighted(start, end)]
+
+    def read_weighted(self, start=None, end=None):
+        """Return [(timestamp, value, count), ...]: count is the number of raw samples a value averages."""
+        with open(self.path, 'rb') as segment_file:
+            size = os.fstat(segment_file.fileno()).st_size
+            if size < SEGMENT_HEADER.size:
+                return []
+            with mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                header_size, record, decode, base_time = self._layout(mapped)
+                count = (size - header_size) // record.size
+                first = 0 if start is None else self._search(mapped, header_size, record, count, (start - base_time) * 1000)
+                samples = []
+                for index in range(first, count):
+                    offset, value, weight = decode(record.unpack_from(mapped, header_size + index * record.size))
+                    timestamp = base_time + offset / 1000
+                    if end is not None and timestamp > end:
+                        break
+                    samples.append((timestamp, value, weight))
+                return samples
+
+    def _layout(self, mapped):
+        """Return (header size, record struct, record decoder, base time) of the mapped segment."""
+        magic, version = struct.unpack_from('<4sB', mapped, 0)
+        if magic == SEGMENT_MAGIC and version == SEGMENT_VERSION:
+            _, _, compacted, _, base_time = SEGMENT_HEADER.unpack_from(mapped, 0)
+            if compacted:
+                return SEGMENT_HEADER.size, ROLLUP_RECORD, tuple, base_time
+            return SEGMENT_HEADER.size, RAW_RECORD, lambda fields: fields + (1,), base_time
+        if magic == SEGMENT_MAGIC and version == 1 and len(mapped) >= V1_HEADER.size:
+            _, _, _, _, base_time, anchor_bits = V1_HEADER.unpack_from(mapped, 0)
+            # Version 1 rollups did not keep their sample counts; each counts as one sample
+            return V1_HEADER.size, V1_RECORD, lambda fields: (fields[0], _from_bits(fields[1] ^ anchor_bits), 1), base_time
+        raise ValueError(f"Not a metric archive segment: {self.path}")
+
+    @staticmethod
+    def _search(mapped, header_size, record, count, target_offset):
+        """Index of the first record whose offset is >= ``target_offset``."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            offset = record.unpack_from(mapped, header_size + middle * record.size)[0]
+            if offset < target_offset:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+class _SegmentWriter:
+    """Append handle for the segment currently receiving samples of one metric."""
+
+    def __init__(self, path, partition_start, step=0, compacted=False):
+        self.path = path
+        self.partition_start = partition_start
+        self.end_time = partition_start
+        self.step = step
+        self.compacted = compacted
+        self.record = ROLLUP_RECORD if compacted else RAW_RECORD
+        self.base_time = partition_start
+        samples = []
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size >= SEGMENT_HEADER.size:
+            with open(path, 'rb') as segment_file:
+                magic, version, _, _, base_time = SEGMENT_HEADER.unpack(segment_file.read(SEGMENT_HEADER.size))
+            if version == SEGMENT_VERSION:
+                self.base_time = base_time
+                # Drop a partially written trailing record so appends stay aligned
+                aligned = size - (size - SEGMENT_HEADER.size) % self.record.size
+                if aligned != size:
+                    os.truncate(path, aligned)
+            else:
+                # An older segment is rewritten in the current format before appending to it
+                samples = Segment(path).read_weighted()
+                os.truncate(path, 0)
+            size = os.path.getsize(path)
+        elif size:
+            # A partially written header
+            os.truncate(path, 0)
+            size = 0
+
+        self.file = open(path, 'ab')
+        if not size:
+            self.file.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, int(self.compacted), self.step, self.base_time))
+            for timestamp, value, count in samples:
+                self.append(timestamp, value, count)
+        else:
+            samples = Segment(path).read()
+            if samples:
+                self.end_time = samples[-1][0]
+
+    def append(self, timestamp, value, count=1):
+        offset = max(int(round((timestamp - self.base_time) * 1000)), 0)
+        if self.compacted:
+            self.file.write(self.record.pack(offset, float(value), count))
+        else:
+            self.file.write(self.record.pack(offset, float(value)))
+        self.end_time = max(self.end_time, timestamp)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class MetricArchive:
+    """Append-only, time-partitioned on-disk archive of metric samples.
+
+    Samples go to one segment per metric and partition (an hour by default).
+    Segments are catalogued in the local SQLite database next to the request
+    limits. A background compactor merges raw segments older than
+    ``compact_after`` into per-day segments downsampled to ``compact_step``
+    and deletes the oldest segments once the archive exceeds its disk budget.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, directory='metric_archive', db_name='request_limit.db', partition_seconds=3600,
+                 compact_after=86400, compact_step=60, disk_budget=512 * 1024 ** 2,
+                 flush_interval=10.0, compact_interval=300.0):
+        self.directory = directory
+        self.partition_seconds = partition_seconds
+        self.compact_after = compact_after
+        self.compact_step = compact_step
+        self.compact_partition = 86400
+        self.disk_budget = disk_budget
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+
+        os.makedirs(self.directory, exist_ok=True)
+        Database(db_name).create_db()
+        self._conn = sqlite3.connect(db_name, check_same_thread=False)
+        self._writers = {}
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide archive, creating it and starting its compactor on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                cls._shared.start()
+            return cls._shared
+
+    def _segment_path(self, metric, partition_start, step=0):
+        metric_dir = os.path.join(self.directory, re.sub(r'[^A-Za-z0-9._-]', '_', metric))
+        os.makedirs(metric_dir, exist_ok=True)
+        suffix = f'-c{step}' if step else ''
+        return os.path.join(metric_dir, f'{int(partition_start)}{suffix}.seg')
+
+    def _catalog(self, metric, writer, step=0):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO metric_segments (path, metric, start_time, end_time, step, size) VALUES (?, ?, ?, ?, ?, ?)',
+            (writer.path, metric, writer.partition_start, writer.end_time, step, os.path.getsize(writer.path)),
+        )
+
+    def append(self, metric, timestamp, value):
+        """Append one sample, rolling over to a new segment at partition boundaries."""
+        partition_start = timestamp - timestamp % self.partition_seconds
+        with self._lock:
+            writer = self._writers.get(metric)
+            if writer is None or writer.partition_start != partition_start:
+                if writer is not None:
+                    self._close_writer(metric, writer)
+                writer = _SegmentWriter(self._segment_path(metric, partition_start), partition_start)
+                self._writers[metric] = writer
+            writer.append(timestamp, value)
+
+    def append_many(self, timestamp, values):
+        """Append one sample per metric, all taken at ``timestamp``."""
+        with self._lock:
+            for metric, value in values.items():
+                self.append(metric, timestamp, value)
+
+    def _close_writer(self, metric, writer):
+        writer.close()
+        self._catalog(metric, writer)
+        self._conn.commit()
+
+    def flush(self):
+        """Flush open segments and record their current extent in the catalog."""
+        with self._lock:
+            for metric, writer in self._writers.items():
+                writer.flush()
+                self._catalog(metric, writer)
+            self._conn.commit()
+
+    def query(self, metric, start, end=None):
+        """Return [(timestamp, value), ...] for ``metric`` between ``start`` and ``end``."""
+        end = time.time() if end is None else end
+        with self._lock:
+            writer = self._writers.get(metric)
+            if writer is not None:
+                writer.flush()
+                self._catalog(metric, writer)
+                self._conn.commit()
+            rows = self._conn.execute(
+                'SELECT path FROM metric_segments WHERE metric = ? AND end_time >= ? AND start_time <= ? ORDER BY start_time',
+                (metric, start, end),
+            ).fetchall()
+
+        samples = []
+        for (path,) in rows:
+            try:
+                samples.extend(Segment(path).read(start, end))
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading archive segment {path}: {e}")
+        samples.sort()
+        return samples
+
+    def metrics(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT DISTINCT metric FROM metric_segments ORDER BY metric')]
+
+    def compact(self, now=None):
+        """Merge and downsample old raw segments, then enforce the disk budget."""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT path, metric, start_time FROM metric_segments WHERE step = 0 AND end_time < ? ORDER BY start_time',
+                (now - self.compact_after,),
+            ).fetchall()
+            open_paths = {writer.path for writer in self._writers.values()}
+
+            groups = {}
+            for path, metric, start_time in rows:
+                if path in open_paths:
+                    continue
+                day = start_time - start_time % self.compact_partition
+                groups.setdefault((metric, day), []).append(path)
+
+            for (metric, day), paths in groups.items():
+                self._compact_group(metric, day, paths)
+
+            self._enforce_budget()
+            self._conn.commit()
+
+    def _compact_group(self, metric, day, paths):
+        target = self._segment_path(metric, day, self.compact_step)
+        samples = []
+        for path in paths + ([target] if os.path.exists(target) else []):
+            try:
+                samples.extend(Segment(path).read_weighted())
+            except (OSError, ValueError) as e:
+                logger.error(f"Skipping unreadable archive segment {path}: {e}")
+
+        # Average every compact_step bucket into a single sample at the bucket start; a bucket compacted
+        # earlier weighs as many raw samples as it averages
+        buckets = {}
+        for timestamp, value, weight in samples:
+            bucket = timestamp - timestamp % self.compact_step
+            total, count = buckets.get(bucket, (0.0, 0))
+            buckets[bucket] = (total + value * weight, count + weight)
+
+        temporary = target + '.tmp'
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        writer = _SegmentWriter(temporary, day, step=self.compact_step, compacted=True)
+        for bucket in sorted(buckets):
+            total, count = buckets[bucket]
+            writer.append(bucket, total / count, count)
+        writer.close()
+        os.replace(temporary, target)
+        writer.path = target
+        self._catalog(metric, writer, step=self.compact_step)
+
+        for path in paths:
+            if path != target and os.path.exists(path):
+                os.remove(path)
+            self._conn.execute('DELETE FROM metric_segments WHERE path = ?', (path,))
+        logger.info("Compacted %s segments of %s into %s.", len(paths), metric, target)
+
+    def _enforce_budget(self):
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM metric_segments').fetchone()[0]
+        if total <= self.disk_budget:
+            return
+        open_paths = {writer.path for writer in self._writers.values()}
+        for path, size in self._conn.execute('SELECT path, size FROM metric_segments ORDER BY start_time').fetchall():
+            if total <= self.disk_budget:
+                break
+            if path in open_paths:
+                continue
+            if os.path.exists(path):
+                os.remove(path)
+            self._conn.execute('DELETE FROM metric_segments WHERE path = ?', (path,))
+            total -= size
+            logger.warning(f"Removed archive segment {path} to stay within the disk budget.")
+
+    def start(self):
+        """Start the background flush and compaction thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='metric-archive', daemon=True)
+        self._thread.start()
+        logger.info("Metric archive started in %s.", self.directory)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 2)
+            self._thread = None
+        with self._lock:
+            for metric, writer in list(self._writers.items()):
+                self._close_writer(metric, writer)
+            self._writers.clear()
+        logger.info("Metric archive stopped.")
+
+    def _run(self):
+        last_compaction = 0.0
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.monotonic() - last_compaction >= self.compact_interval:
+                    self.compact()
+                    last_compaction = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error maintaining metric archive: {e}")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+import time
+from array import array
+import psutil
+from cpu_sampler import CPUSampler
+from network_sampler import NetworkSampler
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+# (step in seconds, number of buckets): 1 s for 10 min, 10 s for 6 h, 1 min for 7 d
+DEFAULT_RESOLUTIONS = ((1, 600), (10, 2160), (60, 10080))
+
+
+class RingBuffer:
+    """Fixed-size, array-backed series of min/max/sum/count buckets at one resolution.
+
+    Bucket ``n`` covers ``[n * step, (n + 1) * step)`` and lives at position
+    ``n % size``; a position is reused (and reset) once its bucket falls out
+    of the retention window.
+    """
+
+    def __init__(self, step, size):
+        self.step = step
+        self.size = size
+        self.buckets = array('q', [-1]) * size
+        self.counts = array('L', [0]) * size
+        self.minimums = array('d', [0.0]) * size
+        self.maximums = array('d', [0.0]) * size
+        self.totals = array('d', [0.0]) * size
+
+    @property
+    def retention(self):
+        return self.step * self.size
+
+    def add(self, timestamp, value):
+        bucket = int(timestamp // self.step)
+        position = bucket % self.size
+        if self.buckets[position] != bucket:
+            self.buckets[position] = bucket
+            self.counts[position] = 1
+            self.minimums[position] = value
+            self.maximums[position] = value
+            self.totals[position] = value
+            return
+        self.counts[position] += 1
+        if value < self.minimums[position]:
+            self.minimums[position] = value
+        if value > self.maximums[position]:
+            self.maximums[position] = value
+        self.totals[position] += value
+
+    def query(self, start, end):
+        """Yield (bucket start, count, min, max, sum) for stored buckets within [start, end]."""
+        first = int(start // self.step)
+        last = int(end // self.step)
+        # Older buckets than the ring can hold have already been overwritten
+        first = max(first, last - self.size + 1)
+        for bucket in range(first, last + 1):
+            position = bucket % self.size
+            if self.buckets[position] == bucket:
+                yield (bucket * self.step, self.counts[position], self.minimums[position],
+                       self.maximums[position], self.totals[position])
+
+
+class MetricHistory:
+    """Multi-resolution history of named metrics kept in memory."""
+
+    def __init__(self, resolutions=DEFAULT_RESOLUTIONS):
+        self.resolutions = tuple(sorted(resolutions))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def metrics(self):
+        with self._lock:
+            return sorted(self._series)
+
+    def record(self, metric, timestamp, value):
+        """Add one sample to every resolution of ``metric``."""
+        with self._lock:
+            buffers = self._series.get(metric)
+            if buffers is None:
+                buffers = [RingBuffer(step, size) for step, size in self.resolutions]
+                self._series[metric] = buffers
+            for buffer in buffers:
+                buffer.add(timestamp, value)
+
+    def query(self, metric, start, end=None, step=None):
+        """Return ``(step, points)`` for ``metric`` between ``start`` and ``end``.
+
+        Each point is ``[timestamp, min, max, avg]``. The finest resolution
+        that still covers ``start`` and is no coarser than ``step`` is read
+        and its buckets are rolled up to ``step``.
+        """
+        now = time.time()
+        end = now if end is None else end
+        with self._lock:
+            buffers = self._series.get(metric)
+            if buffers is None:
+                raise KeyError(metric)
+
+            candidates = [buffer for buffer in buffers if step is None or buffer.step <= step]
+            # One bucket of slack so a full-retention query ('from=-600') stays on its resolution
+            buffer = next((buffer for buffer in candidates if now - start <= buffer.retention + buffer.step), None)
+            if buffer is None:
+                # Nothing covers the whole range; fall back to the longest retention allowed
+                buffer = candidates[-1] if candidates else buffers[0]
+            step = buffer.step if step is None else max(int(step), buffer.step)
+            rows = list(buffer.query(start, end))
+
+        points = []
+        current = None
+        for bucket_start, count, minimum, maximum, total in rows:
+            slot = bucket_start - bucket_start % step
+            if current is None or current[0] != slot:
+                current = [slot, count, minimum, maximum, total]
+                points.append(current)
+                continue
+            current[1] += count
+            current[2] = min(current[2], minimum)
+            current[3] = max(current[3], maximum)
+            current[4] += total
+        return step, [[slot, minimum, maximum, total / count] for slot, count, minimum, maximum, total in points]
+
+
+def rollup(samples, step):
+    """Roll time-ordered (timestamp, value) samples up to ``[timestamp, min, max, avg]`` points every ``step`` seconds."""
+    points = []
+    current = None
+    for timestamp, value in samples:
+        slot = int(timestamp - timestamp % step)
+        if current is None or current[0] != slot:
+            current = [slot, 1, value, value, value]
+            points.append(current)
+            continue
+        current[1] += 1
+        current[2] = min(current[2], value)
+        current[3] = max(current[3], value)
+        current[4] += value
+    return [[slot, minimum, maximum, total / count] for slot, count, minimum, maximum, total in points]
+
+
+class HistoryRecorder:
+    """Background thread that records host metrics into a MetricHistory every ``interval`` seconds."""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, history=None, interval=1.0, disk_path=None, cpu_sampler=None, archive=None, network_sampler=None):
+        self.history = history if history is not None else MetricHistory()
+        # Optional MetricArchive that receives every sample for long-term storage
+        self.archive = archive
+        # Callables invoked with (timestamp, values) after every sample
+        self.listeners = []
+        self.interval = interval
+        # Filesystem whose usage is recorded; the root of the current drive by default
+        self.disk_path = disk_path if disk_path is not None else os.path.abspath(os.sep)
+        self.cpu_sampler = cpu_sampler if cpu_sampler is not None else CPUSampler.shared()
+        self.network_sampler = network_sampler if network_sampler is not None else NetworkSampler.shared()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def shared(cls, archive=None):
+        """Return the process-wide recorder, creating and starting it on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(archive=archive)
+                cls._shared.start()
+            return cls._shared
+
+    def add_listener(self, listener):
+        """Call ``listener(timestamp, values)`` after every sample."""
+        self.listeners.append(listener)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        logger.info("Starting metric history recorder with a %s second period.", self.interval)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='history-recorder', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+        logger.info("Metric history recorder stopped.")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error recording metric history: {e}")
+
+    def collect(self):
+        """Read the current value of every recorded metric."""
+        values = {}
+        cpu_sample = self.cpu_sampler.latest(timeout=0)
+        if cpu_sample is not None:
+            values['cpu.percent'] = cpu_sample.percent
+
+        v_memory = psutil.virtual_memory()
+        values['memory.percent'] = v_memory.percent
+        values['memory.used'] = v_memory.used
+
+        s_memory = psutil.swap_memory()
+        values['swap.percent'] = s_memory.percent
+        values['swap.used'] = s_memory.used
+
+        disk = psutil.disk_usage(self.disk_path)
+        values['disk.percent'] = disk.percent
+        values['disk.used'] = disk.used
+
+        network = psutil.net_io_counters()
+        values['net.bytes_sent'] = network.bytes_sent
+        values['net.bytes_recv'] = network.bytes_recv
+        values['net.packets_sent'] = network.packets_sent
+        values['net.packets_recv'] = network.packets_recv
+
+        # Rates of all interfaces over the sampler's shortest window, in per-second units
+        window_rates = self.network_sampler.rates(timeout=0)
+        if window_rates is not None:
+            rates = NetworkSampler.total(window_rates)
+            values['net.bytes_sent_rate'] = rates.bytes_sent
+            values['net.bytes_recv_rate'] = rates.bytes_recv
+            values['net.packets_sent_rate'] = rates.packets_sent
+            values['net.packets_recv_rate'] = rates.packets_recv
+            values['net.errors_rate'] = rates.errin + rates.errout
+            values['net.drops_rate'] = rates.dropin + rates.dropout
+        return values
+
+    def sample(self):
+        timestamp = time.time()
+        values = self.collect()
+        for metric, value in values.items():
+            self.history.record(metric, timestamp, value)
+        if self.archive is not None:
+            self.archive.append_many(timestamp, values)
+        for listener in self.listeners:
+            try:
+                listener(timestamp, values)
+            except Exception as e:
+                logger.error(f"Error in metric history listener: {e}")
+        return timestamp, values
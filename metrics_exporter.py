@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+import threading
+import psutil
+from cpu_management import CPUManager
+from disk_management import DiskManager
+from memory_management import MemoryManager
+from network_management import NetworkManager
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Seconds between background refreshes of the exposition; well under a typical 15 second scrape interval
+DEFAULT_REFRESH_INTERVAL = 5.0
+
+# (metric family, type, help) in exposition order
+METRIC_FAMILIES = (
+    ('system_cpu_usage_percent', 'gauge', 'Total CPU utilization over the last sampling period.'),
+    ('system_cpu_time_seconds', 'counter', 'CPU time spent in each mode since boot.'),
+    ('system_cpu_logical_count', 'gauge', 'Number of logical CPUs.'),
+    ('system_memory_bytes', 'gauge', 'System memory by state.'),
+    ('system_memory_usage_percent', 'gauge', 'System memory in use.'),
+    ('system_swap_bytes', 'gauge', 'Swap memory by state.'),
+    ('system_swap_usage_percent', 'gauge', 'Swap memory in use.'),
+    ('system_swap_io_bytes', 'counter', 'Bytes swapped in and out since boot.'),
+    ('system_disk_bytes', 'gauge', 'Filesystem space by state.'),
+    ('system_disk_usage_percent', 'gauge', 'Filesystem space in use.'),
+    ('system_network_io_bytes', 'counter', 'Bytes sent and received since boot.'),
+    ('system_network_io_packets', 'counter', 'Packets sent and received since boot.'),
+    ('system_network_errors', 'counter', 'Network errors since boot.'),
+    ('system_network_dropped_packets', 'counter', 'Dropped packets since boot.'),
+    ('system_processes', 'gauge', 'Number of processes.'),
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    """Render a label set once, e.g. ``{mode="user"}``."""
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class OpenMetricsExporter:
+    """Renders the managers' raw reports as OpenMetrics text.
+
+    A background thread collects and renders the exposition every
+    ``interval`` seconds, so a scrape only returns the latest bytes and never
+    waits for a collector (a hung mount included). Label sets are rendered
+    once and reused across refreshes.
+    """
+
+    # Label sets that never change at runtime
+    DIRECTION_LABELS = {'transmit': _labels(direction='transmit'), 'receive': _labels(direction='receive')}
+    SWAP_DIRECTION_LABELS = {'in': _labels(direction='in'), 'out': _labels(direction='out')}
+    MEMORY_STATE_LABELS = {state: _labels(state=state) for state in ('total', 'available', 'used', 'free')}
+    DISK_STATES = ('total', 'used', 'free')
+
+    def __init__(self, interval=DEFAULT_REFRESH_INTERVAL, cpu_manager=None):
+        if interval <= 0:
+            raise ValueError('Refresh interval must be greater than zero.')
+        self.interval = interval
+        self.cpu_manager = cpu_manager if cpu_manager is not None else CPUManager()
+        self._mode_labels = {}
+        self._partition_labels = {}
+        self._exposition = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _mode_label(self, mode):
+        label = self._mode_labels.get(mode)
+        if label is None:
+            label = self._mode_labels[mode] = _labels(mode=mode)
+        return label
+
+    def _partition_label(self, partition, state=None):
+        key = (partition.device, partition.mountpoint, partition.fstype, state)
+        label = self._partition_labels.get(key)
+        if label is None:
+            labels = {'device': partition.device, 'mountpoint': partition.mountpoint, 'fstype': partition.fstype}
+            if state is not None:
+                labels['state'] = state
+            label = self._partition_labels[key] = _labels(**labels)
+        return label
+
+    def collect(self):
+        """Collect the raw reports rendered into the exposition."""
+        return {
+            'cpu': self.cpu_manager.raw_report(),
+            'memory': MemoryManager.raw_report(),
+            'disk': DiskManager().raw_report(),
+            'network': NetworkManager.raw_report(check_connectivity=False),
+            'processes': len(psutil.pids()),
+        }
+
+    def render(self, snapshot):
+        """Render a collected snapshot as OpenMetrics text."""
+        samples = {name: [] for name, _, _ in METRIC_FAMILIES}
+
+        cpu = snapshot['cpu']
+        samples['system_cpu_usage_percent'].append(('', cpu.percent))
+        for mode, seconds in cpu.times.items():
+            samples['system_cpu_time_seconds'].append((self._mode_label(mode), seconds))
+        samples['system_cpu_logical_count'].append(('', cpu.logical_count))
+
+        memory = snapshot['memory']
+        state_labels = self.MEMORY_STATE_LABELS
+        samples['system_memory_bytes'].extend((
+            (state_labels['total'], memory.total),
+            (state_labels['available'], memory.available),
+            (state_labels['used'], memory.used),
+            (state_labels['free'], memory.free),
+        ))
+        samples['system_memory_usage_percent'].append(('', memory.percent))
+        samples['system_swap_bytes'].extend((
+            (state_labels['total'], memory.swap_total),
+            (state_labels['used'], memory.swap_used),
+            (state_labels['free'], memory.swap_free),
+        ))
+        samples['system_swap_usage_percent'].append(('', memory.swap_percent))
+        samples['system_swap_io_bytes'].extend((
+            (self.SWAP_DIRECTION_LABELS['in'], memory.swap_in),
+            (self.SWAP_DIRECTION_LABELS['out'], memory.swap_out),
+        ))
+
+        for partition in snapshot['disk'].partitions:
+            if partition.total is None:
+                continue
+            for state in self.DISK_STATES:
+                samples['system_disk_bytes'].append((self._partition_label(partition, state), getattr(partition, state)))
+            samples['system_disk_usage_percent'].append((self._partition_label(partition), partition.percent))
+
+        network = snapshot['network']
+        transmit, receive = self.DIRECTION_LABELS['transmit'], self.DIRECTION_LABELS['receive']
+        samples['system_network_io_bytes'].extend(((transmit, network.bytes_sent), (receive, network.bytes_recv)))
+        samples['system_network_io_packets'].extend(((transmit, network.packets_sent), (receive, network.packets_recv)))
+        samples['system_network_errors'].extend(((transmit, network.errout), (receive, network.errin)))
+        samples['system_network_dropped_packets'].extend(((transmit, network.dropout), (receive, network.dropin)))
+
+        samples['system_processes'].append(('', snapshot['processes']))
+
+        lines = []
+        for name, metric_type, help_text in METRIC_FAMILIES:
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.append(f'# HELP {name} {help_text}')
+            sample_name = f'{name}_total' if metric_type == 'counter' else name
+            for labels, value in samples[name]:
+                lines.append(f'{sample_name}{labels} {value}')
+        lines.append('# EOF\n')
+        return '\n'.join(lines).encode()
+
+    def refresh(self):
+        """Collect and render a new exposition and make it the one scrapes return."""
+        exposition = self.render(self.collect())
+        with self._lock:
+            self._exposition = exposition
+        return exposition
+
+    def start(self):
+        """Render the first exposition and start the refresh thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        logger.info("Starting OpenMetrics exporter with a %s second refresh period.", self.interval)
+        try:
+            self.refresh()
+        except (Exception, SystemExit) as e:
+            # Managers still call sys.exit on failure; the first scrape renders it instead
+            logger.error(f"Error rendering the first OpenMetrics exposition: {e!r}")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-exporter', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the refresh thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+        logger.info("OpenMetrics exporter stopped.")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.refresh()
+            except (Exception, SystemExit) as e:
+                # Managers still call sys.exit on failure; keep serving the last exposition and retry next tick
+                logger.error(f"Error refreshing OpenMetrics exposition: {e!r}")
+
+    def exposition(self):
+        """Return the latest OpenMetrics text; it is only built here if no refresh has succeeded yet."""
+        with self._lock:
+            exposition = self._exposition
+        if exposition is None:
+            try:
+                exposition = self.refresh()
+            except SystemExit as e:
+                # Surface it as an error of this scrape rather than stopping the server
+                raise RuntimeError('OpenMetrics exposition could not be collected.') from e
+        return exposition
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import psutil
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+# Filesystems without meaningful capacity; their mounts are not queried for usage
+DEFAULT_SKIP_FSTYPES = frozenset({
+    'autofs', 'binfmt_misc', 'bpf', 'cgroup', 'cgroup2', 'configfs', 'debugfs', 'devpts', 'fusectl',
+    'hugetlbfs', 'mqueue', 'nsfs', 'proc', 'pstore', 'rpc_pipefs', 'securityfs', 'sysfs', 'tracefs',
+})
+# Seconds one report waits for the usage of the mounts, and workers querying them at once
+DEFAULT_USAGE_TIMEOUT = 2.0
+DEFAULT_MAX_WORKERS = 8
+# Mounts that time out this many times in a row are not queried again for QUARANTINE_SECONDS
+DEFAULT_QUARANTINE_AFTER = 2
+DEFAULT_QUARANTINE_SECONDS = 300.0
+
+# Usage statuses of a mount
+USAGE_OK = 'ok'
+USAGE_SKIPPED = 'skipped'
+USAGE_TIMEOUT = 'timeout'
+USAGE_QUEUED = 'queued'
+USAGE_QUARANTINED = 'quarantined'
+USAGE_ERROR = 'error'
+
+# Usage of one mount; usage is psutil's sdiskusage when status is 'ok', otherwise None
+MountUsage = collections.namedtuple('MountUsage', ['partition', 'usage', 'status', 'detail'])
+
+
+class MountUsageCollector:
+    """Reads the usage of every mount once, in parallel, without letting a hung mount stall the report.
+
+    ``statvfs`` on a stale NFS/CIFS mount can block forever, so each mount
+    is queried on a worker pool and the report waits at most ``timeout``
+    seconds for all of them. A query still running is not started again,
+    and a mount that times out ``quarantine_after`` times in a row is left
+    alone for ``quarantine_seconds``. A query that never got a worker (all
+    of them stuck on hung mounts) is cancelled and reported as queued; it
+    does not count against the mount. Once every worker of the pool is
+    stuck, later queries go to a new pool, so hung mounts cannot starve
+    healthy ones for longer than one report.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, skip_fstypes=DEFAULT_SKIP_FSTYPES, timeout=DEFAULT_USAGE_TIMEOUT, max_workers=DEFAULT_MAX_WORKERS,
+                 quarantine_after=DEFAULT_QUARANTINE_AFTER, quarantine_seconds=DEFAULT_QUARANTINE_SECONDS):
+        if timeout <= 0:
+            raise ValueError('Disk usage timeout must be greater than zero.')
+        self.skip_fstypes = frozenset(skip_fstypes)
+        self.timeout = timeout
+        self.quarantine_after = quarantine_after
+        self.quarantine_seconds = quarantine_seconds
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='disk-usage')
+        self._in_flight = {}   # mountpoint -> (future, executor) of a query that has not returned yet
+        self._hung = {}        # mountpoint -> executor whose worker is stuck on its timed-out query
+        self._timeouts = {}    # mountpoint -> consecutive timeouts
+        self._quarantined = {}  # mountpoint -> monotonic time the quarantine ends
+        # Reentrant: a query that is already done runs its callback while collect holds the lock
+        self._lock = threading.RLock()
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide collector."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def is_skipped(self, partition):
+        return partition.fstype in self.skip_fstypes
+
+    def quarantined(self):
+        """Mountpoints currently quarantined, with the seconds left."""
+        now = time.monotonic()
+        with self._lock:
+            return {mountpoint: round(until - now, 1) for mountpoint, until in self._quarantined.items() if until > now}
+
+    def collect(self, partitions):
+        """Return {mountpoint: MountUsage} for ``partitions``, querying each mountpoint once."""
+        results = {}
+        futures = {}
+        now = time.monotonic()
+        with self._lock:
+            if sum(1 for executor in self._hung.values() if executor is self._executor) >= self.max_workers:
+                # The stuck workers stay with the old pool and exit whenever their mounts answer
+                logger.warning("All %s disk usage workers are stuck on hung mounts; starting a new pool.", self.max_workers)
+                self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='disk-usage')
+            for partition in partitions:
+                mountpoint = partition.mountpoint
+                if mountpoint in results or mountpoint in futures:
+                    continue
+                if self.is_skipped(partition):
+                    results[mountpoint] = MountUsage(partition, None, USAGE_SKIPPED, f'{partition.fstype} is not queried')
+                    continue
+                until = self._quarantined.get(mountpoint)
+                if until is not None and until > now:
+                    results[mountpoint] = MountUsage(partition, None, USAGE_QUARANTINED,
+                                                     f'hung repeatedly; retried in {until - now:.0f} seconds')
+                    continue
+                # A query stuck since an earlier report is waited on, not duplicated
+                in_flight = self._in_flight.get(mountpoint)
+                if in_flight is None:
+                    in_flight = (self._executor.submit(psutil.disk_usage, mountpoint), self._executor)
+                    self._in_flight[mountpoint] = in_flight
+                    in_flight[0].add_done_callback(lambda _, mountpoint=mountpoint: self._finished(mountpoint))
+                future, executor = in_flight
+                futures[mountpoint] = (partition, future, executor)
+
+        if futures:
+            wait([future for _, future, _ in futures.values()], timeout=self.timeout)
+
+        with self._lock:
+            for mountpoint, (partition, future, executor) in futures.items():
+                # Only succeeds for a query still waiting for a worker; running and finished ones are kept
+                if future.cancel():
+                    results[mountpoint] = MountUsage(partition, None, USAGE_QUEUED,
+                                                     f'no free worker within {self.timeout} seconds')
+                    continue
+                if not future.done():
+                    self._hung[mountpoint] = executor
+                    count = self._timeouts.get(mountpoint, 0) + 1
+                    self._timeouts[mountpoint] = count
+                    if count >= self.quarantine_after:
+                        self._quarantined[mountpoint] = time.monotonic() + self.quarantine_seconds
+                        logger.warning("Quarantining mount %s for %s seconds after %s timeouts.",
+                                       mountpoint, self.quarantine_seconds, count)
+                    results[mountpoint] = MountUsage(partition, None, USAGE_TIMEOUT, f'timed out after {self.timeout} seconds')
+                    continue
+                self._timeouts.pop(mountpoint, None)
+                self._quarantined.pop(mountpoint, None)
+                error = future.exception()
+                if error is not None:
+                    results[mountpoint] = MountUsage(partition, None, USAGE_ERROR, str(error))
+                else:
+                    results[mountpoint] = MountUsage(partition, future.result(), USAGE_OK, None)
+        # In the order of the partitions
+        return {partition.mountpoint: results[partition.mountpoint] for partition in partitions}
+
+    def _finished(self, mountpoint):
+        with self._lock:
+            self._in_flight.pop(mountpoint, None)
+            self._hung.pop(mountpoint, None)
@@ -3,79 +3,110 @@
 import json
 import psutil
 import socket
-import netifaces
 import sys
+import time
 from report_signatures import TimeStampGenerator
-import logging  # Import logging module
+from report_schema import NetworkReport
+from connectivity_probe import ConnectivityMonitor
+from interface_topology import TopologyCache
+from network_sampler import NetworkSampler
+from log_config import get_logger
 
 # Configure logging
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
-# Create file handler for logging to a file
-file_handler = logging.FileHandler('system_analysis.log')
-file_handler.setLevel(logging.DEBUG)  # Write all logs (DEBUG and higher) to the file
-
-# Create a formatter and attach it to the file handler
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-
-# Add the file handler to the logger
-logger.addHandler(file_handler)
-
-# Set the logger's level to DEBUG to capture all log levels
-logger.setLevel(logging.DEBUG)
+# Connectivity statuses reported by the connectivity checks
+LOCALHOST_CONNECTED = "PC is connected to localhost."
+INTERNET_CONNECTED = "PC is connected to the internet."
 
 class NetworkManager:
-    def __init__(self):
+    # Connection views reported by gather_all_info, as (address families, socket types)
+    CONNECTION_KINDS = {
+        "inet": ((socket.AF_INET, socket.AF_INET6), (socket.SOCK_STREAM, socket.SOCK_DGRAM)),  # IPv4 and IPv6
+        "inet4": ((socket.AF_INET,), (socket.SOCK_STREAM, socket.SOCK_DGRAM)),  # IPv4
+        "inet6": ((socket.AF_INET6,), (socket.SOCK_STREAM, socket.SOCK_DGRAM)),  # IPv6
+        "tcp": ((socket.AF_INET, socket.AF_INET6), (socket.SOCK_STREAM,)),  # TCP
+        "tcp4": ((socket.AF_INET,), (socket.SOCK_STREAM,)),  # TCP over IPv4
+        "tcp6": ((socket.AF_INET6,), (socket.SOCK_STREAM,)),  # TCP over IPv6
+        "udp": ((socket.AF_INET, socket.AF_INET6), (socket.SOCK_DGRAM,)),  # UDP
+        "udp4": ((socket.AF_INET,), (socket.SOCK_DGRAM,)),  # UDP over IPv4
+        "udp6": ((socket.AF_INET6,), (socket.SOCK_DGRAM,)),  # UDP over IPv6
+    }
+    # Views reported by default; every socket appears in exactly one of them
+    DEFAULT_CONNECTION_KINDS = ("tcp4", "tcp6", "udp4", "udp6")
+    # Views overlapping the default ones; each is only built when asked for with fields=connections_<kind>
+    WIDE_CONNECTION_KINDS = ("inet", "inet4", "inet6", "tcp", "udp")
+
+    # Sub-collections of network_report that can be requested on their own with fields=
+    DEFAULT_FIELDS = ('localhost', 'internet', 'traffic', 'rates', 'interface_stats', 'interface_addrs', 'connections', 'interfaces')
+    FIELDS = DEFAULT_FIELDS + tuple(f'connections_{kind}' for kind in WIDE_CONNECTION_KINDS)
+
+    def __init__(self, connection_kinds=None):
         self.data = {
             "interface_stats": {},
             "interface_addrs": {},
             "connections": {}
         }
+        # Connection views to report; defaults to the non-overlapping DEFAULT_CONNECTION_KINDS
+        self.connection_kinds = list(connection_kinds) if connection_kinds is not None else list(self.DEFAULT_CONNECTION_KINDS)
+        unknown = set(self.connection_kinds) - set(self.CONNECTION_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown connection kinds: {', '.join(sorted(unknown))}")
+
+    @staticmethod
+    # Function to read the last result of a background connectivity probe (None until it first completes)
+    def connectivity_result(name):
+        return ConnectivityMonitor.shared().result(name)
+
+    @staticmethod
+    # Function to describe the age of a probe result
+    def connectivity_age(result):
+        return f'{ConnectivityMonitor.age(result):.1f} seconds ago' if result is not None else 'Not checked yet'
 
     @staticmethod
     # Function to check localhost connectivity
     def check_localhost_connectivity():
-        try:
-            logger.info("Checking localhost connectivity.")
-            socket.gethostbyname('127.0.0.1')
-            status = "PC is connected to localhost."
-            logger.info("PC is connected to localhost.")
-        except socket.gaierror:
-            status = "PC isn't connected to localhost."
-            logger.warning("PC isn't connected to localhost.")
-        finally:
-            socket.socket(socket.AF_INET, socket.SOCK_STREAM).close()
-
-        return status
+        logger.info("Reading localhost connectivity.")
+        result = NetworkManager.connectivity_result('localhost')
+        if result is None:
+            return "Localhost connectivity has not been checked yet."
+        return LOCALHOST_CONNECTED if result.ok else "PC isn't connected to localhost."
 
     @staticmethod
     # Function to check network connectivity
     def check_network_connectivity():
-        try:
-            logger.info("Checking network connectivity.")
-            socket.gethostbyname('www.google.com')
-            status = "PC is connected to the internet."
-            logger.info("PC is connected to the internet.")
-        except socket.gaierror:
-            status = "PC isn't connected to the internet."
-            logger.warning("PC isn't connected to the internet.")
-        finally:
-            socket.socket(socket.AF_INET, socket.SOCK_STREAM).close()
+        logger.info("Reading network connectivity.")
+        result = NetworkManager.connectivity_result('internet')
+        if result is None:
+            return "Network connectivity has not been checked yet."
+        return INTERNET_CONNECTED if result.ok else "PC isn't connected to the internet."
 
-        return status
+    @staticmethod
+    # Function to format a rate in bytes per second as megabits per second
+    def format_bit_rate(bytes_per_second):
+        return f'{bytes_per_second * 8 / 1e6:.2f} Mbps'
 
     @staticmethod
-    # Function to monitor network traffic
+    # Function to monitor network traffic: totals since boot and current rates
     def monitor_network_traffic():
         try:
             logger.info("Monitoring network traffic.")
             network = psutil.net_io_counters()
-            logger.debug(f"Network Traffic: {network}")
+            logger.debug("Network Traffic: %s", network)
+            # Rates over the sampler's shortest window; unknown until it has two samples
+            window_rates = NetworkSampler.shared().rates()
+            if window_rates is not None:
+                rates = NetworkSampler.total(window_rates)
+                send_rate = NetworkManager.format_bit_rate(rates.bytes_sent)
+                receive_rate = NetworkManager.format_bit_rate(rates.bytes_recv)
+            else:
+                send_rate = receive_rate = 'Not sampled yet'
             return {
                 'Network Traffic Information': {
-                    'Send': f'{network.bytes_sent / (1024 ** 2):.2f} Mbps',
-                    'Received': f'{network.bytes_recv / (1024 ** 2):.2f} Mbps',
+                    'Sent Since Boot': f'{network.bytes_sent / (1024 ** 2):.2f} MiB',
+                    'Received Since Boot': f'{network.bytes_recv / (1024 ** 2):.2f} MiB',
+                    'Send Rate': send_rate,
+                    'Receive Rate': receive_rate,
                 },
                 'Extra Information': {
                     'Packets Sent': f'{network.packets_sent}',
@@ -90,50 +121,73 @@ class NetworkManager:
             logger.error(f"Error monitoring network traffic: {e}")
             sys.exit(1)
 
+    @staticmethod
+    # Function to report per-interface rates over every window of the network sampler
+    def monitor_interface_rates():
+        try:
+            logger.info("Monitoring network interface rates.")
+            interface_rates = {}
+            for window_rates in NetworkSampler.shared().all_rates():
+                window = f'{window_rates.window:g}s'
+                for nic, rates in window_rates.rates.items():
+                    interface_rates.setdefault(nic, {})[window] = {
+                        'Send': NetworkManager.format_bit_rate(rates.bytes_sent),
+                        'Receive': NetworkManager.format_bit_rate(rates.bytes_recv),
+                        'Packets Sent': f'{rates.packets_sent:.1f}/s',
+                        'Packets Received': f'{rates.packets_recv:.1f}/s',
+                        'ErrorIn': f'{rates.errin:.2f}/s',
+                        'ErrorOut': f'{rates.errout:.2f}/s',
+                        'DropIn': f'{rates.dropin:.2f}/s',
+                        'DropOut': f'{rates.dropout:.2f}/s',
+                        'Measured Over': f'{window_rates.span:.1f} sec',
+                    }
+            return interface_rates
+        except Exception as e:
+            logger.error(f"Error monitoring network interface rates: {e}")
+            sys.exit(1)
+
     def gather_interface_stats(self):
-        """Gathers network interface statistics."""
+        """Gathers network interface statistics from the cached interface topology."""
         try:
             logger.info("Gathering network interface statistics.")
-            stats = psutil.net_if_stats()
-            for iface, info in stats.items():
-                self.data["interface_stats"][iface] = {
-                    "isup": info.isup,
-                    "duplex": self._get_duplex_name(info.duplex),
-                    "speed": info.speed,
-                    "mtu": info.mtu,
-                    "flags": info.flags
-                }
+            self.data["interface_stats"].update(TopologyCache.shared().get().stats)
             logger.info("Network interface statistics gathered successfully.")
         except Exception as e:
             logger.error(f"Error gathering interface stats: {e}")
 
     def gather_interface_addrs(self):
-        """Gathers network interface addresses."""
+        """Gathers network interface addresses from the cached interface topology."""
         try:
             logger.info("Gathering network interface addresses.")
-            addrs = psutil.net_if_addrs()
-            for iface, info_list in addrs.items():
-                self.data["interface_addrs"][iface] = []
-                for info in info_list:
-                    self.data["interface_addrs"][iface].append({
-                        "family": self._get_family_name(info.family),
-                        "address": info.address,
-                        "netmask": info.netmask,
-                        "broadcast": info.broadcast,
-                        "ptp": info.ptp
-                    })
+            self.data["interface_addrs"].update(TopologyCache.shared().get().addrs)
             logger.info("Network interface addresses gathered successfully.")
         except Exception as e:
             logger.error(f"Error gathering interface addresses: {e}")
 
-    def gather_connections(self, kind: str):
-        """Gathers network connections of a specific kind."""
+    def gather_connections(self, kinds=None):
+        """Gathers network connections for the given kinds from a single socket table scan."""
+        if kinds is None:
+            kinds = self.connection_kinds
+        elif isinstance(kinds, str):
+            kinds = [kinds]
         try:
-            logger.info(f"Gathering network connections for kind: {kind}")
-            connections = psutil.net_connections(kind=kind)
-            self.data["connections"][kind] = []
-            for conn in connections:
-                self.data["connections"][kind].append({
+            logger.info("Gathering network connections for kinds: %s", ', '.join(kinds))
+            # Route every (family, type) pair to the views that include it
+            routes = {}
+            for kind in kinds:
+                self.data["connections"][kind] = []
+                families, types = self.CONNECTION_KINDS[kind]
+                for family in families:
+                    for socket_type in types:
+                        routes.setdefault((family, socket_type), []).append(self.data["connections"][kind])
+
+            # 'inet' covers every view above, so the socket table is parsed once
+            for conn in psutil.net_connections(kind='inet'):
+                views = routes.get((conn.family, conn.type))
+                if not views:
+                    continue
+                # Built once and shared by every view the connection belongs to
+                entry = {
                     "fd": conn.fd,
                     "family": self._get_family_name(conn.family),
                     "type": self._get_socket_type_name(conn.type),
@@ -141,38 +195,21 @@ class NetworkManager:
                     "remote_address": f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else "None",
                     "status": conn.status,
                     "pid": conn.pid if conn.pid is not None else 'None'
-                })
-            logger.info(f"Network connections for kind '{kind}' gathered successfully.")
+                }
+                for view in views:
+                    view.append(entry)
+            logger.info("Network connections gathered successfully.")
         except Exception as e:
-            logger.error(f"Error gathering connections for kind='{kind}': {e}")
+            logger.error(f"Error gathering connections for kinds {kinds}: {e}")
 
     def gather_all_info(self):
         """Gathers all network-related information."""
         logger.info("Gathering all network-related information.")
         self.gather_interface_stats()
         self.gather_interface_addrs()
-        kinds = [
-            "inet",  # IPv4 and IPv6
-            "inet4", # IPv4
-            "inet6", # IPv6
-            "tcp",   # TCP
-            "tcp4",  # TCP over IPv4
-            "tcp6",  # TCP over IPv6
-            "udp",   # UDP
-            "udp4",  # UDP over IPv4
-            "udp6",  # UDP over IPv6
-        ]
-        for kind in kinds:
-            self.gather_connections(kind)
+        self.gather_connections()
         logger.info("All network-related information gathered successfully.")
 
-    def _get_duplex_name(self, duplex):
-        """Safely get the name of the duplex type."""
-        try:
-            return duplex.name
-        except AttributeError:
-            return str(duplex)
-
     def _get_family_name(self, family):
         """Safely get the name of the address family."""
         try:
@@ -193,56 +230,11 @@ class NetworkManager:
 
     @staticmethod
     def get_network_info():
-        """Gathers detailed network interface information."""
+        """Gathers detailed network interface information from the cached interface topology."""
         logger.info("Gathering detailed network interface information.")
-        addr_family_map = {
-            netifaces.AF_INET: 'IPv4',
-            netifaces.AF_INET6: 'IPv6',
-            netifaces.AF_LINK: 'MAC'
-        }
-
-        network_info = {}
-
         try:
-            interfaces = netifaces.interfaces()
-            gateways = netifaces.gateways()
-
-            for interface in interfaces:
-                addrs = netifaces.ifaddresses(interface)
-                interface_info = {
-                    'interface_name': interface,
-                    'mac_address': None,
-                    'default_gateway': None,
-                    'ip_addresses': []
-                }
-
-                if netifaces.AF_LINK in addrs:
-                    mac_info = addrs[netifaces.AF_LINK][0]
-                    interface_info['mac_address'] = mac_info.get('addr')
-
-                if 'default' in gateways:
-                    for key, value in gateways['default'].items():
-                        if value[1] == interface:
-                            interface_info['default_gateway'] = value[0]
-                            break
-
-                if interface_info['default_gateway'] is None:
-                    interface_info['default_gateway'] = "None"
-
-                for addr_family, addr_info in addrs.items():
-                    for addr in addr_info:
-                        family_name = addr_family_map.get(addr_family, 'Unknown')
-                        address_details = {
-                            'address_family': family_name,
-                            'ip_address': addr.get('addr') if addr.get('addr') is not None else "None",
-                            'subnet_mask': addr.get('netmask') if addr.get('netmask') is not None else "None",
-                            'broadcast_address': addr.get('broadcast') if addr.get('broadcast') is not None else "None",
-                            'peer_address': addr.get('peer') if addr.get('peer') is not None else "None"
-                        }
-                        interface_info['ip_addresses'].append(address_details)
-                
-                network_info[interface] = interface_info
-
+            # Built together with the statistics and addresses, with default gateways indexed by interface
+            network_info = dict(TopologyCache.shared().get().interfaces)
             logger.info("Detailed network interface information gathered successfully.")
             return network_info
 
@@ -250,36 +242,92 @@ class NetworkManager:
             logger.error(f"Error getting network information: {str(e)}")
 
     @staticmethod
-    # Function to manage network statistics
-    def network_report():
+    # Function to manage network statistics; fields limits it to some of FIELDS
+    def network_report(fields=None):
         try:
             logger.info("Generating network report.")
-            localhost_connectivity = NetworkManager().check_localhost_connectivity()
-            network_connectivity = NetworkManager().check_network_connectivity()
-            network_traffic = NetworkManager().monitor_network_traffic()
-
-            statistics = {
-                'Network Usage Statistics': {
-                    'Localhost Connectivity': localhost_connectivity,
-                    'Network Connectivity': network_connectivity,
-                    'Network Traffic': network_traffic,
-                    'Generated Time & Date': f'{TimeStampGenerator().generate_report()}'
-                }
-            }
-
-            statistics_report = json.dumps(statistics, indent=4)
+            fields = NetworkManager.DEFAULT_FIELDS if fields is None else fields
+
+            usage_statistics = {}
+            # Connectivity comes from the background probes, with the age of their last result
+            checked = {}
+            if 'localhost' in fields:
+                usage_statistics['Localhost Connectivity'] = NetworkManager().check_localhost_connectivity()
+                checked['Localhost'] = NetworkManager.connectivity_age(NetworkManager.connectivity_result('localhost'))
+            if 'internet' in fields:
+                usage_statistics['Network Connectivity'] = NetworkManager().check_network_connectivity()
+                checked['Internet'] = NetworkManager.connectivity_age(NetworkManager.connectivity_result('internet'))
+            if checked:
+                usage_statistics['Connectivity Checked'] = checked
+            if 'traffic' in fields:
+                usage_statistics['Network Traffic'] = NetworkManager().monitor_network_traffic()
+            if 'rates' in fields:
+                usage_statistics['Network Interface Rates'] = NetworkManager.monitor_interface_rates()
+            usage_statistics['Generated Time & Date'] = f'{TimeStampGenerator().generate_report()}'
+            statistics = {'Network Usage Statistics': usage_statistics}
+
+            # Only the requested sections of the deep analysis are gathered
             deep_analyzer = NetworkManager()
-            deep_analyzer.gather_all_info()
-            deep_analyzed_report = deep_analyzer.to_json()
-
-            network_interface_report = json.dumps(NetworkManager().get_network_info(), indent=4)
-
-            combined_report = dict(json.loads(statistics_report), **json.loads(deep_analyzed_report), **json.loads(network_interface_report))
-
-            result = json.dumps(combined_report, indent=4)
-            json_output = json.loads(result)
+            deep_sections = {}
+            if 'interface_stats' in fields:
+                deep_analyzer.gather_interface_stats()
+                deep_sections['interface_stats'] = deep_analyzer.data['interface_stats']
+            if 'interface_addrs' in fields:
+                deep_analyzer.gather_interface_addrs()
+                deep_sections['interface_addrs'] = deep_analyzer.data['interface_addrs']
+            kinds = list(deep_analyzer.connection_kinds) if 'connections' in fields else []
+            kinds += [kind for kind in NetworkManager.WIDE_CONNECTION_KINDS if f'connections_{kind}' in fields and kind not in kinds]
+            if kinds:
+                deep_analyzer.gather_connections(kinds)
+                deep_sections['connections'] = deep_analyzer.data['connections']
+
+            network_interface_report = (NetworkManager().get_network_info() or {}) if 'interfaces' in fields else {}
+
+            combined_report = dict(statistics, **deep_sections, **network_interface_report)
             logger.info("Network report generated successfully.")
-            return json_output
+            return combined_report
         except Exception as e:
             logger.error(f"Error generating network report: {e}")
             sys.exit(1)
+
+    @staticmethod
+    # Function to collect network statistics as a typed numeric record
+    def raw_report(check_connectivity=True):
+        try:
+            logger.info("Generating raw network report.")
+            network = psutil.net_io_counters()
+            # Connectivity is left unknown (None) when only the counters are wanted or not probed yet
+            localhost_connected = internet_connected = internet_checked_age = None
+            if check_connectivity:
+                localhost = NetworkManager.connectivity_result('localhost')
+                internet = NetworkManager.connectivity_result('internet')
+                localhost_connected = localhost.ok if localhost is not None else None
+                if internet is not None:
+                    internet_connected = internet.ok
+                    internet_checked_age = round(ConnectivityMonitor.age(internet), 3)
+            # Rates over every window of the sampler, totalled and per interface
+            rates = {}
+            interface_rates = {}
+            for window_rates in NetworkSampler.shared().all_rates():
+                window = f'{window_rates.window:g}s'
+                rates[window] = NetworkSampler.total(window_rates)._asdict()
+                interface_rates[window] = {nic: nic_rates._asdict() for nic, nic_rates in window_rates.rates.items()}
+            return NetworkReport(
+                timestamp=time.time(),
+                localhost_connected=localhost_connected,
+                internet_connected=internet_connected,
+                internet_checked_age=internet_checked_age,
+                bytes_sent=network.bytes_sent,
+                bytes_recv=network.bytes_recv,
+                packets_sent=network.packets_sent,
+                packets_recv=network.packets_recv,
+                errin=network.errin,
+                errout=network.errout,
+                dropin=network.dropin,
+                dropout=network.dropout,
+                rates=rates,
+                interface_rates=interface_rates,
+            )
+        except Exception as e:
+            logger.error(f"Error generating raw network report: {e}")
+            sys.exit(1)
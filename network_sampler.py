@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+import collections
+import threading
+import psutil
+from counter_sampler import CounterSampler
+
+# Counters of psutil.net_io_counters that rates are computed for
+COUNTER_FIELDS = ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv', 'errin', 'errout', 'dropin', 'dropout')
+
+# Per-second rate of every counter of one interface
+InterfaceRates = collections.namedtuple('InterfaceRates', COUNTER_FIELDS)
+
+
+class NetworkSampler(CounterSampler):
+    """Per-NIC rates from ``psutil.net_io_counters(pernic=True)``, sampled every second."""
+
+    FIELDS = COUNTER_FIELDS
+    Rates = InterfaceRates
+    THREAD_NAME = 'network-sampler'
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def read_counters(self):
+        # Raw counters: wraps and resets are handled by the sampler rather than hidden by psutil
+        return psutil.net_io_counters(pernic=True, nowrap=False)
@@ -1,84 +1,128 @@
 #!/usr/bin/env python3
 
-import json
 import psutil
 import sys
+import time
 from report_signatures import TimeStampGenerator
-import logging  # Import logging module
+from report_schema import ProcessReport
+from log_config import get_logger
 
 # Configure logging
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
-# Create file handler for logging to a file
-file_handler = logging.FileHandler('system_analysis.log')
-file_handler.setLevel(logging.DEBUG)  # Write all logs (DEBUG and higher) to the file
+class ProcessManager:
+    # Optional per-process attributes mapped to the psutil.Process attributes they read.
+    # 'cpu' is measured since the previous scan (process_iter reuses Process objects),
+    # so the first scan of a process reports 0.0.
+    ATTRIBUTES = {
+        'cpu': 'cpu_percent',
+        'rss': 'memory_info',
+        'user': 'username',
+        'cmdline': 'cmdline',
+        'status': 'status',
+    }
 
-# Create a formatter and attach it to the file handler
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
+    # Sub-collections of manage_processes that can be requested on their own with fields=.
+    # Naming an attribute adds it to the process info (and implies 'info') for that report.
+    FIELDS = ('list', 'info') + tuple(ATTRIBUTES)
 
-# Add the file handler to the logger
-logger.addHandler(file_handler)
+    def __init__(self, attrs=()):
+        unknown = set(attrs) - set(self.ATTRIBUTES)
+        if unknown:
+            raise ValueError(f"Unknown process attributes: {', '.join(sorted(unknown))}")
+        self.attrs = tuple(attrs)
+        self.process_list = None
+        self.process_info_list = None
 
-# Set the logger's level to DEBUG to capture all log levels
-logger.setLevel(logging.DEBUG)
+    def collect(self, attrs=None):
+        """Walk the process table once, reading every requested attribute per process.
 
-class ProcessManager:
-    def __init__(self):
-        self.process_list = None
+        ``attrs`` defaults to the attributes the manager was built with.
+        process_iter() reads each process under oneshot() and silently drops
+        processes that exit while the table is being walked.
+        """
+        attrs = self.attrs if attrs is None else attrs
+        psutil_attrs = ['pid', 'name'] + [self.ATTRIBUTES[attr] for attr in attrs]
+        process_list = []
+        process_info_list = []
+        logger.info("Collecting process table.")
+        for proc in psutil.process_iter(attrs=psutil_attrs, ad_value=None):
+            info = proc.info
+            process_info = {'pid': info['pid'], 'name': info['name']}
+            for attr in attrs:
+                value = info[self.ATTRIBUTES[attr]]
+                if attr == 'rss' and value is not None:
+                    value = value.rss
+                process_info[attr] = value
+            process_list.append({'pid': info['pid']})
+            process_info_list.append(process_info)
+
+        self.process_list = process_list
+        self.process_info_list = process_info_list
+        logger.info("Collected %s processes.", len(process_info_list))
+        return process_info_list
 
     def get_process_list(self):
         try:
             logger.info("Retrieving process list.")
-            self.process_list = [{'pid': pid} for pid in psutil.pids()]
-            logger.info(f"Retrieved process list: {self.process_list}")
+            if self.process_list is None:
+                self.collect()
+            logger.info("Retrieved %s process IDs.", len(self.process_list))
             return self.process_list
         except Exception as e:
             logger.error(f"Error retrieving process list: {e}")
             sys.exit(1)
 
     def get_process_info(self):
-        process_info_list = []
         try:
             logger.info("Gathering process information.")
-            for process in self.process_list:
-                process_id = process['pid']
-                proc = psutil.Process(process_id)
-                process_info = proc.as_dict(attrs=['pid', 'name'])
-                process_info_list.append(process_info)
-
-            logger.info(f"Retrieved process information: {process_info_list}")
-            return process_info_list
-        except psutil.NoSuchProcess as e:
-            logger.error(f"Error retrieving process info: {e}")
-            sys.exit(1)
+            if self.process_info_list is None:
+                self.collect()
+            logger.info("Retrieved information for %s processes.", len(self.process_info_list))
+            return self.process_info_list
         except Exception as e:
             logger.error(f"Error: {e}")
             sys.exit(1)
 
-    def manage_processes(self):
+    def manage_processes(self, fields=None):
         try:
             logger.info("Managing system processes.")
-            process_list = self.get_process_list()
-            process_info = self.get_process_info()
+            fields = ('list', 'info') if fields is None else fields
+            process_statistics = {}
+
+            # Attributes named in fields are read on top of the manager's own
+            attrs = tuple(attr for attr in self.ATTRIBUTES if attr in self.attrs or attr in fields)
+            wants_info = 'info' in fields or any(attr in fields for attr in self.ATTRIBUTES)
 
-            # Check if process_list is a string, if not convert it to a string
-            if not isinstance(process_list, str):
-                process_list = ", ".join(map(str, process_list))
+            if wants_info:
+                self.collect(attrs)
+            elif 'list' in fields:
+                # Process IDs alone do not need the process table walk
+                self.process_list = [{'pid': pid} for pid in psutil.pids()]
 
-            statistics = {
-                'System Processes Statistics': {
-                    'Process List': process_list,
-                    'Process Info': process_info,
-                    'Generated Time & Date': f'{TimeStampGenerator().generate_report()}'
-                }
-            }
+            if 'list' in fields:
+                process_list = self.get_process_list()
+                # Check if process_list is a string, if not convert it to a string
+                if not isinstance(process_list, str):
+                    process_list = ", ".join(map(str, process_list))
+                process_statistics['Process List'] = process_list
+            if wants_info:
+                process_statistics['Process Info'] = self.get_process_info()
 
-            result = json.dumps(statistics, indent=4)
-            json_output = json.loads(result)
+            process_statistics['Generated Time & Date'] = f'{TimeStampGenerator().generate_report()}'
+            statistics = {'System Processes Statistics': process_statistics}
 
             logger.info("System processes managed successfully.")
-            return json_output  # Return the JSON output as a string
+            return statistics
         except Exception as e:
             logger.error(f"Error managing processes: {e}")
             sys.exit(1)
+
+    def raw_report(self):
+        try:
+            logger.info("Collecting raw process statistics.")
+            process_info = self.collect()
+            return ProcessReport(timestamp=time.time(), count=len(process_info), processes=process_info)
+        except Exception as e:
+            logger.error(f"Error collecting raw process statistics: {e}")
+            sys.exit(1)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+import time
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+
+class _Stripe:
+    """One lock-protected shard of the per-IP limiter state."""
+
+    __slots__ = ('lock', 'tats', 'dirty')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tats = {}      # ip -> theoretical arrival time (GCRA)
+        self.dirty = set()  # ips changed since the last write-behind
+
+
+class InMemoryRateLimiter:
+    """In-process GCRA rate limiter allowing ``limit`` requests per ``window`` seconds per IP.
+
+    Per-IP state lives in memory, sharded across ``stripes`` locks so that
+    concurrent requests from different clients do not contend. A maintenance
+    thread evicts clients whose budget has fully recovered and, when a
+    ``database`` is given, writes changed state behind to its
+    ``request_limits`` table so limits survive restarts.
+    """
+
+    def __init__(self, limit=5, window=60, database=None, stripes=64, flush_interval=5.0):
+        self.limit = limit
+        self.window = window
+        self.database = database
+        self.flush_interval = flush_interval
+        # GCRA: every request advances the client's arrival time by one emission interval
+        self.emission_interval = window / limit
+        self._stripes = [_Stripe() for _ in range(stripes)]
+        self._stop_event = threading.Event()
+        self._thread = None
+        if self.database is not None:
+            self._load()
+
+    def _stripe(self, ip):
+        return self._stripes[hash(ip) % len(self._stripes)]
+
+    def check_and_update(self, ip, cost=1):
+        """Charge ``cost`` requests to the IP's budget; return False if it cannot afford them."""
+        # A request can never cost more than a full budget, or it could never be served
+        cost = min(cost, self.limit)
+        now = time.monotonic()
+        stripe = self._stripe(ip)
+        with stripe.lock:
+            tat = max(stripe.tats.get(ip, now), now)
+            new_tat = tat + self.emission_interval * cost
+            if new_tat - now > self.window:
+                return False
+            stripe.tats[ip] = new_tat
+            stripe.dirty.add(ip)
+            return True
+
+    def refund(self, ip, cost=1):
+        """Give back ``cost`` requests charged by check_and_update for a request that was not served."""
+        cost = min(cost, self.limit)
+        now = time.monotonic()
+        stripe = self._stripe(ip)
+        with stripe.lock:
+            tat = stripe.tats.get(ip)
+            if tat is None:
+                return
+            stripe.tats[ip] = max(tat - self.emission_interval * cost, now)
+            stripe.dirty.add(ip)
+
+    def evict_idle(self):
+        """Forget clients whose budget has fully recovered; return how many were evicted."""
+        now = time.monotonic()
+        evicted = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                idle = [ip for ip, tat in stripe.tats.items() if tat <= now]
+                for ip in idle:
+                    del stripe.tats[ip]
+                evicted += len(idle)
+        return evicted
+
+    def _snapshot_dirty(self):
+        """Return (ip, request count, last request time) rows for state changed since the last flush."""
+        now = time.monotonic()
+        wall_now = int(time.time())
+        rows = []
+        for stripe in self._stripes:
+            with stripe.lock:
+                for ip in stripe.dirty:
+                    tat = stripe.tats.get(ip, now)
+                    # Requests still counted against the budget, in the request_limits representation
+                    request_count = min(math.ceil(max(tat - now, 0) / self.emission_interval), self.limit)
+                    rows.append((ip, request_count, wall_now))
+                stripe.dirty.clear()
+        return rows
+
+    def flush(self):
+        """Write changed per-IP state behind to the database."""
+        rows = self._snapshot_dirty()
+        if not rows or self.database is None:
+            return 0
+        try:
+            conn = self.database.get_connection()
+            try:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO request_limits (ip_address, request_count, last_request_time) VALUES (?, ?, ?)',
+                    rows,
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error writing rate limit state behind: {e}")
+            return 0
+        logger.debug("Wrote rate limit state for %s clients.", len(rows))
+        return len(rows)
+
+    def _load(self):
+        """Restore recent per-IP state written by a previous run."""
+        try:
+            conn = self.database.get_connection()
+            try:
+                rows = conn.execute('SELECT ip_address, request_count, last_request_time FROM request_limits').fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error loading rate limit state: {e}")
+            return
+
+        now = time.monotonic()
+        wall_now = time.time()
+        restored = 0
+        for ip, request_count, last_request_time in rows:
+            elapsed = wall_now - (last_request_time or 0)
+            remaining = min(request_count or 0, self.limit) * self.emission_interval - elapsed
+            if remaining > 0:
+                stripe = self._stripe(ip)
+                stripe.tats[ip] = now + remaining
+                restored += 1
+        logger.info("Restored rate limit state for %s clients.", restored)
+
+    def start(self):
+        """Start the eviction and write-behind thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='rate-limiter', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 2)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Error maintaining rate limiter state: {e}")
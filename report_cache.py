@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from log_config import get_logger
+
+# Configure logging
+logger = get_logger(__name__)
+
+
+class _InFlight:
+    """A computation that concurrent callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SnapshotCache:
+    """TTL cache of report snapshots with single-flight request coalescing.
+
+    While a snapshot for a key is being built, further callers for the same
+    key wait for that build instead of starting their own.
+    """
+
+    def __init__(self, default_ttl=2.0):
+        self.default_ttl = default_ttl
+        self._entries = {}   # key -> (expires_at, value)
+        self._in_flight = {}  # key -> _InFlight
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, ttl=None, cacheable=None):
+        """Return the cached value for ``key`` or build it once with ``compute``.
+
+        ``cacheable`` is an optional predicate; results it rejects (for
+        example error responses) are handed to the waiting callers but not
+        stored.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                logger.debug("Snapshot cache hit for %s.", key)
+                return entry[1]
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _InFlight()
+                self._in_flight[key] = flight
+
+        if not leader:
+            logger.debug("Waiting for in-flight snapshot of %s.", key)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if flight.error is None and ttl > 0 and (cacheable is None or cacheable(flight.result)):
+                    self._entries[key] = (time.monotonic() + ttl, flight.result)
+            flight.done.set()
+
+        return flight.result
+
+    def invalidate(self, key=None):
+        """Drop one cached snapshot, or all of them when ``key`` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
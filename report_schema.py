@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+"""Typed, numeric report records served by the ``format=raw`` mode.
+
+Every field holds a plain number (or string/bool for identities and flags);
+units live in the field metadata and are published once per report under
+``units`` instead of being baked into every value.
+"""
+
+import dataclasses
+import functools
+from dataclasses import dataclass, field
+from typing import ClassVar, Optional
+
+
+def unit(name, **kwargs):
+    """Declare a dataclass field measured in ``name``."""
+    return field(metadata={'unit': name}, **kwargs)
+
+
+@dataclass(slots=True)
+class CPUReport:
+    REPORT: ClassVar[str] = 'cpu'
+
+    timestamp: float = unit('s')
+    percent: float = unit('%')
+    logical_count: int = unit('cores')
+    physical_count: Optional[int] = unit('cores')
+    times: dict = unit('s')
+    times_percent: dict = unit('%')
+    freq_current: Optional[float] = unit('MHz')
+    freq_min: Optional[float] = unit('MHz')
+    freq_max: Optional[float] = unit('MHz')
+    ctx_switches: int = unit('count')
+    interrupts: int = unit('count')
+    soft_interrupts: int = unit('count')
+    syscalls: int = unit('count')
+    stats_window: Optional[float] = unit('s')
+    per_core: Optional[dict] = unit('%')
+    across_cores: Optional[dict] = unit('%')
+    load_average: Optional[list] = unit('load')
+    load: Optional[dict] = unit('load')
+
+
+@dataclass(slots=True)
+class ProcessReport:
+    REPORT: ClassVar[str] = 'process'
+
+    timestamp: float = unit('s')
+    count: int = unit('processes')
+    processes: list = unit('record')
+
+
+@dataclass(slots=True)
+class MemoryReport:
+    REPORT: ClassVar[str] = 'memory'
+
+    timestamp: float = unit('s')
+    total: int = unit('bytes')
+    available: int = unit('bytes')
+    used: int = unit('bytes')
+    free: int = unit('bytes')
+    percent: float = unit('%')
+    swap_total: int = unit('bytes')
+    swap_used: int = unit('bytes')
+    swap_free: int = unit('bytes')
+    swap_percent: float = unit('%')
+    swap_in: int = unit('bytes')
+    swap_out: int = unit('bytes')
+
+
+@dataclass(slots=True)
+class DiskPartitionRecord:
+    device: str = unit('name')
+    mountpoint: str = unit('path')
+    fstype: str = unit('name')
+    total: Optional[int] = unit('bytes')
+    used: Optional[int] = unit('bytes')
+    free: Optional[int] = unit('bytes')
+    percent: Optional[float] = unit('%')
+    # 'ok', or why usage is missing: 'timeout', 'quarantined' or 'error'
+    status: str = unit('name', default='ok')
+
+
+@dataclass(slots=True)
+class DiskReport:
+    REPORT: ClassVar[str] = 'disk'
+
+    timestamp: float = unit('s')
+    partitions: list = unit('record', default_factory=list)
+
+    ITEM_TYPES: ClassVar[dict] = {'partitions': DiskPartitionRecord}
+
+
+@dataclass(slots=True)
+class DiskIODeviceRecord:
+    device: str = unit('name')
+    mountpoints: list = unit('path')
+    window: float = unit('s')
+    span: float = unit('s')
+    read_bytes_rate: float = unit('bytes/s')
+    write_bytes_rate: float = unit('bytes/s')
+    read_iops: float = unit('ops/s')
+    write_iops: float = unit('ops/s')
+    service_time: Optional[float] = unit('ms')
+    wait_time: Optional[float] = unit('ms')
+    busy_percent: Optional[float] = unit('%')
+
+
+@dataclass(slots=True)
+class DiskIOReport:
+    REPORT: ClassVar[str] = 'disk_io'
+
+    timestamp: float = unit('s')
+    devices: list = unit('record', default_factory=list)
+
+    ITEM_TYPES: ClassVar[dict] = {'devices': DiskIODeviceRecord}
+
+
+@dataclass(slots=True)
+class NetworkReport:
+    REPORT: ClassVar[str] = 'network'
+
+    timestamp: float = unit('s')
+    localhost_connected: Optional[bool] = unit('bool')
+    internet_connected: Optional[bool] = unit('bool')
+    internet_checked_age: Optional[float] = unit('s')
+    bytes_sent: int = unit('bytes')
+    bytes_recv: int = unit('bytes')
+    packets_sent: int = unit('packets')
+    packets_recv: int = unit('packets')
+    errin: int = unit('count')
+    errout: int = unit('count')
+    dropin: int = unit('count')
+    dropout: int = unit('count')
+    # {window: {counter: per-second rate}}, totalled and by interface
+    rates: dict = unit('per s')
+    interface_rates: dict = unit('per s')
+
+
+@dataclass(slots=True)
+class SystemReport:
+    REPORT: ClassVar[str] = 'system'
+
+    timestamp: float = unit('s')
+    device_name: str = unit('name')
+    os_name: str = unit('name')
+    os_release: str = unit('name')
+    os_version: str = unit('name')
+    os_architecture: str = unit('name')
+    os_edition: Optional[str] = unit('name')
+    processor: str = unit('name')
+    machine: str = unit('name')
+    platform: str = unit('name')
+    reboot_pending: bool = unit('bool')
+    boot_time: float = unit('s')
+    users: list = unit('name')
+
+
+@dataclass(slots=True)
+class BatteryReport:
+    REPORT: ClassVar[str] = 'battery'
+
+    timestamp: float = unit('s')
+    present: bool = unit('bool')
+    percent: Optional[float] = unit('%')
+    power_plugged: Optional[bool] = unit('bool')
+    secs_left: Optional[int] = unit('s')
+
+
+@functools.lru_cache(maxsize=None)
+def units_of(record_type):
+    """Return ``{field: unit}`` for a record type, with nested records as ``field.subfield``."""
+    units = {}
+    item_types = getattr(record_type, 'ITEM_TYPES', {})
+    for record_field in dataclasses.fields(record_type):
+        if record_field.name in item_types:
+            for name, item_unit in units_of(item_types[record_field.name]).items():
+                units[f'{record_field.name}.{name}'] = item_unit
+        else:
+            units[record_field.name] = record_field.metadata.get('unit')
+    return units
+
+
+def as_dict(record):
+    """Shallow field copy of a record; nested records are converted, plain values are not copied."""
+    result = {}
+    for name in record.__slots__:
+        value = getattr(record, name)
+        if isinstance(value, list) and value and dataclasses.is_dataclass(value[0]):
+            value = [as_dict(item) for item in value]
+        result[name] = value
+    return result
+
+
+def to_raw(record):
+    """Wrap a record as the ``format=raw`` payload: report name, units and numeric data."""
+    return {
+        'report': record.REPORT,
+        'units': units_of(type(record)),
+        'data': as_dict(record),
+    }
@@ -1,77 +1,139 @@
 #!/usr/bin/env python3
 
-import logging
-from flask import jsonify
-from battery_management import BatteryManager
-from cpu_management import CPUManager
-from disk_management import DiskManager
-from memory_management import MemoryManager
-from network_management import NetworkManager
-from process_management import ProcessManager
-from system_infoAnalyzer import SystemInformation
+from log_config import get_logger
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from collectors import registry
+from collector_timings import timings
 
 # Configure logging
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
-# Create file handler for logging to a file
-file_handler = logging.FileHandler('system_analysis.log')
-file_handler.setLevel(logging.DEBUG)  # Write all logs (DEBUG and higher) to the file
-
-# Create a formatter and attach it to the file handler
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
+class SystemAnalyzer:
+    # Upper bound on collectors running at the same time for the all-in-one report
+    MAX_WORKERS = 4
 
-# Add the file handler to the logger
-logger.addHandler(file_handler)
+    _executor = None
+    _executor_lock = threading.Lock()
 
-# Set the logger's level to DEBUG to capture all log levels
-logger.setLevel(logging.DEBUG)
+    @classmethod
+    def _get_executor(cls):
+        """Return the shared, bounded pool used to run collectors concurrently."""
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.MAX_WORKERS, thread_name_prefix='collector')
+            return cls._executor
 
-class SystemAnalyzer:
     @staticmethod
-    def all_in_one():
+    def _timed(collector):
+        """Run a collector and return its result together with its duration."""
+        started = time.monotonic()
+        result = collector()
+        return result, time.monotonic() - started
+
+    @classmethod
+    def all_in_one(cls, deadlines=None, raw=False, fields=None):
+        """Run every supported collector concurrently, each within its deadline.
+
+        ``deadlines`` overrides the collectors' declared deadlines by name.
+        ``fields`` is a selection from ``registry.parse_fields``; when given,
+        only the selected collectors run, narrowed to their selected fields.
+        The most expensive collectors are submitted first so that they are
+        not queued behind cheap ones; sections keep the registry order.
+        """
         try:
             logger.info("Generating all-in-one system status report.")
-            cpu_status = CPUManager().monitor_cpu()
-            process_status = ProcessManager().manage_processes()
-            memory_status = MemoryManager().memory_statistics()
-            disk_status = DiskManager().manage_disk()
-            network_status = NetworkManager().network_report()
-            system_status = SystemInformation().system_info()
-            battery_status = BatteryManager().batteryManagement()
-
-            status_list = [cpu_status, process_status, memory_status, disk_status, network_status, system_status, battery_status]
+            deadlines = deadlines or {}
+            executor = cls._get_executor()
+            started = time.monotonic()
+
+            collectors = [collector for collector in registry if fields is None or collector.name in fields]
+            futures = {}
+            for collector in sorted(collectors, key=lambda collector: collector.cost, reverse=True):
+                if collector.is_supported():
+                    collector_fields = fields.get(collector.name) if fields is not None else None
+                    # Run in a copy of this context so the timings reach the caller's request
+                    futures[collector.name] = executor.submit(
+                        contextvars.copy_context().run, cls._timed, lambda collector=collector, collector_fields=collector_fields: collector.collect(raw, collector_fields)
+                    )
+
+            status_list = []
+            section_status = {}
+            for collector in collectors:
+                name = collector.name
+                title = name if raw else collector.title
+                future = futures.get(name)
+                if future is None:
+                    section_status[name] = {'Status': 'unsupported'}
+                    continue
+
+                deadline = deadlines.get(name, collector.deadline)
+                remaining = max(started + deadline - time.monotonic(), 0)
+                try:
+                    result, duration = future.result(timeout=remaining)
+                    status_list.append(result)
+                    section_status[name] = {'Status': 'ok', 'Duration (sec)': round(duration, 3)}
+                except FutureTimeoutError:
+                    # A collector still queued for a worker is dropped rather than run after the response
+                    if future.cancel():
+                        logger.warning(f"Collector '{name}' was still queued at its {deadline} second deadline; cancelled.")
+                        status_list.append({title: {'Status': f'Cancelled: not started within {deadline} seconds.'}})
+                        section_status[name] = {'Status': 'cancelled', 'Deadline (sec)': deadline}
+                        continue
+                    logger.warning(f"Collector '{name}' exceeded its {deadline} second deadline.")
+                    status_list.append({title: {'Status': f'Timed out after {deadline} seconds.'}})
+                    section_status[name] = {'Status': 'timeout', 'Deadline (sec)': deadline}
+                except (Exception, SystemExit) as e:
+                    # Collectors still call sys.exit on failure; keep the other sections
+                    logger.error(f"Collector '{name}' failed: {e!r}")
+                    status_list.append({title: {'Status': 'Failed to collect this section.'}})
+                    section_status[name] = {'Status': 'error'}
+
+            status_list.append({'Report Status': section_status})
+            timings.record('all_in_one', time.monotonic() - started)
             logger.info("All-in-one system status report generated successfully.")
             return status_list
 
         except Exception as e:
             logger.error(f"Error generating all-in-one report: {e}")
+            from flask import jsonify
             return jsonify({'error': 'An internal error has occurred while generating the all-in-one report.'}), 500
 
     @staticmethod
-    def once_status_one_report(token):
+    def once_status_one_report(token, raw=False, fields=None):
         try:
-            logger.info(f"Generating single report for token: {token}")
-            match token:
-                case 1:
-                    return CPUManager().monitor_cpu()
-                case 2:
-                    return ProcessManager().manage_processes()
-                case 3:
-                    return MemoryManager().memory_statistics()
-                case 4:
-                    return DiskManager().manage_disk()
-                case 5:
-                    return NetworkManager().network_report()
-                case 6:
-                    return SystemInformation().system_info()
-                case 7:
-                    return BatteryManager().batteryManagement()
-                case _:
-                    raise ValueError('Invalid selection. Please enter a number between 1 and 7.')
+            logger.info("Generating single report for token: %s", token)
+            collector = registry.by_id(token)
+            if not collector.is_supported():
+                raise ValueError(f"The {collector.name} report is not supported on this host.")
         except ValueError as ve:
             logger.warning(f"Value error: {ve}")
-            return jsonify({'error': 'Invalid input. Please enter a valid number between 1 and 7.'}), 400
+            from flask import jsonify
+            return jsonify({'error': f'Invalid input. {ve}'}), 400
+
+        try:
+            return collector.collect(raw, fields)
         except Exception as e:
             logger.error(f"Error executing report for token {token}: {e}")
+            from flask import jsonify
             return jsonify({'error': 'An internal error has occurred while executing the report.'}), 500
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Print a single system report, or the all-in-one report.')
+    parser.add_argument('report_id', nargs='?', type=int, help='report ID (see collectors.py); omit for the all-in-one report')
+    parser.add_argument('--raw', action='store_true', help='print numeric values with their units')
+    parser.add_argument('--fields', help='only collect these fields, e.g. network.traffic,disk.usage')
+    args = parser.parse_args()
+
+    selection = registry.parse_fields(args.fields) if args.fields else None
+    if args.report_id is None:
+        report = SystemAnalyzer.all_in_one(raw=args.raw, fields=selection)
+    else:
+        collector_fields = selection.get(registry.by_id(args.report_id).name) if selection else None
+        report = SystemAnalyzer.once_status_one_report(args.report_id, raw=args.raw, fields=collector_fields)
+    print(json.dumps(report, indent=4, default=str))
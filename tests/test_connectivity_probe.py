@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+"""Connectivity probes driven by a stand-in resolver and a local listener, without touching the network."""
+
+import os
+import socket
+import sys
+import threading
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from connectivity_probe import ConnectivityMonitor, ConnectivityProbe  # noqa: E402
+
+
+class FakeResolver:
+    """Stands in for socket.getaddrinfo: answers, fails, or blocks until released."""
+
+    def __init__(self, error=None, block=False):
+        self.error = error
+        self.calls = []
+        self.released = threading.Event()
+        if not block:
+            self.released.set()
+
+    def __call__(self, host, port):
+        self.calls.append(host)
+        self.released.wait()
+        if self.error is not None:
+            raise self.error
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('192.0.2.1', 0))]
+
+
+class DnsProbeTest(unittest.TestCase):
+    def test_resolved_host_is_reachable(self):
+        resolver = FakeResolver()
+        result = ConnectivityProbe('internet', 'example.test', resolver=resolver).run()
+        self.assertTrue(result.ok)
+        self.assertIsNotNone(result.latency)
+        self.assertIsNone(result.error)
+        self.assertEqual(resolver.calls, ['example.test'])
+
+    def test_resolver_error_is_reported(self):
+        resolver = FakeResolver(error=socket.gaierror(-2, 'Name or service not known'))
+        result = ConnectivityProbe('internet', 'example.test', resolver=resolver).run()
+        self.assertFalse(result.ok)
+        self.assertIsNone(result.latency)
+        self.assertIn('gaierror', result.error)
+
+    def test_hung_lookup_times_out_and_is_not_repeated(self):
+        resolver = FakeResolver(block=True)
+        probe = ConnectivityProbe('internet', 'example.test', timeout=0.1, resolver=resolver)
+        try:
+            result = probe.run()
+            self.assertFalse(result.ok)
+            self.assertIn('timed out', result.error)
+
+            # The first lookup is still stuck: no second one is started
+            result = probe.run()
+            self.assertFalse(result.ok)
+            self.assertIn('still pending', result.error)
+            self.assertEqual(len(resolver.calls), 1)
+        finally:
+            resolver.released.set()
+
+        probe._pending_lookup.join(1.0)
+        self.assertTrue(probe.run().ok)
+        self.assertEqual(len(resolver.calls), 2)
+
+
+class TcpProbeTest(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+
+    def tearDown(self):
+        self.listener.close()
+
+    def test_listening_port_is_reachable(self):
+        result = ConnectivityProbe('local', '127.0.0.1', method='tcp', port=self.port, timeout=1.0).run()
+        self.assertTrue(result.ok)
+
+    def test_closed_port_is_reported(self):
+        self.listener.close()
+        result = ConnectivityProbe('local', '127.0.0.1', method='tcp', port=self.port, timeout=1.0).run()
+        self.assertFalse(result.ok)
+        self.assertIn('ConnectionRefusedError', result.error)
+
+    def test_tcp_probe_needs_a_port(self):
+        with self.assertRaises(ValueError):
+            ConnectivityProbe('local', '127.0.0.1', method='tcp')
+
+
+class ConnectivityMonitorTest(unittest.TestCase):
+    def test_monitor_serves_the_last_result(self):
+        resolver = FakeResolver()
+        monitor = ConnectivityMonitor([ConnectivityProbe('internet', 'example.test', resolver=resolver)])
+        monitor.start()
+        try:
+            result = monitor.result('internet', timeout=2.0)
+        finally:
+            monitor.stop()
+        self.assertIsNotNone(result)
+        self.assertTrue(result.ok)
+        self.assertGreaterEqual(ConnectivityMonitor.age(result), 0.0)
+
+    def test_probes_can_be_given_as_settings(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen()
+        port = listener.getsockname()[1]
+        monitor = ConnectivityMonitor([{'name': 'internet', 'host': '127.0.0.1', 'method': 'tcp',
+                                        'port': port, 'timeout': 1.0, 'interval': 60.0}])
+        monitor.start()
+        try:
+            result = monitor.result('internet', timeout=2.0)
+        finally:
+            monitor.stop()
+            listener.close()
+        self.assertTrue(result.ok)
+        self.assertEqual(monitor.probes['internet'].interval, 60.0)
+
+    def test_configure_replaces_the_probes(self):
+        monitor = ConnectivityMonitor([ConnectivityProbe('internet', 'example.test', resolver=FakeResolver())])
+        monitor.start()
+        try:
+            self.assertTrue(monitor.result('internet', timeout=2.0).ok)
+            failing = FakeResolver(error=socket.gaierror(-2, 'Name or service not known'))
+            monitor.configure([ConnectivityProbe('internet', 'other.test', resolver=failing)])
+            result = monitor.result('internet', timeout=2.0)
+            self.assertIsNone(monitor.result('localhost', timeout=0.1))
+        finally:
+            monitor.stop()
+        self.assertFalse(result.ok)
+        self.assertEqual(failing.calls, ['other.test'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+"""Segment format and compaction of the on-disk metric archive."""
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from metric_archive import (MetricArchive, Segment, SEGMENT_MAGIC, V1_HEADER, V1_RECORD,  # noqa: E402
+                            _SegmentWriter)
+
+DAY = 86400
+_DOUBLE = struct.Struct('<d')
+_BITS = struct.Struct('<Q')
+
+
+def _bits(value):
+    return _BITS.unpack(_DOUBLE.pack(value))[0]
+
+
+class MetricArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='metric-archive-test-')
+        self.archive = MetricArchive(directory=os.path.join(self.directory, 'archive'),
+                                     db_name=os.path.join(self.directory, 'archive.db'),
+                                     compact_after=DAY, compact_step=60)
+
+    def tearDown(self):
+        self.archive.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_raw_samples_round_trip(self):
+        for second in range(10):
+            self.archive.append('cpu.percent', 1000.0 + second, second * 1.5)
+        samples = self.archive.query('cpu.percent', 1003.0, 1005.0)
+        self.assertEqual(samples, [(1003.0, 4.5), (1004.0, 6.0), (1005.0, 7.5)])
+
+    def test_recompaction_weighs_buckets_by_their_samples(self):
+        # Three samples of 10 in the first hour, compacted into one bucket first
+        for second in (0, 10, 20):
+            self.archive.append('cpu.percent', second, 10.0)
+        self.archive.append('cpu.percent', 3600.0, 0.0)  # rolls the first hour's segment over
+        self.archive.compact(now=3 * DAY)
+
+        # A late sample of 50 in the same minute, in a new raw segment of the already compacted hour
+        writer = _SegmentWriter(self.archive._segment_path('cpu.percent', 0), 0)
+        writer.append(30.0, 50.0)
+        writer.close()
+        self.archive._catalog('cpu.percent', writer)
+        self.archive.compact(now=3 * DAY)
+
+        (timestamp, value), = [sample for sample in self.archive.query('cpu.percent', 0, 59) if sample[0] == 0]
+        self.assertEqual(timestamp, 0)
+        # (3 * 10 + 50) / 4, not (10 + 50) / 2
+        self.assertAlmostEqual(value, 20.0)
+
+    def test_version_1_segments_are_read_and_upgraded(self):
+        path = self.archive._segment_path('memory.used', 0)
+        with open(path, 'wb') as segment_file:
+            segment_file.write(V1_HEADER.pack(SEGMENT_MAGIC, 1, 0, 0, 0.0, _bits(100.0)))
+            for second, value in ((0, 100.0), (1, 250.0)):
+                segment_file.write(V1_RECORD.pack(second * 1000, _bits(value) ^ _bits(100.0)))
+        self.assertEqual(Segment(path).read(), [(0.0, 100.0), (1.0, 250.0)])
+
+        writer = _SegmentWriter(path, 0)
+        writer.append(2.0, 300.0)
+        writer.close()
+        self.assertEqual(Segment(path).read(), [(0.0, 100.0), (1.0, 250.0), (2.0, 300.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
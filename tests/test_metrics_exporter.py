@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""The OpenMetrics exporter's refresh thread survives a failing collector."""
+
+import os
+import sys
+import threading
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from metrics_exporter import OpenMetricsExporter  # noqa: E402
+
+
+class FlakyExporter(OpenMetricsExporter):
+    """Renders a counter instead of collecting; fails (like the managers, with sys.exit) when told to."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = 0
+        self.refreshes = 0
+        self.refreshed = threading.Event()
+
+    def collect(self):
+        if self.failures:
+            self.failures -= 1
+            sys.exit(1)
+        return None
+
+    def render(self, snapshot):
+        self.refreshes += 1
+        self.refreshed.set()
+        return f'# refresh {self.refreshes}\n# EOF\n'.encode()
+
+
+class RefreshThreadTest(unittest.TestCase):
+    def test_failed_refresh_keeps_the_thread_and_last_exposition(self):
+        exporter = FlakyExporter(interval=0.05, cpu_manager=object())
+        exporter.start()
+        try:
+            self.assertEqual(exporter.exposition(), b'# refresh 1\n# EOF\n')
+
+            exporter.refreshed.clear()
+            exporter.failures = 1
+            self.assertTrue(exporter.refreshed.wait(2.0))
+            self.assertEqual(exporter.failures, 0)
+            self.assertTrue(exporter._thread.is_alive())
+            self.assertEqual(exporter.exposition(), b'# refresh 2\n# EOF\n')
+        finally:
+            exporter.stop()
+
+    def test_failed_first_refresh_does_not_stop_start(self):
+        exporter = FlakyExporter(interval=0.05, cpu_manager=object())
+        exporter.failures = 1
+        exporter.start()
+        try:
+            self.assertTrue(exporter._thread.is_alive())
+            self.assertTrue(exporter.refreshed.wait(2.0))
+            self.assertTrue(exporter.exposition().startswith(b'# refresh'))
+        finally:
+            exporter.stop()
+
+    def test_scrape_without_exposition_raises_an_error_not_exit(self):
+        exporter = FlakyExporter(cpu_manager=object())
+        exporter.failures = 1
+        with self.assertRaises(RuntimeError):
+            exporter.exposition()
+
+
+if __name__ == '__main__':
+    unittest.main()
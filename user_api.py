@@ -1,30 +1,30 @@
 #!/usr/bin/env python3
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_cors import CORS
+import functools
 import time
 import sqlite3
+import threading
 from sys_analyze_api import SystemAnalyzer
-import logging
+from collectors import registry
+from collector_timings import timings
+from cpu_sampler import CPUSampler
+from network_sampler import NetworkSampler
+from disk_io_sampler import DiskIOSampler
+from connectivity_probe import ConnectivityMonitor
+from metric_archive import MetricArchive
+from live_stream import MetricStream
+from metric_history import HistoryRecorder, rollup
+from metrics_exporter import OPENMETRICS_CONTENT_TYPE, OpenMetricsExporter
+from rate_limiter import InMemoryRateLimiter
+from report_cache import SnapshotCache
+from log_config import get_logger
 
 # Configure logging
-logger = logging.getLogger(__name__)
-
-# Create file handler for logging to a file
-file_handler = logging.FileHandler('system_analysis.log')
-file_handler.setLevel(logging.DEBUG)  # Write all logs (DEBUG and higher) to the file
-
-# Create a formatter and attach it to the file handler
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-
-# Add the file handler to the logger
-logger.addHandler(file_handler)
-
-# Set the logger's level to DEBUG to capture all log levels
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
 
 class Database:
     """Class responsible for interacting with the SQLite database for request limits."""
@@ -39,83 +39,128 @@ class Database:
         except sqlite3.DatabaseError as e:
             raise Exception(f"Database connection error: {e}")
 
-    def check_request_limit(self, ip, limit=5, window=60):
-        """Check if the IP has exceeded the request limit within the given window."""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            current_time = int(time.time())
-            cursor.execute('SELECT request_count, last_request_time FROM request_limits WHERE ip_address = ?', (ip,))
-            row = cursor.fetchone()
-
-            if row:
-                request_count, last_request_time = row
-                # Reset counter if the time window has passed
-                if current_time - last_request_time > window:
-                    request_count = 0
-                    last_request_time = current_time
-
-                if request_count >= limit:
-                    conn.close()
-                    return False
-                else:
-                    # Increment the request count and update the timestamp
-                    cursor.execute('UPDATE request_limits SET request_count = ?, last_request_time = ? WHERE ip_address = ?',
-                                   (request_count + 1, current_time, ip))
-            else:
-                # Create a new entry for this IP if it does not exist
-                cursor.execute('INSERT INTO request_limits (ip_address, request_count, last_request_time) VALUES (?, ?, ?)',
-                               (ip, 1, current_time))
 
-            conn.commit()
-            conn.close()
-            return True
+class ReportBusyError(Exception):
+    """Raised when an expensive report cannot start because the concurrency cap is reached."""
 
-        except sqlite3.DatabaseError as e:
-            logger.error(f"Database error during request limit check: {e}")
-            raise Exception(f"Database error during request limit check: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-            raise Exception(f"Unexpected error: {e}")
 
+class ReportGenerator:
+    """Class responsible for generating reports."""
 
-class RateLimiter:
-    """Class responsible for handling rate-limiting logic using the Database class."""
+    # Single reports are charged and cached according to their collector's declared cost and TTL;
+    # the all-in-one report runs every collector and has its own
+    ALL_IN_ONE_COST = 5
+    ALL_IN_ONE_TTL = 2.0
 
-    def __init__(self, database, limit=5, window=60):
-        self.database = database
-        self.limit = limit
-        self.window = window
+    # Reports costing at least this much are expensive and share a global concurrency cap
+    EXPENSIVE_REPORT_COST = 2
+    MAX_CONCURRENT_EXPENSIVE_REPORTS = 2
+    expensive_report_slots = threading.BoundedSemaphore(MAX_CONCURRENT_EXPENSIVE_REPORTS)
 
-    def check_and_update(self, ip):
-        """Check if the IP has exceeded the request limit and update the database."""
+    # Shared by every request so concurrent clients reuse (and coalesce on) one snapshot
+    snapshot_cache = SnapshotCache()
+
+    @staticmethod
+    def report_cost(report_type, report_id, fields=None):
+        """Return the rate limit cost of a report request."""
+        if report_type == 'all_in_one':
+            try:
+                selection = registry.parse_fields(fields) if fields else None
+            except ValueError:
+                selection = None
+            if selection is None:
+                return ReportGenerator.ALL_IN_ONE_COST
+            # A projected all-in-one report only runs the selected collectors
+            return min(sum(registry.get(name).cost for name in selection), ReportGenerator.ALL_IN_ONE_COST)
         try:
-            return self.database.check_request_limit(ip, self.limit, self.window)
-        except Exception as e:
-            logger.error(f"Error checking or updating rate limit for IP {ip}: {e}")
-            raise Exception(f"Error checking or updating rate limit: {e}")
+            return registry.by_id(report_id).cost
+        except ValueError:
+            # Invalid IDs are rejected after being charged the minimum
+            return 1
 
+    @staticmethod
+    def _build(cost, build):
+        """Run a report build, holding an expensive-report slot if its cost requires one."""
+        if cost < ReportGenerator.EXPENSIVE_REPORT_COST:
+            return build()
+        if not ReportGenerator.expensive_report_slots.acquire(blocking=False):
+            raise ReportBusyError('Too many expensive reports are being generated.')
+        try:
+            return build()
+        finally:
+            ReportGenerator.expensive_report_slots.release()
 
-class ReportGenerator:
-    """Class responsible for generating reports."""
+    @staticmethod
+    def _is_cacheable(statistics):
+        """Error responses come back as (response, status) tuples and are never cached."""
+        return statistics is not None and not isinstance(statistics, tuple)
+
+    # Output formats: 'text' is the human-readable report, 'raw' the typed numeric records
+    REPORT_FORMATS = ('text', 'raw')
 
     @staticmethod
-    def get_report(report_type, report_id):
-        """Generate a report based on the report type and ID."""
+    def get_report(report_type, report_id, report_format='text', fields=None):
+        """Generate a report based on the report type, ID, output format and optional field projection.
+
+        ``fields`` is a comma-separated projection such as
+        ``network.traffic,disk.usage``; sub-collections that were not
+        requested are not collected at all.
+        """
         try:
+            if report_format not in ReportGenerator.REPORT_FORMATS:
+                logger.warning(f"Invalid report format: {report_format}. Must be 'text' or 'raw'.")
+                return None, 'Invalid report format. Please choose "text" or "raw".'
+            raw = report_format == 'raw'
+
+            selection = None
+            if fields:
+                try:
+                    selection = registry.parse_fields(fields)
+                except ValueError as e:
+                    logger.warning(f"Invalid fields: {fields}. {e}")
+                    return None, f'Invalid fields. {e}'
+                if raw and any(collector_fields is not None for collector_fields in selection.values()):
+                    # Raw records have a fixed schema; only whole reports can be selected
+                    logger.warning(f"Sub-report fields requested in raw format: {fields}.")
+                    return None, 'Raw reports can only be selected whole, e.g. fields=network,disk.'
+
             if report_type == 'single_report':
-                if report_id < 0 or report_id > 7:
-                    logger.warning(f"Invalid report ID: {report_id}. Must be between 0 and 7.")
-                    return None, 'Invalid report ID. Please enter a number between 0 and 7.'
-                statistics = SystemAnalyzer.once_status_one_report(report_id)
+                try:
+                    collector = registry.by_id(report_id)
+                except ValueError:
+                    logger.warning(f"Invalid report ID: {report_id}. Must be one of {registry.describe_ids()}.")
+                    return None, f'Invalid report ID. Please enter one of {registry.describe_ids()}.'
+                if not collector.is_supported():
+                    logger.warning(f"Report ID {report_id} ({collector.name}) is not supported on this host.")
+                    return None, f'Report ID {report_id} ({collector.name}) is not supported on this host.'
+                if selection is not None and set(selection) != {collector.name}:
+                    logger.warning(f"Fields {fields} do not belong to report ID {report_id} ({collector.name}).")
+                    return None, f'Fields must belong to report ID {report_id} ({collector.name}).'
+                collector_fields = selection[collector.name] if selection is not None else None
+                statistics = ReportGenerator.snapshot_cache.get_or_compute(
+                    ('single_report', report_id, report_format, collector_fields),
+                    lambda: ReportGenerator._build(
+                        collector.cost,
+                        lambda: SystemAnalyzer.once_status_one_report(report_id, raw=raw, fields=collector_fields),
+                    ),
+                    ttl=collector.ttl,
+                    cacheable=ReportGenerator._is_cacheable,
+                )
                 if statistics is None:
                     logger.error(f"Failed to generate report with Report ID {report_id}.")
                     return None, f'Failed to generate report with Report ID {report_id}.'
                 return statistics, None
 
             elif report_type == 'all_in_one':
-                statistics = SystemAnalyzer.all_in_one()
+                statistics = ReportGenerator.snapshot_cache.get_or_compute(
+                    ('all_in_one', report_format, tuple(selection.items()) if selection is not None else None),
+                    lambda: ReportGenerator._build(
+                        ReportGenerator.report_cost(report_type, report_id, fields),
+                        lambda: SystemAnalyzer.all_in_one(raw=raw, fields=selection),
+                    ),
+                    ttl=ReportGenerator.ALL_IN_ONE_TTL,
+                    cacheable=ReportGenerator._is_cacheable,
+                )
                 if statistics is None:
                     logger.error('Failed to generate all-in-one report.')
                     return None, 'Failed to generate all-in-one report.'
@@ -125,6 +170,8 @@ class ReportGenerator:
                 logger.warning(f"Invalid report type: {report_type}. Must be 'single_report' or 'all_in_one'.")
                 return None, 'Invalid report type. Please choose "single_report" or "all_in_one".'
 
+        except ReportBusyError:
+            raise
         except Exception as e:
             logger.error(f"Error generating report: {e}")
             raise Exception(f"Error generating report: {e}")
@@ -133,46 +180,200 @@ class ReportGenerator:
 class App:
     """Class responsible for setting up the Flask app and routes."""
 
-    def __init__(self):
+    def __init__(self, connectivity_probes=None):
+        """``connectivity_probes`` replaces the default probes; see ``ConnectivityMonitor``."""
         self.app = Flask(__name__)
         self.database = Database()
-        self.rate_limiter = RateLimiter(self.database)
+        # Limits are enforced in memory; the database only receives write-behind snapshots
+        self.rate_limiter = InMemoryRateLimiter(database=self.database)
+        self.rate_limiter.start()
         self.report_generator = ReportGenerator()
+        # Start sampling CPU times up front so the first CPU report does not wait
+        self.cpu_sampler = CPUSampler.shared()
+        # Per-NIC and per-disk counters are sampled every second so reports can show rates
+        self.network_sampler = NetworkSampler.shared()
+        self.disk_io_sampler = DiskIOSampler.shared()
+        # Connectivity is probed in the background; reports read the last result
+        self.connectivity_monitor = ConnectivityMonitor.shared(probes=connectivity_probes)
+        self.metric_archive = MetricArchive.shared()
+        self.history_recorder = HistoryRecorder.shared(archive=self.metric_archive)
+        self.metric_stream = MetricStream(self.history_recorder)
+        # The exposition is refreshed in the background; scrapes return the latest one
+        self.metrics_exporter = OpenMetricsExporter()
+        self.metrics_exporter.start()
         self.configure_app()
 
     def configure_app(self):
         """Configure the Flask app, set up CORS and routes."""
         CORS(self.app, resources={r"/api/*": {"origins": ["http://127.0.0.1"]}})  # Please add the appropriate origin
-        self.app.add_url_rule('/report', view_func=self.get_report, methods=['GET'])
+        self.app.add_url_rule('/report', view_func=self.server_timed(self.get_report), methods=['GET'])
+        self.app.add_url_rule('/history', view_func=self.get_history, methods=['GET'])
+        self.app.add_url_rule('/stream', view_func=self.get_stream, methods=['GET'])
+        self.app.add_url_rule('/metrics', view_func=self.get_metrics, methods=['GET'])
+        self.app.add_url_rule('/debug/timings', view_func=self.get_timings, methods=['GET'])
         limiter = Limiter(get_remote_address, app=self.app)
         limiter.init_app(self.app)
 
+    def server_timed(self, view):
+        """Wrap a view so its response carries a ``Server-Timing`` header of the collectors it ran."""
+        @functools.wraps(view)
+        def timed_view(*args, **kwargs):
+            started = time.monotonic()
+            token = timings.start_request()
+            try:
+                response = self.app.make_response(view(*args, **kwargs))
+            finally:
+                collected = timings.end_request(token)
+            # Reports served from a snapshot only carry the total
+            response.headers['Server-Timing'] = timings.server_timing(collected, time.monotonic() - started)
+            return response
+        return timed_view
+
     def get_report(self):
         """Endpoint to handle the report generation."""
         ip = request.remote_addr  # Get the client's IP address
         
         # Check if the IP has exceeded the rate limit
         try:
-            if not self.rate_limiter.check_and_update(ip):
-                logger.warning(f"Rate limit exceeded for IP {ip}.")
-                return jsonify({'error': 'Request limit exceeded. Please try again later.'}), 429
-
             report_type = request.args.get('type', default='single_report', type=str)
             report_id = request.args.get('id', default=0, type=int)
+            report_format = request.args.get('format', default='text', type=str)
+            fields = request.args.get('fields', default=None, type=str)
+
+            # Expensive reports are charged more of the client's budget
+            cost = self.report_generator.report_cost(report_type, report_id, fields)
+            if not self.rate_limiter.check_and_update(ip, cost):
+                logger.warning(f"Rate limit exceeded for IP {ip}.")
+                return jsonify({'error': 'Request limit exceeded. Please try again later.'}), 429
 
-            logger.info(f"Received request for report type: {report_type}, report ID: {report_id}")
-            statistics, error = self.report_generator.get_report(report_type, report_id)
+            logger.info("Received request for report type: %s, report ID: %s, format: %s", report_type, report_id, report_format)
+            statistics, error = self.report_generator.get_report(report_type, report_id, report_format, fields)
             if error:
                 logger.error(f"Error generating report: {error}")
                 return jsonify({'error': error}), 400
 
-            logger.info(f"Successfully generated report for {report_type} with ID {report_id}")
+            logger.info("Successfully generated report for %s with ID %s", report_type, report_id)
             return jsonify(statistics), 200
 
+        except ReportBusyError as e:
+            logger.warning(f"Rejected report for IP {ip}: {e}")
+            # Nothing was built, so the client keeps its budget
+            self.rate_limiter.refund(ip, cost)
+            return jsonify({'error': 'The server is busy generating other reports. Please try again shortly.'}), 503, {'Retry-After': '1'}
         except Exception as e:
             logger.error(f"Internal server error: {e}", exc_info=True)
             return jsonify({'error': 'An internal error has occurred. Please try again later.'}), 500
 
+    def get_history(self):
+        """Endpoint to serve recorded metric history without collecting anything."""
+        ip = request.remote_addr  # Get the client's IP address
+
+        try:
+            if not self.rate_limiter.check_and_update(ip):
+                logger.warning(f"Rate limit exceeded for IP {ip}.")
+                return jsonify({'error': 'Request limit exceeded. Please try again later.'}), 429
+
+            history = self.history_recorder.history
+            metric = request.args.get('metric', default=None, type=str)
+            if not metric:
+                return jsonify({'error': 'Missing metric.', 'metrics': history.metrics()}), 400
+
+            # 'from' and 'to' are epoch seconds; negative values are relative to now
+            now = time.time()
+            start = request.args.get('from', default=-600.0, type=float)
+            end = request.args.get('to', default=None, type=float)
+            step = request.args.get('step', default=None, type=int)
+            if start < 0:
+                start += now
+            if end is not None and end < 0:
+                end += now
+            if step is not None and step <= 0:
+                return jsonify({'error': 'Invalid step. Please enter a positive number of seconds.'}), 400
+            if end is not None and end < start:
+                return jsonify({'error': "Invalid range. 'to' must not be earlier than 'from'."}), 400
+
+            # Ranges older than the in-memory retention are read from the on-disk archive
+            memory_retention = max(resolution_step * size for resolution_step, size in history.resolutions)
+            default_source = 'archive' if now - start > memory_retention else 'memory'
+            source = request.args.get('source', default=default_source, type=str)
+            if source not in ('memory', 'archive'):
+                return jsonify({'error': 'Invalid source. Please choose "memory" or "archive".'}), 400
+
+            if source == 'archive':
+                samples = self.metric_archive.query(metric, start, end)
+                if not samples and metric not in self.metric_archive.metrics():
+                    logger.warning(f"Unknown archived metric requested: {metric}")
+                    return jsonify({'error': f'Unknown metric: {metric}.', 'metrics': self.metric_archive.metrics()}), 404
+                step = step or self.metric_archive.compact_step
+                points = rollup(samples, step)
+            else:
+                try:
+                    step, points = history.query(metric, start, end, step)
+                except KeyError:
+                    logger.warning(f"Unknown history metric requested: {metric}")
+                    return jsonify({'error': f'Unknown metric: {metric}.', 'metrics': history.metrics()}), 404
+
+            return jsonify({
+                'metric': metric,
+                'source': source,
+                'step': step,
+                'columns': ['timestamp', 'min', 'max', 'avg'],
+                'points': points,
+            }), 200
+
+        except Exception as e:
+            logger.error(f"Internal server error: {e}", exc_info=True)
+            return jsonify({'error': 'An internal error has occurred. Please try again later.'}), 500
+
+    def get_stream(self):
+        """Endpoint streaming live metrics as Server-Sent Events."""
+        ip = request.remote_addr  # Get the client's IP address
+
+        try:
+            if not self.rate_limiter.check_and_update(ip):
+                logger.warning(f"Rate limit exceeded for IP {ip}.")
+                return jsonify({'error': 'Request limit exceeded. Please try again later.'}), 429
+
+            try:
+                metrics = self.metric_stream.parse_metrics(request.args.get('metrics', default='', type=str))
+            except ValueError as ve:
+                return jsonify({'error': f'{ve}. Please choose from: cpu, memory, swap, disk, net.'}), 400
+            interval = request.args.get('interval', default=1.0, type=float)
+            if interval <= 0:
+                return jsonify({'error': 'Invalid interval. Please enter a positive number of seconds.'}), 400
+
+            subscriber = self.metric_stream.subscribe(metrics, interval)
+            if subscriber is None:
+                logger.warning(f"Stream subscriber limit reached; rejected IP {ip}.")
+                return jsonify({'error': 'Too many live streams are open. Please try again later.'}), 503
+
+            logger.info("Streaming %s every %s seconds to IP %s.", ', '.join(metrics), interval, ip)
+            return Response(self.metric_stream.events(subscriber), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+        except Exception as e:
+            logger.error(f"Internal server error: {e}", exc_info=True)
+            return jsonify({'error': 'An internal error has occurred. Please try again later.'}), 500
+
+    def get_metrics(self):
+        """Endpoint exposing host metrics in the OpenMetrics text format for Prometheus scrapes."""
+        # Not rate limited: scrapes are served from a snapshot rebuilt at most once per TTL
+        try:
+            return Response(self.metrics_exporter.exposition(), mimetype=None, content_type=OPENMETRICS_CONTENT_TYPE)
+        except (Exception, SystemExit) as e:
+            # Collectors still call sys.exit on failure; never let that take the server down
+            logger.error(f"Error rendering OpenMetrics exposition: {e!r}", exc_info=True)
+            return jsonify({'error': 'An internal error has occurred. Please try again later.'}), 500
+
+    def get_timings(self):
+        """Endpoint aggregating the latency histograms of every collector and of the all-in-one report."""
+        # Not rate limited: reading the histograms does not run any collector
+        try:
+            return jsonify(timings.summary()), 200
+        except Exception as e:
+            logger.error(f"Error summarizing collector timings: {e}", exc_info=True)
+            return jsonify({'error': 'An internal error has occurred. Please try again later.'}), 500
+
     def run(self):
         """Run the Flask app."""
         try: